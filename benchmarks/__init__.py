@@ -0,0 +1,6 @@
+"""
+benchmarks: Performance benchmarks for the game.
+
+Run a benchmark from the project root, for example:
+    python -m benchmarks.collision
+"""
@@ -0,0 +1,99 @@
+"""
+collision.py: This module is part of the benchmarks package.
+
+Measures the cost of the terrain collision queries used by bullets and
+tanks as the number of blocks on the map grows. Each query is timed twice:
+through the cells of the tile map (`TileMap.blocks_tanks`) and through the
+linear scan over the rects of all blocks that the game used before. With
+the tile map the time per query should stay flat while the linear scan
+grows with the block count.
+
+Usage:
+    python -m benchmarks.collision [--queries N] [--seed SEED]
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+
+from gameobjects.registry import EntityRegistry  # noqa: E402
+from gameobjects.tilemap import BRICK  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+BLOCK_COUNTS = (25, 50, 100, 150, 200, 300, 350)
+
+
+def linear_scan(rect, block_rects):
+    """The pre-grid collision check: test the rect against every block."""
+    for block_rect in block_rects:
+        if rect.colliderect(block_rect):
+            return True
+    return False
+
+
+def build_map(block_count, rng):
+    """
+    Put `block_count` bricks on random cells of a registry.
+
+    Returns:
+        tuple: The registry and the rects of the bricks.
+    """
+    objects_list = EntityRegistry()
+    cells = [
+        (col, row)
+        for col in range(Settings.GRID_WIDTH)
+        for row in range(2, Settings.GRID_HEIGHT)
+    ]
+    rng.shuffle(cells)
+    size = Settings.GRID_SIZE
+    block_rects = []
+    for col, row in cells[:block_count]:
+        objects_list.tiles.set(col, row, BRICK)
+        block_rects.append(pygame.Rect(col * size, row * size, size, size))
+    return objects_list, block_rects
+
+
+def time_queries(check, rects, *args):
+    """Return the mean time in microseconds of one collision query."""
+    start = time.perf_counter()
+    for rect in rects:
+        check(rect, *args)
+    return (time.perf_counter() - start) / len(rects) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rects = [
+        pygame.Rect(
+            rng.randint(0, Settings.SCREEN_WIDTH - 10),
+            rng.randint(2 * Settings.GRID_SIZE, Settings.SCREEN_HEIGHT - 10),
+            10,
+            10
+        )
+        for _ in range(args.queries)
+    ]
+
+    print(f"{'blocks':>8} {'tiles, us':>10} {'scan, us':>10} {'speedup':>8}")
+    for block_count in BLOCK_COUNTS:
+        objects_list, block_rects = build_map(block_count, rng)
+        tile_time = time_queries(objects_list.tiles.blocks_tanks, rects)
+        scan_time = time_queries(linear_scan, rects, block_rects)
+        print(f"{block_count:>8} {tile_time:>10.2f} {scan_time:>10.2f} "
+              f"{scan_time / tile_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
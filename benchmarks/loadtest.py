@@ -0,0 +1,283 @@
+"""
+loadtest.py: This module is part of the benchmarks package.
+
+Load test of the dedicated server. Hundreds of simulated players are run
+locally: each has its own UDP socket, asks the lobby for a match, joins the
+match it gets and then, like a real client, sends a bot's input every tick
+and decodes every snapshot against the snapshots it received before. The
+players do not simulate the game, so one process can drive many of them;
+with --processes they are spread over several processes.
+
+The report gives the round-trip time percentiles seen by the players, the
+snapshots they received per second and the bandwidth per player. Watch the
+output of the server for the tick latency and the matches per core.
+
+Usage:
+    python server.py --port 7777
+    python -m benchmarks.loadtest --server 127.0.0.1:7777 --players 200
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects.controls import BotController, encode_keys  # noqa: E402
+from gameobjects.network import (  # noqa: E402
+    MATCH_FOUND,
+    JOIN,
+    MAX_REDUNDANT_INPUTS,
+    PACKET_FIND_MATCH,
+    PACKET_JOIN,
+    PACKET_MATCH_FOUND,
+    PACKET_SNAPSHOT,
+    ProtocolError,
+    decode_snapshot,
+    encode_input
+)
+from gameobjects.profiler import percentile  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+# The bots press abstract keys; only the action masks go over the network
+ACTION_KEYS = (0, 1, 2, 3, 4)
+RETRY_INTERVAL = 0.5
+
+
+class SimulatedPlayer(asyncio.DatagramProtocol):
+    """
+    A client of the dedicated server driven by a bot.
+
+    Attributes:
+    - lobby (tuple): The address of the lobby.
+    - worker (tuple): The address of the worker hosting the match, None
+      until the lobby has answered.
+    - match_id (int): The id of the match.
+    - latest_tick (int): The tick of the latest snapshot decoded.
+    - snapshots (int): The number of snapshots decoded.
+    - undecodable (int): The number of snapshots whose baseline was
+      unknown.
+    - rtt_samples (list): The round-trip times measured, in seconds.
+    - bytes_sent, bytes_received (int): The traffic of the player.
+
+    Methods:
+    - tick(now): Sends the input of the next tick, or retries joining.
+    """
+
+    def __init__(self, lobby, seed, history=64):
+        self.lobby = lobby
+        self.bot = BotController(ACTION_KEYS, seed)
+        self.history = history
+        self.transport = None
+        self.worker = None
+        self.match_id = None
+        self.seq = 0
+        self.sent = deque(maxlen=MAX_REDUNDANT_INPUTS)
+        self.states = {}
+        self.latest_tick = 0
+        self.echo = 0.0
+        self.next_retry = 0.0
+        self.snapshots = 0
+        self.undecodable = 0
+        self.rtt_samples = []
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, data, address):
+        self.bytes_sent += len(data)
+        self.transport.sendto(data, address)
+
+    def datagram_received(self, data, address):
+        self.bytes_received += len(data)
+        if data[:1] == bytes((PACKET_MATCH_FOUND,)):
+            if self.worker is None and len(data) == MATCH_FOUND.size:
+                _, self.match_id, port = MATCH_FOUND.unpack(data)
+                self.worker = (self.lobby[0], port)
+                self.next_retry = 0.0
+        elif data[:1] == bytes((PACKET_SNAPSHOT,)):
+            try:
+                snapshot = decode_snapshot(data, self.states)
+            except ProtocolError:
+                return
+            if snapshot is None:
+                self.undecodable += 1
+                return
+            tick, state, _, timestamp = snapshot[:4]
+            self.states[tick] = state
+            self.states.pop(tick - self.history, None)
+            self.snapshots += 1
+            self.latest_tick = max(self.latest_tick, tick)
+            if timestamp and timestamp != self.echo:
+                self.echo = timestamp
+                self.rtt_samples.append(time.perf_counter() - timestamp)
+
+    def tick(self, now):
+        """Play the next tick of the player."""
+        if self.worker is None:
+            if now >= self.next_retry:
+                self.send(bytes((PACKET_FIND_MATCH,)), self.lobby)
+                self.next_retry = now + RETRY_INTERVAL
+            return
+        if not self.snapshots and now >= self.next_retry:
+            self.send(JOIN.pack(PACKET_JOIN, self.match_id), self.worker)
+            self.next_retry = now + RETRY_INTERVAL
+        self.seq += 1
+        self.sent.append(encode_keys(self.bot.get_pressed(), ACTION_KEYS))
+        self.send(encode_input(self.seq, self.latest_tick, now,
+                               list(self.sent)), self.worker)
+
+
+async def drive(lobby, players, first_seed, duration, ramp):
+    """
+    Run `players` simulated players for `duration` seconds.
+
+    The players are started evenly over the first `ramp` seconds, so the
+    lobby is not flooded all at once.
+
+    Returns:
+        dict: The measurements of the players.
+    """
+    loop = asyncio.get_running_loop()
+    simulated = []
+    tick_time = 1 / Settings.FPS
+    start = time.perf_counter()
+    deadline = start
+    late = []
+    while time.perf_counter() - start < duration:
+        now = time.perf_counter()
+        due = min(players, int(players * (now - start) / ramp) + 1
+                  if ramp else players)
+        while len(simulated) < due:
+            player = SimulatedPlayer(lobby, first_seed + len(simulated))
+            await loop.create_datagram_endpoint(
+                lambda: player, local_addr=('0.0.0.0', 0)
+            )
+            simulated.append(player)
+        for player in simulated:
+            player.tick(now)
+        late.append(time.perf_counter() - deadline)
+        deadline += tick_time
+        await asyncio.sleep(max(deadline - time.perf_counter(), 0))
+    elapsed = time.perf_counter() - start
+    for player in simulated:
+        player.transport.close()
+    return {
+        'players': len(simulated),
+        'matched': sum(player.worker is not None for player in simulated),
+        'playing': sum(player.snapshots > 0 for player in simulated),
+        'seconds': elapsed,
+        'snapshots': sum(player.snapshots for player in simulated),
+        'undecodable': sum(player.undecodable for player in simulated),
+        'bytes_sent': sum(player.bytes_sent for player in simulated),
+        'bytes_received': sum(player.bytes_received for player in simulated),
+        'rtt': [sample for player in simulated
+                for sample in player.rtt_samples],
+        'generator_late_p95': percentile(late, 0.95),
+    }
+
+
+def run_process(lobby, players, first_seed, duration, ramp, results):
+    """The entry point of a load generator process."""
+    results.put(asyncio.run(drive(lobby, players, first_seed, duration,
+                                  ramp)))
+
+
+def run(lobby, players, processes, duration, ramp, seed=0):
+    """
+    Run the load test, split over `processes` processes.
+
+    Returns:
+        dict: The players started, matched and playing, the snapshots
+        received per player and second, the round-trip time percentiles in
+        ms and the traffic per player and second.
+    """
+    results = multiprocessing.Queue()
+    workers = []
+    for index in range(processes):
+        count = players // processes + (index < players % processes)
+        worker = multiprocessing.Process(
+            target=run_process,
+            args=(lobby, count, seed + index * players, duration, ramp,
+                  results)
+        )
+        worker.start()
+        workers.append(worker)
+    parts = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    seconds = max(part['seconds'] for part in parts)
+    playing = sum(part['playing'] for part in parts) or 1
+    rtt = [sample * 1e3 for part in parts for sample in part['rtt']]
+    return {
+        'players': sum(part['players'] for part in parts),
+        'matched': sum(part['matched'] for part in parts),
+        'playing': sum(part['playing'] for part in parts),
+        'snapshots_per_player_per_second':
+            sum(part['snapshots'] for part in parts) / playing / seconds,
+        'undecodable_snapshots': sum(part['undecodable'] for part in parts),
+        'rtt_ms_p50': percentile(rtt, 0.5),
+        'rtt_ms_p95': percentile(rtt, 0.95),
+        'rtt_ms_p99': percentile(rtt, 0.99),
+        'down_bytes_per_player_per_second':
+            sum(part['bytes_received'] for part in parts) / playing / seconds,
+        'up_bytes_per_player_per_second':
+            sum(part['bytes_sent'] for part in parts) / playing / seconds,
+        'generator_late_ms_p95':
+            max(part['generator_late_p95'] for part in parts) * 1e3,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Load the dedicated server with simulated players.'
+    )
+    parser.add_argument('--server', default='127.0.0.1:7777',
+                        help='HOST:PORT of the lobby')
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=1,
+                        help='number of load generator processes')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='seconds to run for')
+    parser.add_argument('--ramp', type=float, default=5.0,
+                        help='seconds over which the players are started')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args()
+    host, _, port = args.server.rpartition(':')
+
+    report = run((host, int(port)), args.players, args.processes,
+                 args.duration, args.ramp, args.seed)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{report['players']} players, {report['matched']} matched, "
+              f"{report['playing']} receiving snapshots\n"
+              f"snapshots: {report['snapshots_per_player_per_second']:.1f} "
+              f"per player per second, "
+              f"{report['undecodable_snapshots']} undecodable\n"
+              f"RTT: p50 {report['rtt_ms_p50']:.1f} ms, "
+              f"p95 {report['rtt_ms_p95']:.1f} ms, "
+              f"p99 {report['rtt_ms_p99']:.1f} ms\n"
+              f"traffic per player: "
+              f"{report['down_bytes_per_player_per_second'] / 1024:.1f} "
+              f"KiB/s down, "
+              f"{report['up_bytes_per_player_per_second'] / 1024:.1f} "
+              f"KiB/s up\n"
+              f"load generator p95 lateness: "
+              f"{report['generator_late_ms_p95']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,159 @@
+"""
+pooling.py: This module is part of the benchmarks package.
+
+Measures what recycling bullets, bangs and bonuses saves during a heavy
+firefight: a seeded bot duel with hundreds of bullets kept in flight, played
+once with the entity pool of the registry and once without. Both runs play
+exactly the same game. For each, reports the game objects allocated per
+tick against those created, the memory blocks kept per tick, the
+garbage collections per generation with their total and longest pause, and
+the time per tick.
+
+Usage:
+    python -m benchmarks.pooling [--ticks N] [--bullets N] [--seed SEED]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects.bullet import Bullet  # noqa: E402
+from gameobjects.controls import BotController  # noqa: E402
+from gameobjects.match import Match  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.registry import EntityRegistry  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+POOLED_KINDS = ('bullet', 'bang', 'bonus')
+
+
+class GCTimer:
+    """Count the garbage collections per generation and time their pauses."""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pauses = []
+        self._start = 0.0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.collections[info['generation']] += 1
+            self.pauses.append(time.perf_counter() - self._start)
+
+
+def keep_bullets_flying(objects_list, rng, tanks, count):
+    """Fire bullets from random points until `count` are in flight."""
+    for _ in range(count - objects_list.count('bullet')):
+        direct = rng.randint(0, 3)
+        Bullet.create(
+            tanks[rng.randint(0, len(tanks) - 1)],
+            rng.randint(0, Settings.SCREEN_WIDTH),
+            rng.randint(2 * Settings.GRID_SIZE, Settings.SCREEN_HEIGHT),
+            Settings.MOVES_INPUT[direct][0] * 5,
+            Settings.MOVES_INPUT[direct][1] * 5,
+            1,
+            objects_list
+        )
+
+
+def created(objects_list):
+    """Return the number of pooled objects added to the registry so far."""
+    # Every add and remove is counted in `changes`, and the adds outnumber
+    # the removes by the objects still registered
+    return sum((objects_list.changes[kind] + objects_list.count(kind)) // 2
+               for kind in POOLED_KINDS)
+
+
+def measure(pooling, seed, ticks, bullets):
+    """Play the firefight and measure its allocations and collections."""
+    objects_list = EntityRegistry(pooling=pooling)
+    match = Match(objects_list)
+    match.start(seed, (BotController(PLAYER1_INPUT, seed),
+                       BotController(PLAYER2_INPUT, seed + 1)))
+    tanks = list(objects_list.of_kind('tank'))
+    rng = random.Random(seed)
+    # Fill the pool before measuring, as a match soon does
+    for _ in range(10):
+        keep_bullets_flying(objects_list, rng, tanks, bullets)
+        match.update()
+
+    gc.collect()
+    timer = GCTimer()
+    first_created = created(objects_list)
+    first_allocated = objects_list.pool.allocated if pooling else 0
+    gc.callbacks.append(timer)
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    try:
+        for _ in range(ticks):
+            keep_bullets_flying(objects_list, rng, tanks, bullets)
+            match.update()
+    finally:
+        elapsed = time.perf_counter() - start
+        blocks = sys.getallocatedblocks() - blocks
+        gc.callbacks.remove(timer)
+
+    objects = created(objects_list) - first_created
+    if pooling:
+        allocated = objects_list.pool.allocated - first_allocated
+    else:
+        allocated = objects
+    bullet = next(objects_list.of_kind('bullet'), None)
+    return {
+        'pooling': pooling,
+        'ticks': ticks,
+        'objects_per_tick': objects / ticks,
+        'allocations_per_tick': allocated / ticks,
+        'memory_blocks_per_tick': blocks / ticks,
+        'gc_collections': timer.collections,
+        'gc_pause_ms_total': sum(timer.pauses) * 1e3,
+        'gc_pause_ms_max': max(timer.pauses, default=0.0) * 1e3,
+        'tick_ms': elapsed / ticks * 1e3,
+        'bullet_bytes': sys.getsizeof(bullet) if bullet is not None else 0,
+        'digest': hash(tuple((obj.type, obj.rect.x, obj.rect.y)
+                             for obj in objects_list)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--bullets', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(pooling, args.seed, args.ticks, args.bullets)
+               for pooling in (False, True)]
+    same_game = results[0].pop('digest') == results[1].pop('digest')
+    if args.json:
+        print(json.dumps({'results': results, 'same_game': same_game}))
+        return
+    for result in results:
+        print(f"{'pooled' if result['pooling'] else 'unpooled'}: "
+              f"{result['objects_per_tick']:.1f} objects created per tick, "
+              f"{result['allocations_per_tick']:.2f} allocated, "
+              f"{result['memory_blocks_per_tick']:+.1f} memory blocks kept "
+              f"per tick\n"
+              f"  gc collections {result['gc_collections']}, "
+              f"pauses {result['gc_pause_ms_total']:.1f} ms in total "
+              f"(max {result['gc_pause_ms_max']:.2f} ms), "
+              f"{result['tick_ms']:.2f} ms per tick, "
+              f"{result['bullet_bytes']} bytes per bullet")
+    print(f"same game played: {same_game}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+rollback.py: This module is part of the benchmarks package.
+
+Measures the rollback layer of `gameobjects.rollback` on a seeded bot duel.
+The save and the restore of a state are timed on their own; then, for
+every rollback depth tried, each tick of the duel is followed by the
+correction of the input of a tick that many ticks back, as if the remote
+player's input had been mispredicted, and the time to roll back and play
+the ticks since again is recorded. The deepest rollback whose 95th
+percentile fits in a 16 ms frame is reported.
+
+At the end, the duel is played again from its seed on the corrected
+inputs, without rollbacks, and checked to end in the same state.
+
+Usage:
+    python -m benchmarks.rollback [--depths 1,2,4,...] [--ticks N]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects import snapshot  # noqa: E402
+from gameobjects.controls import BotController, read_input_frame  # noqa
+from gameobjects.match import Match  # noqa: E402
+from gameobjects.profiler import percentile  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.replay import state_digest  # noqa: E402
+from gameobjects.rollback import RollbackSession  # noqa: E402
+
+FRAME_BUDGET = 0.016
+DEPTHS = (1, 2, 4, 8, 16, 32, 64, 96, 128, 192, 256)
+
+
+def start(seed):
+    match = Match()
+    match.start(seed, (BotController(PLAYER1_INPUT, seed),
+                       BotController(PLAYER2_INPUT, seed + 1)))
+    return match
+
+
+def time_state_copies(seed, repeat):
+    """Return the mean time of a save and of a restore, in microseconds."""
+    match = start(seed)
+    for _ in range(300):
+        match.update()
+    data = snapshot.save(match)
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        snapshot.save(match)
+    save_us = (time.perf_counter() - begin) / repeat * 1e6
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        snapshot.load(data, match)
+    restore_us = (time.perf_counter() - begin) / repeat * 1e6
+    return save_us, restore_us
+
+
+def measure(seed, depth, ticks):
+    """
+    Play a duel with a rollback of `depth` ticks after every tick.
+
+    Returns:
+        tuple: The rollback times in seconds and whether the duel ended in
+        the same state as a duel played on the corrected inputs.
+    """
+    match = start(seed)
+    session = RollbackSession(match, depth + 1)
+    rng = random.Random(seed)
+    frames = []
+    times = []
+    for _ in range(depth + ticks):
+        frame = read_input_frame(list(match.objects_list.of_kind('tank')))
+        session.advance(frame)
+        frames.append(frame)
+        if match.is_over():
+            break
+        if session.tick > depth:
+            tick = session.tick - depth
+            # Mispredicted: the second player did something else
+            old = frames[tick]
+            frames[tick] = bytes((old[0], old[1] ^ rng.randint(1, 31)))
+            begin = time.perf_counter()
+            session.correct(tick, frames[tick])
+            times.append(time.perf_counter() - begin)
+
+    reference = start(seed)
+    for frame in frames:
+        reference.update(frame)
+    same = (state_digest(reference.objects_list)
+            == state_digest(match.objects_list))
+    return times, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--depths', default=','.join(map(str, DEPTHS)),
+                        help='comma-separated rollback depths, in ticks')
+    parser.add_argument('--ticks', type=int, default=200,
+                        help='number of rollbacks per depth')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    save_us, restore_us = time_state_copies(args.seed, 1000)
+    results = []
+    for depth in map(int, args.depths.split(',')):
+        times, same = measure(args.seed, depth, args.ticks)
+        results.append({
+            'depth': depth,
+            'rollbacks': len(times),
+            'ms_p50': percentile(times, 0.5) * 1e3,
+            'ms_p95': percentile(times, 0.95) * 1e3,
+            'ms_max': max(times, default=0.0) * 1e3,
+            'matches_reference': same,
+        })
+    fitting = [result['depth'] for result in results
+               if result['ms_p95'] <= FRAME_BUDGET * 1e3]
+    report = {
+        'save_us': save_us,
+        'restore_us': restore_us,
+        'depths': results,
+        'max_depth_in_frame': max(fitting, default=0),
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"save {save_us:.0f} us, restore {restore_us:.0f} us")
+    print(f"{'depth':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'exact':>6}")
+    for result in results:
+        print(f"{result['depth']:>6} {result['ms_p50']:>8.2f} "
+              f"{result['ms_p95']:>8.2f} {result['ms_max']:>8.2f} "
+              f"{str(result['matches_reference']):>6}")
+    print(f"deepest rollback within {FRAME_BUDGET * 1e3:.0f} ms: "
+          f"{report['max_depth_in_frame']} ticks")
+
+
+if __name__ == '__main__':
+    main()
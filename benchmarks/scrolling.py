@@ -0,0 +1,95 @@
+"""
+scrolling.py: This module is part of the benchmarks package.
+
+Measures how the cost of a match grows with the size of its map. For each
+size a random map file is written, then a seeded bot duel is started on it
+and played: the time to load the map and start the match is reported along
+with the time per tick of the simulation and of a frame drawn while the
+camera follows the tanks. The load time grows with the map, since the free
+cells are counted once, but the tick and frame times should stay flat.
+
+Usage:
+    python -m benchmarks.scrolling [--ticks N] [--seed SEED]
+    python -m benchmarks.scrolling --screens 1 10 40
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import main  # noqa: E402
+from gameobjects.controls import BotController  # noqa: E402
+from gameobjects.mapfile import GameMap, random_map, save_map  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+SCREENS = (1, 4, 16, 40)
+
+
+def measure(path, screens, ticks, seed):
+    """Play a duel on a map `screens` screens wide and high."""
+    columns = screens * -(-Settings.SCREEN_WIDTH // Settings.GRID_SIZE)
+    rows = screens * -(-Settings.SCREEN_HEIGHT // Settings.GRID_SIZE)
+    save_map(path, *random_map(columns, rows, seed))
+
+    main.setup_rendering()
+    random.seed(seed)
+    start = time.perf_counter()
+    main.match.game_map = GameMap(path)
+    main.match.start(seed, (BotController(PLAYER1_INPUT, seed),
+                            BotController(PLAYER2_INPUT, seed + 1)))
+    loaded = time.perf_counter() - start
+
+    updates = []
+    frames = []
+    clock = time.perf_counter
+    for _ in range(ticks):
+        start = clock()
+        main.match.update()
+        updated = clock()
+        main.renderer.follow(1.0)
+        main.terrain.draw()
+        main.renderer.draw_objects(1.0)
+        main.terrain.draw_covers()
+        updates.append(updated - start)
+        frames.append(clock() - updated)
+    frames.sort()
+    main.match.game_map = None
+    return {
+        'cells': columns * rows,
+        'load_ms': loaded * 1e3,
+        'update_ms': sum(updates) / ticks * 1e3,
+        'frame_ms': sum(frames) / ticks * 1e3,
+        'frame_p95_ms': frames[int(0.95 * (ticks - 1))] * 1e3,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--screens', type=int, nargs='+', default=SCREENS,
+                        help='the width of the maps, in screens')
+    args = parser.parse_args()
+
+    print(f"{'screens':>8} {'cells':>10} {'load, ms':>9} {'tick, ms':>9} "
+          f"{'frame, ms':>10} {'p95, ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.map')
+        for screens in args.screens:
+            result = measure(path, screens, args.ticks, args.seed)
+            print(f"{screens:>8} {result['cells']:>10} "
+                  f"{result['load_ms']:>9.1f} {result['update_ms']:>9.3f} "
+                  f"{result['frame_ms']:>10.3f} "
+                  f"{result['frame_p95_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main_cli()
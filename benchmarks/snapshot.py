@@ -0,0 +1,150 @@
+"""
+snapshot.py: This module is part of the benchmarks package.
+
+Measures the save format of `gameobjects.snapshot` on a seeded bot duel and
+on a map filled with blocks: the size of a snapshot, the time to save and
+to load it, and the size and time of the delta between the snapshots of
+two consecutive ticks. Loads are timed into a match already holding the
+same map, as when resuming or rolling back, and into an empty match.
+Every loaded snapshot is saved again and checked against the original, and
+a match resumed from a snapshot is checked to end in the same state as the
+match it was saved from.
+
+Usage:
+    python -m benchmarks.snapshot [--ticks N] [--seed SEED]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects import snapshot  # noqa: E402
+from gameobjects.controls import BotController, read_input_frame  # noqa
+from gameobjects.match import Match  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.replay import state_digest  # noqa: E402
+from gameobjects.tilemap import BRICK  # noqa: E402
+
+
+def bots(seed):
+    return (BotController(PLAYER1_INPUT, seed),
+            BotController(PLAYER2_INPUT, seed + 1))
+
+
+def fill_map(match):
+    """Put a block on every free cell of the map."""
+    while match.objects_list.place_tile(BRICK):
+        pass
+
+
+def mean_us(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def measure(name, seed, ticks, repeat, full):
+    """Play a bot match and time its snapshots every tick."""
+    match = Match()
+    match.start(seed, bots(seed))
+    if full:
+        fill_map(match)
+    snapshots = []
+    frames = []
+    save_times = []
+    for _ in range(ticks):
+        frames.append(read_input_frame(list(
+            match.objects_list.of_kind('tank')
+        )))
+        match.update(frames[-1])
+        start = time.perf_counter()
+        snapshots.append(snapshot.save(match))
+        save_times.append(time.perf_counter() - start)
+        if match.is_over():
+            break
+
+    data = snapshots[-1]
+    other = Match()
+    load_us = mean_us(lambda: snapshot.load(data, other), repeat)
+    identical = snapshot.save(other) == data
+    empty = [Match() for _ in range(repeat)]
+    cold_load_us = mean_us(lambda: snapshot.load(data, empty.pop()), repeat)
+
+    deltas = [snapshot.diff(old, new)
+              for old, new in zip(snapshots, snapshots[1:])]
+    diff_us = mean_us(lambda: snapshot.diff(snapshots[-2], data), repeat)
+    patch_us = mean_us(lambda: snapshot.patch(snapshots[-2], deltas[-1]),
+                       repeat)
+    patched = all(snapshot.patch(old, delta) == new for old, delta, new
+                  in zip(snapshots, deltas, snapshots[1:]))
+
+    # Resume the match from halfway and play the same inputs to the end
+    middle = len(snapshots) // 2
+    resumed = Match()
+    snapshot.load(snapshots[middle], resumed)
+    for frame in frames[middle + 1:]:
+        resumed.update(frame)
+    resumes = (state_digest(resumed.objects_list)
+               == state_digest(match.objects_list))
+
+    save_times.sort()
+    return {
+        'scenario': name,
+        'ticks': len(snapshots),
+        'blocks': match.objects_list.tiles.count(),
+        'snapshot_bytes': len(data),
+        'save_us_mean': sum(save_times) / len(save_times) * 1e6,
+        'save_us_max': save_times[-1] * 1e6,
+        'load_us': load_us,
+        'cold_load_us': cold_load_us,
+        'delta_bytes_mean': sum(map(len, deltas)) / len(deltas),
+        'delta_bytes_max': max(map(len, deltas)),
+        'diff_us': diff_us,
+        'patch_us': patch_us,
+        'reloads_identical': identical,
+        'deltas_exact': patched,
+        'resume_matches': resumes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = [
+        measure(name, args.seed, args.ticks, args.repeat, full)
+        for name, full in (('duel', False), ('full_grid', True))
+    ]
+    if args.json:
+        print(json.dumps(results))
+        return
+    for result in results:
+        print(f"{result['scenario']}: {result['blocks']} blocks, "
+              f"{result['snapshot_bytes']} bytes per snapshot\n"
+              f"  save {result['save_us_mean']:.0f} us "
+              f"(max {result['save_us_max']:.0f} us), "
+              f"load {result['load_us']:.0f} us "
+              f"({result['cold_load_us']:.0f} us into an empty match)\n"
+              f"  delta {result['delta_bytes_mean']:.0f} bytes per tick "
+              f"(max {result['delta_bytes_max']}), "
+              f"diff {result['diff_us']:.0f} us, "
+              f"patch {result['patch_us']:.0f} us\n"
+              f"  reload identical: {result['reloads_identical']}, "
+              f"deltas exact: {result['deltas_exact']}, "
+              f"resumed match identical: {result['resume_matches']}")
+
+
+if __name__ == '__main__':
+    main()
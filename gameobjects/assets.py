@@ -0,0 +1,143 @@
+"""
+assets.py: This module is part of the gameobjects package.
+
+This module contains the asset manager, which loads images and sounds the
+first time they are used and keeps them in a keyed cache. Images are
+converted to the pixel format of the display as soon as a display exists,
+so blitting them needs no per-pixel conversion. A sound that cannot be
+loaded is replaced by silence with a warning, so a missing file never stops
+a match.
+"""
+
+import warnings
+from collections.abc import Mapping, Sequence
+
+import pygame
+
+
+class AssetManager:
+    """
+    Load assets on first use and cache them by key.
+
+    Attributes:
+    - cache (dict): The loaded assets, keyed by the key they were requested
+      with.
+    - headless (bool): Whether the game runs without audio, in which case
+      sounds are replaced by `silent_sound`.
+    - silent_sound: The object handed out instead of a sound when headless.
+
+    Methods:
+    - get(key, loader): Returns the cached asset, loading it on first use.
+    - image(path): Returns an image converted to the display format.
+    - sound(path): Returns a sound, `silent_sound` when headless, or a
+      silent sound if the file cannot be loaded.
+    - images(paths): Returns a lazy list of images.
+    - sounds(paths): Returns a lazy mapping of names to sounds.
+    - convert(image): Converts an image to the display format, if any.
+    """
+
+    def __init__(self, headless=False, silent_sound=None):
+        self.cache = {}
+        self.headless = headless
+        self.silent_sound = silent_sound
+
+    def get(self, key, loader):
+        """Return the asset cached under `key`, calling `loader` on a miss."""
+        try:
+            return self.cache[key]
+        except KeyError:
+            asset = self.cache[key] = loader()
+            return asset
+
+    @staticmethod
+    def convert(image):
+        """
+        Convert an image to the pixel format of the display.
+
+        Images with per-pixel alpha keep it; the colorkey of other images is
+        kept and RLE-accelerated. Without a display the image is returned
+        as it is.
+        """
+        if pygame.display.get_surface() is None:
+            return image
+        if image.get_flags() & pygame.SRCALPHA:
+            return image.convert_alpha()
+        colorkey = image.get_colorkey()
+        image = image.convert()
+        if colorkey is not None:
+            image.set_colorkey(colorkey, pygame.RLEACCEL)
+        return image
+
+    def image(self, path):
+        """Return the image at `path`, loaded and converted once."""
+        return self.get(
+            path, lambda: self.convert(pygame.image.load(path))
+        )
+
+    def sound(self, path):
+        """Return the sound at `path`, loaded once."""
+        if self.headless:
+            return self.silent_sound
+        return self.get(path, lambda: self._load_sound(path))
+
+    def _load_sound(self, path):
+        """Load a sound, or warn and return a silent one if it fails."""
+        try:
+            return pygame.mixer.Sound(path)
+        except (OSError, pygame.error) as error:
+            warnings.warn(f'cannot load sound {path}: {error}')
+            return pygame.mixer.Sound(buffer=bytes(4))
+
+    def images(self, paths):
+        """Return a list-like view of images loaded on first access."""
+        return LazyList(self.image, paths)
+
+    def sounds(self, paths):
+        """Return a dict-like view of named sounds loaded on first access."""
+        return LazyMapping(self.sound, paths)
+
+
+class LazyList(Sequence):
+    """
+    A read-only list of assets, each loaded on first access.
+
+    Attributes:
+    - load (callable): Turns a key into its asset.
+    - keys (tuple): The keys of the assets, in order.
+    """
+
+    def __init__(self, load, keys):
+        self.load = load
+        self.keys = tuple(keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.load(key) for key in self.keys[index]]
+        return self.load(self.keys[index])
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class LazyMapping(Mapping):
+    """
+    A read-only dict of assets, each loaded on first access.
+
+    Attributes:
+    - load (callable): Turns the value of a name into its asset.
+    - keys_map (dict): The names of the assets and what they are loaded
+      from.
+    """
+
+    def __init__(self, load, keys_map):
+        self.load = load
+        self.keys_map = dict(keys_map)
+
+    def __getitem__(self, name):
+        return self.load(self.keys_map[name])
+
+    def __iter__(self):
+        return iter(self.keys_map)
+
+    def __len__(self):
+        return len(self.keys_map)
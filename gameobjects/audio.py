@@ -0,0 +1,213 @@
+"""
+audio.py: This module is part of the gameobjects package.
+
+This module contains the audio manager, which plays every sound effect of
+the game through a fixed pool of mixer channels. Each sound has a policy
+limiting how many copies of it play at once and how often it may start, and
+when all channels are busy a new sound takes over the channel of the least
+important one. The game only tells the manager about state changes (a sound
+is triggered, a loop starts or stops), so the cost of audio stays bounded
+however busy a fight gets. Since a loop is only started once, its channel is
+never taken over: a loop that finds no channel waits until one is free.
+"""
+
+import time
+from collections import namedtuple
+
+import pygame
+
+SoundPolicy = namedtuple(
+    'SoundPolicy', ('priority', 'max_voices', 'cooldown', 'volume')
+)
+SoundPolicy.__doc__ = """
+How a sound is played.
+
+- priority (int): Sounds of higher priority take channels over from
+  sounds of lower priority when all channels are busy.
+- max_voices (int): The number of copies of the sound playing at once.
+- cooldown (float): The minimal time between two starts, in seconds.
+- volume (float): The volume the sound is played at.
+"""
+
+DEFAULT_POLICY = SoundPolicy(priority=1, max_voices=2, cooldown=0.0,
+                             volume=1.0)
+
+
+class Voice:
+    """A sound playing on a channel of the pool."""
+
+    __slots__ = ('name', 'priority', 'owner', 'started', 'loops')
+
+    def __init__(self, name, priority, owner, started, loops=False):
+        self.name = name
+        self.priority = priority
+        self.owner = owner
+        self.started = started
+        self.loops = loops
+
+
+class AudioManager:
+    """
+    Play sound effects through a fixed pool of channels.
+
+    Attributes:
+    - sounds (Mapping): The sounds, by name.
+    - policies (dict): The `SoundPolicy` of each sound, by name. Sounds
+      without one use `DEFAULT_POLICY`.
+    - channels (list): The mixer channels of the pool.
+    - voices (list): The `Voice` last started on each channel, or None.
+    - last_started (dict): When each sound was last started.
+    - waiting (dict): The (name, owner) of the loops started while no
+      channel could take them, in the order they were started.
+    - muted (bool): While True no sound is started, e.g. while ticks that
+      were already heard are simulated again.
+
+    Methods:
+    - play(name, owner): Plays a sound once.
+    - start_loop(name, owner): Starts looping a sound for an owner.
+    - stop_loop(name, owner): Stops the loop started for an owner.
+    - stop_all(): Stops every sound.
+    """
+
+    def __init__(self, sounds, policies, channels=8):
+        self.sounds = sounds
+        self.policies = policies
+        pygame.mixer.set_num_channels(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.voices = [None] * channels
+        self.last_started = {}
+        self.waiting = {}
+        self.muted = False
+
+    def _active(self, index):
+        """Return the voice playing on a channel, or None once it ended."""
+        voice = self.voices[index]
+        if voice is not None and not self.channels[index].get_busy():
+            voice = self.voices[index] = None
+        return voice
+
+    def _pick_channel(self, name, policy):
+        """
+        Choose the channel to play a new voice of a sound on.
+
+        The oldest voice of the sound is replaced when the sound already
+        plays `max_voices` times. Otherwise a free channel is used, or else
+        the channel of the oldest voice of lowest priority, as long as its
+        priority is not above the new sound's. Loops are never replaced:
+        the loop of a moving tank is only started once.
+
+        Returns:
+            int: The index of the channel, or None to drop the sound.
+        """
+        same = []
+        free = None
+        victim = None
+        for index in range(len(self.channels)):
+            voice = self._active(index)
+            if voice is None:
+                if free is None:
+                    free = index
+            elif voice.name == name:
+                same.append(index)
+            elif not voice.loops and voice.priority <= policy.priority and (
+                    victim is None
+                    or (voice.priority, voice.started)
+                    < (self.voices[victim].priority,
+                       self.voices[victim].started)):
+                victim = index
+        if len(same) >= policy.max_voices:
+            same = [index for index in same if not self.voices[index].loops]
+            if not same:
+                return None
+            return min(same, key=lambda i: self.voices[i].started)
+        if free is not None:
+            return free
+        return victim
+
+    def _start(self, name, owner, loops):
+        if self.muted:
+            return False
+        policy = self.policies.get(name, DEFAULT_POLICY)
+        now = time.perf_counter()
+        last_started = self.last_started.get(name)
+        if last_started is not None and now - last_started < policy.cooldown:
+            return False
+        index = self._pick_channel(name, policy)
+        if index is None:
+            return False
+        channel = self.channels[index]
+        channel.set_volume(policy.volume)
+        channel.play(self.sounds[name], loops=loops)
+        self.voices[index] = Voice(name, policy.priority, owner, now,
+                                   loops == -1)
+        self.last_started[name] = now
+        return True
+
+    def play(self, name, owner=None):
+        """
+        Play a sound once, if its policy and the free channels allow it.
+
+        Returns:
+            bool: True if the sound was started.
+        """
+        started = self._start(name, owner, 0)
+        self._resume()
+        return started
+
+    def start_loop(self, name, owner):
+        """
+        Start looping a sound for `owner`, unless it already loops.
+
+        A loop no channel can take waits until one is free.
+        """
+        if (name, owner) in self.waiting:
+            return
+        for index in range(len(self.channels)):
+            voice = self._active(index)
+            if voice is not None and voice.name == name \
+                    and voice.owner is owner:
+                return
+        if not self._start(name, owner, -1):
+            self.waiting[name, owner] = None
+
+    def stop_loop(self, name, owner):
+        """Stop the loop of a sound started for `owner`, if any."""
+        self.waiting.pop((name, owner), None)
+        for index, voice in enumerate(self.voices):
+            if voice is not None and voice.name == name \
+                    and voice.owner is owner:
+                self.channels[index].stop()
+                self.voices[index] = None
+        self._resume()
+
+    def _resume(self):
+        """Start the waiting loops, in order, while channels take them."""
+        for name, owner in list(self.waiting):
+            if not self._start(name, owner, -1):
+                return
+            del self.waiting[name, owner]
+
+    def stop_all(self):
+        """Stop every sound of the pool."""
+        for channel in self.channels:
+            channel.stop()
+        self.voices = [None] * len(self.channels)
+        self.waiting.clear()
+
+
+class NullAudio:
+    """An audio manager that plays nothing, used when running headless."""
+
+    muted = False
+
+    def play(self, name, owner=None):
+        return False
+
+    def start_loop(self, name, owner):
+        pass
+
+    def stop_loop(self, name, owner):
+        pass
+
+    def stop_all(self):
+        pass
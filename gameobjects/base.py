@@ -6,23 +6,37 @@ that underpin the other modules in the gameobjects package.
 """
 
 from abc import ABC
-from typing import List, Any
+from typing import List, Any, Optional, Tuple
+
+import pygame
 
 
 class GameObject(ABC):
     """This is an abstract base class representing a game object.
 
+    The base class has no instance dict of its own (`__slots__ = ()`), so
+    short-lived subclasses can declare `__slots__` and be `pooled`: once
+    removed from the registry they are recycled by `create` instead of
+    being allocated again.
+
     Attributes:
-        objects_list (list): A list containing all game objects.
+        objects_list (EntityRegistry): The registry containing all game
+    objects.
+        pooled (bool): Whether removed objects of the class are recycled.
 
     Methods:
          __init__(objects_list): Initializes the game object by adding
-    itself to the objects_list.
+    itself to the objects_list. Subclasses call it once their rect is set,
+    so the object can be registered in the indexes of the registry.
+        create(*args): Creates an object, recycling a removed one of the
+    class when the registry has a pool.
         update(): Abstract method to update the game object.
         draw(): Abstract method to draw the game object.
         damage(**kwargs): Abstract method to handle damage to the game object.
     """
+    __slots__ = ()
     objects_list = []
+    pooled = False
 
     def __init__(self, objects_list: List[Any]) -> None:
         """Initialize the class with a list of objects.
@@ -36,6 +50,23 @@ class GameObject(ABC):
         objects_list.append(self)
         self.objects_list = objects_list
 
+    @classmethod
+    def create(cls, *args):
+        """
+        Create an object, recycling a removed one when possible.
+
+        Takes the arguments of the constructor, the registry last. When the
+        registry pools objects of the class, a removed object is taken from
+        the pool and its `__init__` runs again; pooled classes reuse their
+        rect when `__init__` runs on a recycled object.
+        """
+        pool = getattr(args[-1], 'pool', None)
+        obj = pool.acquire(cls) if pool is not None and cls.pooled else None
+        if obj is None:
+            return cls(*args)
+        obj.__init__(*args)
+        return obj
+
     def update(self) -> None:
         """
         Update method.
@@ -54,14 +85,23 @@ class GameObject(ABC):
         """
         raise NotImplementedError
 
-    def draw(self) -> None:
+    def draw(self, alpha: float = 1.0,
+             offset: Tuple[int, int] = (0, 0)) -> Optional[pygame.Rect]:
         """
         Method to draw the object.
 
         :param self: The object instance.
         :type self: object
-        :return: None
-        :rtype: None
+        :param alpha: The fraction of the current tick elapsed, used by
+            moving objects to interpolate between their previous and current
+            positions.
+        :type alpha: float
+        :param offset: The position of the view of the camera on the map,
+            subtracted from the position of the object on the map.
+        :type offset: Tuple[int, int]
+        :return: The area of the screen that was drawn on, or None if
+            nothing was drawn.
+        :rtype: Optional[pygame.Rect]
         """
         raise NotImplementedError
 
@@ -9,14 +9,25 @@ other game objects.
 from typing import NoReturn
 import pygame
 
-from settings.settings import Settings
 from gameobjects.base import GameObject
 from gameobjects.gameobjects import Bang
 from gameobjects.pygame_ui import screen
+from gameobjects.spatial import (cells_for_rect, leave_time, swept_cells,
+                                 sweep_time)
 
 
 class Bullet(GameObject):
-    """Manage the state and behavior of a Bullet in the game."""
+    """Manage the state and behavior of a Bullet in the game.
+
+    Bullets are pooled: create them with `Bullet.create(...)` so a removed
+    bullet is recycled, rect included, instead of a new one allocated.
+    """
+
+    __slots__ = ('parent', 'parent_x', 'parent_y', 'previous_x',
+                 'previous_y', 'bullet_x', 'bullet_y', '_damage',
+                 'hit_points', 'rect', 'objects_list')
+    type = 'bullet'
+    pooled = True
 
     def __init__(self,
                  parent: GameObject,
@@ -27,14 +38,18 @@ class Bullet(GameObject):
                  damage: int,
                  objects_list: list) -> NoReturn:
         """Initialize the attributes of the Bullet."""
-        super().__init__(objects_list)
-        self.type = 'bullet'
         self.parent = parent
         self.parent_x, self.parent_y = parent_x, parent_y
+        self.previous_x, self.previous_y = parent_x, parent_y
         self.bullet_x, self.bullet_y = bullet_x, bullet_y
         self._damage = damage
         self.hit_points = 1
-        self.rect = pygame.Rect(parent_x, parent_y, 10, 10)
+        rect = getattr(self, 'rect', None)
+        if rect is None:
+            self.rect = pygame.Rect(parent_x, parent_y, 10, 10)
+        else:
+            rect.update(parent_x, parent_y, 10, 10)
+        super().__init__(objects_list)
 
     def update(self):
         """
@@ -45,35 +60,39 @@ class Bullet(GameObject):
         `bullet_x` and increments the `parent_y` value * by `bullet_y`. Then
         it updates the `rect` attributes `x` and `y` with the new values of
         `parent_x` and `parent_y`. Finally, it calls the `collision` method
-        to handle any collisions * that might have occurred.
+        to handle any collisions * that might have occurred. The position
+        before the move is kept in `previous_x` and `previous_y` for
+        interpolated drawing and for the collision, which sweeps the move.
 
         """
+        self.previous_x, self.previous_y = self.parent_x, self.parent_y
         self.parent_x += self.bullet_x
         self.parent_y += self.bullet_y
         self.rect.x = self.parent_x
         self.rect.y = self.parent_y
+        self.objects_list.moved(self)
         self.collision()
 
     def collision(self):
         """
-        Check for collisions and handle the consequences.
-
-        Checks if the parent object is within the boundaries of the screen.
-        If it is not, the parent object will be removed from the objects list.
-
-        If the parent object is within the boundaries, it loops over all
-        objects in the objects list and checks for collisions. It skips over
-        the parent object and any objects with types 'bonus *' or 'bang'. If
-        a collision is detected with an object of type 'block', it calls the
-        `damage` method on the object with the damage value and the parent's
-        rank as arguments. If a collision * is detected with any other
-        object, it calls the `damage` method on the object with the damage
-        value and the parent as arguments. It then adds the parent object to
-        the to_remove list *, creates a 'Bang' object at the parent's
-        coordinates, and breaks out of the loop.
-
-        After checking for collisions, if there are any objects in the
-        to_remove list, it removes each object from the objects list.
+        Find the first thing the Bullet hit during its move and handle it.
+
+        The rect of the bullet is swept from its previous position to the
+        current one, walking the grid cells it crosses in the order it
+        enters them, so nothing is skipped however fast the bullet flies
+        and the cost only depends on the cells crossed. In each cell the
+        tile is checked first, then the objects registered in the cell,
+        skipping the bullet itself, its parent, bonuses and bangs. The walk
+        stops where the bullet leaves the boundaries of the map and of the
+        area simulated around the camera.
+
+        If the bullet hit a tile that stops bullets, the tile map is told to
+        damage it with the damage value and the parent's rank; if it hit an
+        object, the `damage` method of the object is called with the damage
+        value and the bullet. Either way a 'Bang' object is created at the
+        end of the move, or where the bullet touched what it hit if it flew
+        past it, and the bullet is removed from the objects list. A bullet
+        that hit nothing is removed if it left the boundaries.
 
         Parameters:
             self: The instance of the class.
@@ -81,30 +100,55 @@ class Bullet(GameObject):
         Returns:
             None
         """
-        to_remove = []
-        if not (
-                0 <= self.parent_x <= Settings.SCREEN_WIDTH and
-                0 <= self.parent_y <= Settings.SCREEN_HEIGHT
-        ):
-            to_remove.append(self)
-        else:
-            for obj in self.objects_list:
+        objects_list = self.objects_list
+        x, y = self.previous_x, self.previous_y
+        dx, dy = self.parent_x - x, self.parent_y - y
+        width, height = self.rect.size
+        leave = leave_time(x, y, dx, dy, objects_list.camera.active)
+        tiles = objects_list.tiles
+        grid = objects_list.grid
+        # The box around the whole move, to skip most objects cheaply
+        left, right = min(x, x + dx), max(x, x + dx) + width
+        top, bottom = min(y, y + dy), max(y, y + dy) + height
+        hit = None
+        hit_time = 1.0 if leave is None else leave
+        for time, column, row in swept_cells(x, y, width, height, dx, dy):
+            if time > hit_time or (hit is not None and time == hit_time):
+                break
+            if tiles.stops_bullets(column, row):
+                hit, hit_time = (column, row), time
+                continue
+            for obj in grid.at(column, row):
+                rect = obj.rect
                 if (obj is not self and
                         obj is not self.parent and
-                        obj.type not in (
-                        'bonus', 'bang') and self.rect.colliderect(
-                            obj.rect)):
-                    if obj.type != 'block':
-                        obj.damage(self._damage, self)
-                    else:
-                        obj.damage(self._damage, rank=self.parent.rank)
-                    to_remove.append(self)
-                    Bang(self.parent_x, self.parent_y, self.objects_list)
-                    break
-
-        if to_remove:
-            for bullet in to_remove:
-                self.objects_list.remove(bullet)
+                        obj.type not in ('bonus', 'bang') and
+                        rect.left < right and rect.right > left and
+                        rect.top < bottom and rect.bottom > top):
+                    contact = sweep_time(x, y, width, height, dx, dy, rect)
+                    if contact is not None and (
+                            contact < hit_time or
+                            hit is None and contact == hit_time):
+                        hit, hit_time = obj, contact
+
+        if hit is None:
+            if leave is not None:
+                objects_list.remove(self)
+            return
+        # The bang is where the bullet ends its move, unless the bullet
+        # flew past what it hit: then it is where the bullet touched it
+        if isinstance(hit, tuple):
+            passed = hit not in cells_for_rect(self.rect)
+            tiles.damage(*hit, self._damage, self.parent.rank)
+        else:
+            passed = not self.rect.colliderect(hit.rect)
+            hit.damage(self._damage, self)
+        if passed:
+            x, y = round(x + dx * hit_time), round(y + dy * hit_time)
+        else:
+            x, y = self.parent_x, self.parent_y
+        Bang.create(x, y, objects_list)
+        objects_list.remove(self)
 
     def damage(self, value, rank=None):
         """Apply damage to what the Bullet hits."""
@@ -112,7 +156,14 @@ class Bullet(GameObject):
         if self.hit_points <= 0:
             self.objects_list.remove(self)
 
-    def draw(self):
-        """Draw the Bullet on the gaming interface."""
-        pygame.draw.circle(screen, 'yellow', (self.parent_x,
-                                              self.parent_y), 2)
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        """Draw the Bullet on the gaming interface.
+
+        The bullet is drawn between its previous and current positions,
+        `alpha` of the way from the former to the latter, at its position
+        on the map minus `offset`.
+        """
+        x = self.previous_x + (self.parent_x - self.previous_x) * alpha
+        y = self.previous_y + (self.parent_y - self.previous_y) * alpha
+        return pygame.draw.circle(screen, 'yellow',
+                                  (x - offset[0], y - offset[1]), 2)
@@ -0,0 +1,278 @@
+"""
+bullet_engine.py: This module is part of the gameobjects package.
+
+This module contains a vectorized bullet engine for stress and bullet-hell
+modes. Instead of one `Bullet` object per shot, the positions, velocities,
+damage and owners of all bullets are kept in NumPy arrays, and each tick
+moves, bounds-checks and collides every bullet against the tile map and
+the tanks in a single vectorized pass. Only the bullets that hit something
+are handled one by one, to call `damage` on what they hit, along with the
+few bullets flying fast enough to cross something within a tick, which are
+swept along their move.
+"""
+
+import numpy as np
+import pygame
+
+from gameobjects.gameobjects import Bang
+from gameobjects.pygame_ui import screen
+from gameobjects.spatial import leave_time, swept_cells, sweep_time
+from gameobjects.tilemap import STOPS_BULLETS_ARRAY
+from settings.settings import Settings
+
+BULLET_SIZE = 10
+
+
+class BulletManager:
+    """
+    Struct-of-arrays store of all bullets in flight.
+
+    The manager is attached to the `EntityRegistry` as an index, which drops
+    the bullets when the registry is cleared; tanks spawn bullets through
+    `spawn` instead of creating `Bullet` objects. Bullets collide with tanks
+    other than their owner and with the tiles that stop bullets, the same
+    way `Bullet` does, but not with each other.
+
+    Attributes:
+    - objects_list (EntityRegistry): The registry of game objects.
+    - count (int): The number of bullets in flight.
+    - x, y (ndarray): The positions of the bullets.
+    - previous_x, previous_y (ndarray): The positions before the last tick,
+      used for interpolated drawing.
+    - vx, vy (ndarray): The velocities of the bullets, in pixels per tick.
+    - damage (ndarray): The damage dealt by each bullet.
+    - owner (ndarray): The index in `owners` of the tank that fired each
+      bullet.
+    - owners (list): The tanks that fired bullets.
+
+    Methods:
+    - spawn(owner, x, y, vx, vy, damage): Fires a new bullet.
+    - update(): Moves all bullets and resolves their hits.
+    - draw(alpha, camera): Draws the bullets within the view of the camera
+      and returns the drawn rects.
+    - add(obj), discard(obj), move(obj), clear(): Index protocol of the
+      registry.
+    """
+
+    def __init__(self, objects_list, capacity=256):
+        self.objects_list = objects_list
+        self.count = 0
+        self._allocate(capacity)
+        self.owners = []
+        self._owner_index = {}
+
+    def _allocate(self, capacity):
+        """Grow the arrays to `capacity` bullets, keeping live bullets."""
+        count = self.count
+        arrays = {}
+        for name, dtype in (('x', np.float64), ('y', np.float64),
+                            ('previous_x', np.float64),
+                            ('previous_y', np.float64),
+                            ('vx', np.float64), ('vy', np.float64),
+                            ('damage', np.int32), ('owner', np.int32)):
+            array = np.zeros(capacity, dtype=dtype)
+            if count:
+                array[:count] = getattr(self, name)[:count]
+            arrays[name] = array
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def spawn(self, owner, x, y, vx, vy, damage):
+        """Fire a bullet from `owner` at (x, y) with the given velocity."""
+        if self.count == len(self.x):
+            self._allocate(2 * len(self.x))
+        index = self._owner_index.get(owner)
+        if index is None:
+            index = self._owner_index[owner] = len(self.owners)
+            self.owners.append(owner)
+        i = self.count
+        self.x[i] = self.previous_x[i] = x
+        self.y[i] = self.previous_y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.damage[i] = damage
+        self.owner[i] = index
+        self.count += 1
+
+    def _stops_bullets(self, columns, rows):
+        """Tell for every (column, row) whether its tile stops bullets."""
+        tiles = self.objects_list.tiles
+        inside = (columns < tiles.columns) & (rows < tiles.rows)
+        found = tiles.tiles[np.minimum(rows, tiles.rows - 1),
+                            np.minimum(columns, tiles.columns - 1)]
+        return STOPS_BULLETS_ARRAY[found] & inside
+
+    def update(self):
+        """
+        Move all bullets and resolve their collisions.
+
+        Bullets leaving the map or the area simulated around the camera are
+        dropped. A bullet overlapping a tank
+        other than its owner damages the tank; otherwise a bullet
+        overlapping a tile that stops bullets damages the tile with the rank
+        of its owner.
+        Either way the bullet is removed and a `Bang` is spawned.
+
+        A bullet moving along an axis by no more than its size overlaps all
+        it crosses either before or after its move, so it is checked where
+        it ends. The others, faster or moving diagonally, could fly through
+        a tank or a tile: they are swept one by one by `_sweep`.
+        """
+        n = self.count
+        if not n:
+            return
+        x, y = self.x[:n], self.y[:n]
+        self.previous_x[:n] = x
+        self.previous_y[:n] = y
+        x += self.vx[:n]
+        y += self.vy[:n]
+
+        active = self.objects_list.camera.active
+        alive = ((x >= active.left) & (x <= active.right)
+                 & (y >= active.top) & (y <= active.bottom))
+        vx, vy = self.vx[:n], self.vy[:n]
+        swept = ((np.abs(vx) > BULLET_SIZE) | (np.abs(vy) > BULLET_SIZE)
+                 | ((vx != 0) & (vy != 0)))
+        checked = alive & ~swept
+
+        # Tanks: rect overlap test against every tank at once
+        owner = self.owner[:n]
+        tank_hit = np.full(n, -1, dtype=np.int32)
+        tanks = list(self.objects_list.of_kind('tank'))
+        for tank_number, tank in enumerate(tanks):
+            rect = tank.rect
+            hits = (checked & (tank_hit < 0)
+                    & (x < rect.right) & (x + BULLET_SIZE > rect.left)
+                    & (y < rect.bottom) & (y + BULLET_SIZE > rect.top))
+            index = self._owner_index.get(tank)
+            if index is not None:
+                hits &= owner != index
+            tank_hit[hits] = tank_number
+
+        # Tiles: look up the cells under the four corners of each bullet
+        ix = x.astype(np.int64)
+        iy = y.astype(np.int64)
+        left = np.maximum(ix // Settings.GRID_SIZE, 0)
+        right = np.maximum((ix + BULLET_SIZE - 1) // Settings.GRID_SIZE, 0)
+        top = np.maximum(iy // Settings.GRID_SIZE, 0)
+        bottom = np.maximum((iy + BULLET_SIZE - 1) // Settings.GRID_SIZE, 0)
+        stops = self._stops_bullets
+        block_hit = checked & (tank_hit < 0) & (
+            stops(left, top) | stops(right, top)
+            | stops(left, bottom) | stops(right, bottom)
+        )
+
+        for i in np.flatnonzero(tank_hit >= 0):
+            tanks[tank_hit[i]].damage(int(self.damage[i]), None)
+            self._explode(i, alive)
+        tiles = self.objects_list.tiles
+        for i in np.flatnonzero(block_hit):
+            for column, row in ((left[i], top[i]), (right[i], top[i]),
+                                (left[i], bottom[i]), (right[i], bottom[i])):
+                column, row = int(column), int(row)
+                if tiles.stops_bullets(column, row):
+                    tiles.damage(column, row, int(self.damage[i]),
+                                 self.owners[owner[i]].rank)
+                    self._explode(i, alive)
+                    break
+        for i in np.flatnonzero(swept):
+            self._sweep(i, alive, tanks)
+
+        self._compact(alive)
+
+    def _sweep(self, i, alive, tanks):
+        """
+        Resolve what bullet `i` hit first along its move.
+
+        The bullet is swept from its previous position: against the tanks
+        other than its owner, then through the cells it crosses until it
+        reaches the first of them or leaves the simulated area. A tank wins
+        over a tile touched at the same time, as in `update`. The bullet
+        explodes where it touched what it hit.
+        """
+        x, y = float(self.previous_x[i]), float(self.previous_y[i])
+        dx, dy = float(self.vx[i]), float(self.vy[i])
+        leave = leave_time(x, y, dx, dy, self.objects_list.camera.active)
+        owner = self.owners[self.owner[i]]
+        hit = None
+        hit_time = 1.0 if leave is None else leave
+        for tank in tanks:
+            if tank is not owner:
+                contact = sweep_time(x, y, BULLET_SIZE, BULLET_SIZE, dx, dy,
+                                     tank.rect)
+                if contact is not None and (
+                        contact < hit_time or
+                        hit is None and contact == hit_time):
+                    hit, hit_time = tank, contact
+        tiles = self.objects_list.tiles
+        for time, column, row in swept_cells(x, y, BULLET_SIZE, BULLET_SIZE,
+                                             dx, dy):
+            if time > hit_time or (hit is not None and time == hit_time):
+                break
+            if tiles.stops_bullets(column, row):
+                hit, hit_time = (column, row), time
+                break
+        if hit is None:
+            return
+
+        self.x[i] = x + dx * hit_time
+        self.y[i] = y + dy * hit_time
+        if isinstance(hit, tuple):
+            tiles.damage(*hit, int(self.damage[i]), owner.rank)
+        else:
+            hit.damage(int(self.damage[i]), None)
+        self._explode(i, alive)
+
+    def _explode(self, i, alive):
+        """Remove bullet `i` and spawn a Bang where it was."""
+        alive[i] = False
+        Bang.create(float(self.x[i]), float(self.y[i]), self.objects_list)
+
+    def _compact(self, alive):
+        """Drop the dead bullets, keeping the live ones at the front."""
+        n = self.count
+        kept = int(np.count_nonzero(alive))
+        if kept == n:
+            return
+        for name in ('x', 'y', 'previous_x', 'previous_y', 'vx', 'vy',
+                     'damage', 'owner'):
+            array = getattr(self, name)
+            array[:kept] = array[:n][alive]
+        self.count = kept
+
+    def draw(self, alpha=1.0, camera=None):
+        """
+        Draw the bullets, interpolated by `alpha`, return the rects.
+
+        Only the bullets within the view of `camera` and its margin are
+        drawn, relative to the view; all of them if no camera is given.
+        """
+        n = self.count
+        xs = self.previous_x[:n] + (self.x[:n] - self.previous_x[:n]) * alpha
+        ys = self.previous_y[:n] + (self.y[:n] - self.previous_y[:n]) * alpha
+        if camera is not None:
+            area = camera.area
+            shown = ((xs >= area.left) & (xs < area.right)
+                     & (ys >= area.top) & (ys < area.bottom))
+            xs = xs[shown] - camera.offset[0]
+            ys = ys[shown] - camera.offset[1]
+        circle = pygame.draw.circle
+        return [
+            circle(screen, 'yellow', (x, y), 2)
+            for x, y in zip(xs.tolist(), ys.tolist())
+        ]
+
+    def add(self, obj):
+        pass
+
+    def discard(self, obj):
+        pass
+
+    def move(self, obj):
+        pass
+
+    def clear(self):
+        """Drop all bullets."""
+        self.count = 0
+        self.owners = []
+        self._owner_index = {}
@@ -0,0 +1,87 @@
+"""
+camera.py: This module is part of the gameobjects package.
+
+This module contains the camera of the match: the part of the map shown on
+the screen. On a map the size of the screen the camera never moves; on a
+larger map it follows the tanks, and only what is on the screen, plus a
+margin around it, is drawn and simulated, so the cost of a frame does not
+grow with the size of the map.
+"""
+
+import pygame
+
+from settings.settings import Settings
+
+
+class Camera:
+    """
+    The view of the screen over the map.
+
+    The view is centered on the tanks and kept within the map. Tanks can
+    only move within the view, so both players always see their tank, and
+    the objects outside the view and its margin are neither drawn nor
+    updated. The view only depends on the positions of the tanks, so the
+    simulation stays deterministic whatever is drawn.
+
+    Attributes:
+    - world (Rect): The whole map, in pixels.
+    - view (Rect): The part of the map shown on the screen.
+    - margin (int): The width of the border around the view that is still
+      drawn and simulated, in pixels.
+    - area (Rect): The view and its margin.
+    - active (Rect): The part of the area within the map, where objects
+      are simulated.
+    - bounds (Rect): The part of the view within the map, where the tanks
+      can move.
+
+    Methods:
+    - set_world(width, height): Changes the size of the map.
+    - follow(points): Centers the view on points of the map.
+    - offset: The position of the view, subtracted from the positions on
+      the map to draw them on the screen.
+    - visible(rect): Tells whether a rect of the map is drawn.
+    """
+
+    def __init__(self, size=(Settings.SCREEN_WIDTH, Settings.SCREEN_HEIGHT),
+                 margin=2 * Settings.GRID_SIZE):
+        self.view = pygame.Rect((0, 0), size)
+        self.margin = margin
+        self.world = pygame.Rect(self.view)
+        self._place((0, 0))
+
+    def set_world(self, width, height):
+        """Make the map `width` by `height` pixels and show its corner."""
+        self.world = pygame.Rect(0, 0, width, height)
+        self._place(self.view.topleft)
+
+    def _place(self, topleft):
+        self.view.topleft = topleft
+        self.view.clamp_ip(self.world)
+        self.area = self.view.inflate(2 * self.margin, 2 * self.margin)
+        self.active = self.area.clip(self.world)
+        self.bounds = self.view.clip(self.world)
+
+    def follow(self, points):
+        """
+        Center the view on the mean of `points`, within the map.
+
+        Returns:
+            bool: True if the view moved.
+        """
+        points = list(points)
+        if not points:
+            return False
+        x = round(sum(point[0] for point in points) / len(points))
+        y = round(sum(point[1] for point in points) / len(points))
+        topleft = self.view.topleft
+        self._place((x - self.view.width // 2, y - self.view.height // 2))
+        return self.view.topleft != topleft
+
+    @property
+    def offset(self):
+        """The position of the view on the map."""
+        return self.view.topleft
+
+    def visible(self, rect):
+        """Return True if `rect` overlaps the view or its margin."""
+        return self.area.colliderect(rect)
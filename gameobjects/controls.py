@@ -0,0 +1,145 @@
+"""
+controls.py: This module is part of the gameobjects package.
+
+This module contains the controllers that drive the tanks. A controller
+tells a tank which of its keys are held down this tick: the keyboard
+controller reads the real keyboard, while the bot and scripted controllers
+produce inputs without a display, so the simulation can run headless.
+
+Every tick the controllers of all tanks are polled once and their inputs are
+packed into an input frame: one byte per tank, with one bit per action. The
+simulation only ever sees input frames, so a match can be replayed from its
+recorded frames.
+"""
+
+import json
+from functools import lru_cache
+from random import Random
+
+import pygame
+
+ACTIONS = ('left', 'right', 'up', 'down', 'shoot')
+
+
+class PressedKeys(frozenset):
+    """A set of held keys that can be indexed like `pygame.key.get_pressed`."""
+
+    def __getitem__(self, key):
+        return key in self
+
+
+def encode_keys(keys, move_input):
+    """Pack the keys of `move_input` held in `keys` into an action mask."""
+    mask = 0
+    for bit, key in enumerate(move_input):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+
+@lru_cache(maxsize=None)
+def decode_keys(mask, move_input):
+    """Return the keys of `move_input` held according to an action mask."""
+    return PressedKeys(
+        key for bit, key in enumerate(move_input) if mask & (1 << bit)
+    )
+
+
+def read_input_frame(tanks):
+    """
+    Poll the controller of every tank once.
+
+    Returns:
+        bytes: The input frame of the tick, the action mask of each tank in
+        the order of `tanks`.
+    """
+    return bytes(
+        encode_keys(tank.controller.get_pressed(), tank.move_input)
+        for tank in tanks
+    )
+
+
+class KeyboardController:
+    """Read the tank inputs from the keyboard."""
+
+    def get_pressed(self):
+        """Return the state of all keyboard keys."""
+        return pygame.key.get_pressed()
+
+
+class BotController:
+    """
+    A simple random bot.
+
+    The bot keeps driving in a random direction for a random number of
+    ticks, then picks a new one, and pulls the trigger now and then.
+
+    Attributes:
+    - move_input (tuple): The keys of the tank, in `ACTIONS` order.
+    - rng (Random): The random generator driving the bot.
+    """
+
+    def __init__(self, move_input, seed=None):
+        self.move_input = move_input
+        self.rng = Random(seed)
+        self.direction = None
+        self.ticks_left = 0
+
+    def get_pressed(self):
+        """Return the keys the bot holds this tick."""
+        if self.ticks_left <= 0:
+            self.direction = self.rng.choice(self.move_input[:4] + (None,))
+            self.ticks_left = self.rng.randint(10, 90)
+        self.ticks_left -= 1
+
+        keys = [self.direction] if self.direction is not None else []
+        if self.rng.random() < 0.05:
+            keys.append(self.move_input[4])
+        return PressedKeys(keys)
+
+
+class ScriptedController:
+    """
+    Replay a fixed script of inputs.
+
+    A script is a list of `[ticks, [action, ...]]` steps, where an action is
+    one of `ACTIONS`. Each step holds its actions for the given number of
+    ticks; the script starts over once it is finished. A script must hold
+    at least one step of one tick or more.
+
+    Attributes:
+    - move_input (tuple): The keys of the tank, in `ACTIONS` order.
+    - steps (list): The steps of the script.
+    """
+
+    def __init__(self, move_input, steps):
+        self.move_input = move_input
+        self.steps = [
+            (ticks, PressedKeys(
+                move_input[ACTIONS.index(action)] for action in actions
+            ))
+            for ticks, actions in steps
+        ]
+        if not any(ticks > 0 for ticks, _ in self.steps):
+            raise ValueError('a script needs a step of at least one tick')
+        self.step = 0
+        self.ticks_left = self.steps[0][0]
+
+    @classmethod
+    def from_file(cls, move_input, path, player):
+        """
+        Load the script of a player from a JSON file.
+
+        The file holds an object mapping player names ("player1",
+        "player2") to their list of steps.
+        """
+        with open(path, encoding='utf-8') as script_file:
+            return cls(move_input, json.load(script_file)[player])
+
+    def get_pressed(self):
+        """Return the keys held at the current step of the script."""
+        while self.ticks_left <= 0:
+            self.step = (self.step + 1) % len(self.steps)
+            self.ticks_left = self.steps[self.step][0]
+        self.ticks_left -= 1
+        return self.steps[self.step][1]
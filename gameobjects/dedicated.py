@@ -0,0 +1,288 @@
+"""
+dedicated.py: This module is part of the gameobjects package.
+
+This module contains the dedicated server, which hosts many online matches
+at once without a window. Matches are sharded across worker processes, one
+per core: each worker runs its matches on an asyncio tick scheduler and
+talks to their players on its own UDP port. The lobby, in the main process,
+pairs the players who ask for a match, creates the match on the least
+loaded worker and tells both players where to find it.
+"""
+
+import asyncio
+import queue
+import time
+from collections import OrderedDict
+
+from gameobjects.match import Match
+from gameobjects.netplay import NetHost
+from gameobjects.network import (
+    JOIN,
+    MATCH_FOUND,
+    PACKET_FIND_MATCH,
+    PACKET_JOIN,
+    PACKET_MATCH_FOUND
+)
+from settings.settings import Settings
+
+
+class DatagramSender:
+    """
+    Send datagrams through an asyncio datagram transport.
+
+    This gives the shared socket of a worker the `send` method `NetHost`
+    expects, and counts the traffic of the worker.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.bytes_sent = 0
+
+    def send(self, data, address):
+        self.bytes_sent += len(data)
+        self.transport.sendto(data, address)
+
+
+class ServerMatch:
+    """
+    A match hosted by a worker, both tanks driven by remote players.
+
+    The match starts over on the next seed whenever it ends, and is closed
+    once no input has arrived for `idle_timeout` seconds.
+
+    Attributes:
+    - match_id (int): The id the lobby gave the match.
+    - match (Match): The simulated match.
+    - net (NetHost): The network end of the match.
+    - tick (int): The number of ticks played.
+    - last_seen (float): When the last input of a player arrived.
+    """
+
+    def __init__(self, match_id, seed, sender, now):
+        self.match_id = match_id
+        self.match = Match()
+        self.match.start(seed)
+        self.net = NetHost(sender, self.match.objects_list, slots=(0, 1))
+        self.tick = 0
+        self.last_seen = now
+
+    def step(self):
+        """Play one tick and send its snapshot to the players."""
+        net = self.net
+        self.match.update(bytes((net.next_input(0), net.next_input(1))))
+        if self.match.is_over():
+            self.match.start(self.match.seed + 1)
+        self.tick += 1
+        net.send_snapshot(self.tick)
+
+
+class Shard(asyncio.DatagramProtocol):
+    """
+    A worker of the dedicated server.
+
+    Every tick of the scheduler plays one tick of all the matches of the
+    shard, then sleeps until the next tick is due. Datagrams are handled as
+    they arrive, between the ticks. The time from when a tick was due to
+    when its last snapshot was sent is recorded as the tick latency; when
+    the shard falls more than `max_lag` ticks behind, the missed ticks are
+    dropped rather than played in a burst.
+
+    Attributes:
+    - index (int): The index of the worker.
+    - matches (dict): The hosted matches by id.
+    - routes (dict): The match of every player address.
+    - tick_rate (int): The number of ticks per second.
+    - idle_timeout (float): The seconds without input after which a match
+      is closed.
+    - latencies (list): The tick latencies since the last report, in
+      seconds.
+    - busy (float): The time spent playing ticks since the last report.
+    - dropped (int): The number of ticks dropped since the last report.
+    - closed (int): The number of matches closed so far.
+
+    Methods:
+    - datagram_received(data, address): Routes a datagram to its match.
+    - run(commands, reports, report_interval): Runs the tick scheduler.
+    """
+
+    def __init__(self, index, tick_rate=Settings.FPS, idle_timeout=10.0,
+                 max_lag=5):
+        self.index = index
+        self.tick_rate = tick_rate
+        self.idle_timeout = idle_timeout
+        self.max_lag = max_lag
+        self.matches = {}
+        self.routes = {}
+        self.sender = None
+        self.clock = time.perf_counter
+        self.latencies = []
+        self.busy = 0.0
+        self.dropped = 0
+        self.closed = 0
+        self.bytes_received = 0
+
+    def connection_made(self, transport):
+        self.sender = DatagramSender(transport)
+
+    def datagram_received(self, data, address):
+        """Hand a datagram to the match of its sender."""
+        self.bytes_received += len(data)
+        if data[:1] == bytes((PACKET_JOIN,)) and len(data) == JOIN.size:
+            match = self.matches.get(JOIN.unpack(data)[1])
+            if match is not None:
+                self.routes[address] = match
+            return
+        match = self.routes.get(address)
+        if match is not None and match.net.handle(data, address):
+            match.last_seen = self.clock()
+
+    def create_match(self, match_id, seed):
+        self.matches[match_id] = ServerMatch(match_id, seed, self.sender,
+                                             self.clock())
+
+    def close_idle_matches(self, now):
+        """Close the matches none of the players has sent input to lately."""
+        for match in list(self.matches.values()):
+            if now - match.last_seen > self.idle_timeout:
+                del self.matches[match.match_id]
+                for address in match.net.players:
+                    self.routes.pop(address, None)
+                self.closed += 1
+
+    def read_commands(self, commands):
+        """Apply the commands of the lobby; return False on 'stop'."""
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                return True
+            if command[0] == 'stop':
+                return False
+            if command[0] == 'create':
+                self.create_match(*command[1:])
+
+    def report(self, reports):
+        """Send the measurements since the last report to the lobby."""
+        reports.put({
+            'worker': self.index,
+            'matches': len(self.matches),
+            'closed': self.closed,
+            'latencies': self.latencies,
+            'busy': self.busy,
+            'dropped': self.dropped,
+            'bytes_sent': self.sender.bytes_sent,
+            'bytes_received': self.bytes_received,
+        })
+        self.latencies = []
+        self.busy = 0.0
+        self.dropped = 0
+
+    async def run(self, commands, reports, report_interval=1.0):
+        """Play the ticks of the matches until the lobby says 'stop'."""
+        tick_time = 1 / self.tick_rate
+        clock = self.clock
+        deadline = next_report = clock()
+        while self.read_commands(commands):
+            delay = deadline - clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Let the datagrams that arrived meanwhile be handled
+                await asyncio.sleep(0)
+            start = clock()
+            for match in list(self.matches.values()):
+                match.step()
+            end = clock()
+            self.busy += end - start
+            self.latencies.append(end - deadline)
+            deadline += tick_time
+            if end - deadline > self.max_lag * tick_time:
+                missed = int((end - deadline) / tick_time)
+                self.dropped += missed
+                deadline += missed * tick_time
+            if end >= next_report:
+                self.close_idle_matches(end)
+                self.report(reports)
+                next_report = end + report_interval
+
+
+def run_shard(index, address, commands, reports, tick_rate=Settings.FPS,
+              idle_timeout=10.0):
+    """The entry point of a worker process."""
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        shard = Shard(index, tick_rate, idle_timeout)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: shard, local_addr=address
+        )
+        try:
+            await shard.run(commands, reports)
+        finally:
+            transport.close()
+
+    asyncio.run(serve())
+
+
+class Lobby(asyncio.DatagramProtocol):
+    """
+    Pair the players asking for a match.
+
+    Players ask again until they get an answer, so every answer is kept and
+    sent again if the same address asks twice.
+
+    Attributes:
+    - workers (list): The (port, command queue) of every worker.
+    - loads (list): The number of open matches of every worker.
+    - waiting (tuple): The address of the player waiting for an opponent.
+    - matches_created (int): The number of matches created.
+
+    Methods:
+    - datagram_received(data, address): Handles a request for a match.
+    - update_load(report): Takes the load of a worker from its report.
+    """
+
+    def __init__(self, workers, seed=0):
+        self.workers = workers
+        self.loads = [0] * len(workers)
+        self._created = [0] * len(workers)
+        self._closed = [0] * len(workers)
+        self.seed = seed
+        self.waiting = None
+        self.answers = OrderedDict()
+        self.matches_created = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if data[:1] != bytes((PACKET_FIND_MATCH,)):
+            return
+        answer = self.answers.get(address)
+        if answer is not None:
+            self.transport.sendto(answer, address)
+            return
+        if self.waiting is None or self.waiting == address:
+            self.waiting = address
+            return
+        worker = min(range(len(self.workers)), key=self.loads.__getitem__)
+        self.matches_created += 1
+        match_id = self.matches_created
+        port, commands = self.workers[worker]
+        commands.put(('create', match_id, self.seed + match_id))
+        self.loads[worker] += 1
+        self._created[worker] += 1
+        answer = MATCH_FOUND.pack(PACKET_MATCH_FOUND, match_id, port)
+        for player in (self.waiting, address):
+            self.answers[player] = answer
+            self.transport.sendto(answer, player)
+        self.waiting = None
+        while len(self.answers) > 4096:
+            self.answers.popitem(last=False)
+
+    def update_load(self, report):
+        """Count the matches a worker closed as no longer loading it."""
+        worker = report['worker']
+        self._closed[worker] = report['closed']
+        self.loads[worker] = self._created[worker] - self._closed[worker]
@@ -15,7 +15,7 @@ from gameobjects.pygame_ui import (
     screen,
     image_bangs,
     image_bonuses,
-    image_tank, sound_effects
+    image_tank, audio
 )
 
 
@@ -25,6 +25,8 @@ class Bang(GameObject):
 
     A class representing an explosion in a game.
 
+    Bangs are pooled: `Bang.create(...)` recycles a removed one.
+
     Attributes:
     - px (int): x-coordinate of the explosion's position.
     - py (int): y-coordinate of the explosion's position.
@@ -43,13 +45,21 @@ class Bang(GameObject):
     to the explosion.
 
     """
+    __slots__ = ('px', 'py', 'frame', 'image', 'rect', 'objects_list')
+    type = 'bang'
+    pooled = True
+
     def __init__(self, px, py, objects_list: list):
-        super().__init__(objects_list)
-        self.type = 'bang'
         self.px, self.py = px, py
         self.frame = 0
         self.image = image_bangs[0]
-        self.rect = self.image.get_rect(center=(self.px, self.py))
+        rect = getattr(self, 'rect', None)
+        if rect is None:
+            self.rect = self.image.get_rect(center=(self.px, self.py))
+        else:
+            rect.size = self.image.get_size()
+            rect.center = (self.px, self.py)
+        super().__init__(objects_list)
 
     def get_rect(self):
         """
@@ -83,17 +93,19 @@ class Bang(GameObject):
         if self.frame >= 3:
             self.objects_list.remove(self)
 
-    def draw(self):
+    def draw(self, alpha=1.0, offset=(0, 0)):
         """
         Draws an image onto the screen at a specific position.
 
         :param self: The current instance of the class.
-        :return: None
+        :param offset: The position of the view of the camera on the map.
+        :return: The area of the screen that was drawn on.
 
         """
         image = image_bangs[int(self.frame)]
-        rect = image.get_rect(center=(self.px, self.py))
-        screen.blit(image, rect)
+        rect = image.get_rect(center=(self.px - offset[0],
+                                      self.py - offset[1]))
+        return screen.blit(image, rect)
 
     def damage(self, value, rank=None):
         pass
@@ -148,16 +160,24 @@ class Bonus(GameObject):
     - damage(self, value, rank=None)
         Does nothing. This method is not implemented in the Bonus class.
 
+    Bonuses are pooled: `Bonus.create(...)` recycles a removed one.
     """
-    def __init__(self, px, py, bonus_index, objects_list: list):
-        super().__init__(objects_list)
-        self.type = 'bonus'
+    __slots__ = ('image', 'rect', 'timer', 'bonus_index', 'objects_list')
+    type = 'bonus'
+    pooled = True
 
+    def __init__(self, px, py, bonus_index, objects_list: list):
         self.image = image_bonuses[bonus_index]
-        self.rect = self.image.get_rect(center=(px, py))
+        rect = getattr(self, 'rect', None)
+        if rect is None:
+            self.rect = self.image.get_rect(center=(px, py))
+        else:
+            rect.size = self.image.get_size()
+            rect.center = (px, py)
 
         self.timer = 400
         self.bonus_index = bonus_index
+        super().__init__(objects_list)
 
     def update(self):
         """
@@ -188,6 +208,7 @@ class Bonus(GameObject):
             self.timer -= 1
         else:
             self.objects_list.remove(self)
+            return
 
         bonus_actions = {
             0: self.star,
@@ -212,9 +233,9 @@ class Bonus(GameObject):
             Return: None
 
         """
-        for obj in self.objects_list:
+        for obj in self.objects_list.nearby(self.rect):
             if obj.type == 'tank' and self.rect.colliderect(obj.rect):
-                sound_effects["star"].play()
+                audio.play("star")
                 if obj.rank < len(image_tank) - 1:
                     obj.rank += 1
                     obj.speed += 0.3
@@ -222,6 +243,7 @@ class Bonus(GameObject):
                 else:
                     pass
                 self.objects_list.remove(self)
+                return
 
     def bonus_tank(self):
         """
@@ -234,14 +256,15 @@ class Bonus(GameObject):
         Return:
         None
         """
-        for obj in self.objects_list:
+        for obj in self.objects_list.nearby(self.rect):
             if obj.type == 'tank' and self.rect.colliderect(obj.rect):
-                sound_effects["bonus"].play()
+                audio.play("bonus")
                 if obj.lives < 6:
                     obj.lives += 1
                 else:
                     pass
                 self.objects_list.remove(self)
+                return
 
     def bonus_helmet(self):
         """
@@ -251,31 +274,37 @@ class Bonus(GameObject):
         :param self: The current instance of the game object
         :return: None
         """
-        for obj in self.objects_list:
+        for obj in self.objects_list.nearby(self.rect):
             if obj.type == 'tank' and self.rect.colliderect(obj.rect):
-                sound_effects["bonus"].play()
+                audio.play("bonus")
                 if obj.hit_points < 9:
                     obj.hit_points += 1
                 else:
                     pass
                 self.objects_list.remove(self)
+                return
 
-    def draw(self):
+    def draw(self, alpha=1.0, offset=(0, 0)):
         """
         Draws the image on the screen object based on the timer.
 
         If the remainder of self.timer divided by 30 is less than 15,
         the image will be blitted onto the screen at the position specified
-        by self.rect.
+        by self.rect, minus `offset`.
 
         Parameters:
             self: The instance of the class.
+            offset (tuple): The position of the view of the camera on the
+            map.
 
         Returns:
-            None
+            Rect: The area of the screen that was drawn on, or None while
+            the bonus is blinked out.
         """
         if self.timer % 30 < 15:
-            screen.blit(self.image, self.rect)
+            return screen.blit(self.image,
+                               self.rect.move(-offset[0], -offset[1]))
+        return None
 
     def damage(self, value, rank=None):
         pass
@@ -0,0 +1,159 @@
+"""
+mapfile.py: This module is part of the gameobjects package.
+
+This module contains the map file format. A map file holds a small header
+followed by the tile layer, one byte per cell in row order, exactly as the
+`TileMap` keeps it in memory. Loading a map does not copy the layer: the
+file is memory-mapped copy-on-write and the tile map works on the mapped
+pages directly, so even a map many times the size of the screen loads in
+milliseconds, and the blocks destroyed during a match never change the
+file.
+
+A map file is laid out as:
+- the header: the magic bytes b'TMAP', the format version, the number of
+  columns and rows, and the cell each player starts on;
+- the tile layer, `columns * rows` bytes.
+"""
+
+import hashlib
+import mmap
+import struct
+
+import numpy as np
+
+from gameobjects.tilemap import BRICK, EMPTY, TILE_NAMES
+
+MAGIC = b'TMAP'
+VERSION = 1
+
+# Header: magic, version, columns, rows, column and row of the cell of
+# player 1, then of player 2.
+HEADER = struct.Struct('<4sHHHHHHH')
+
+# The smallest random map: the players start on two cells of the middle
+# row, below the two rows of the status bar, with a cell between them
+MIN_COLUMNS = 4
+MIN_ROWS = 4
+
+
+class MapError(Exception):
+    """Raised when a map file cannot be read."""
+
+
+class GameMap:
+    """
+    A map file.
+
+    Only the header is read when the map is opened; `tiles` maps the tile
+    layer each time a match starts on the map, so every match starts on the
+    map as it is saved.
+
+    Attributes:
+    - path (str): The path of the map file.
+    - columns (int): The number of columns of the map.
+    - rows (int): The number of rows of the map.
+    - spawns (tuple): The (column, row) of the cell of each player.
+
+    Methods:
+    - tiles(): Returns the tile layer, mapped copy-on-write.
+    - digest(): Returns a digest of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'rb') as map_file:
+                header = map_file.read(HEADER.size)
+                map_file.seek(0, 2)
+                size = map_file.tell()
+            (magic, version, self.columns, self.rows,
+             *spawns) = HEADER.unpack(header)
+        except (OSError, struct.error) as error:
+            raise MapError(f'cannot read map {path}: {error}') from error
+        if magic != MAGIC:
+            raise MapError(f'{path} is not a map file')
+        if version != VERSION:
+            raise MapError(f'unsupported map version {version}')
+        if size != HEADER.size + self.columns * self.rows:
+            raise MapError(f'{path} is truncated')
+        self.spawns = (tuple(spawns[:2]), tuple(spawns[2:]))
+        for column, row in self.spawns:
+            if not (column < self.columns and row < self.rows):
+                raise MapError('a player starts outside the map')
+
+    def tiles(self):
+        """
+        Map the tile layer of the file copy-on-write.
+
+        Returns:
+            memoryview: The tiles, `columns * rows` writable bytes. Writes
+            only change the memory of the process, never the file.
+
+        Raises:
+            MapError: If the layer holds an unknown tile type.
+        """
+        with open(self.path, 'rb') as map_file:
+            mapped = mmap.mmap(map_file.fileno(), 0,
+                               access=mmap.ACCESS_COPY)
+        tiles = memoryview(mapped)[HEADER.size:]
+        highest = np.frombuffer(tiles, dtype=np.uint8).max(initial=EMPTY)
+        if highest >= len(TILE_NAMES):
+            raise MapError(f'{self.path} holds an unknown tile type')
+        return tiles
+
+    def digest(self):
+        """
+        Return a digest of the file as it is now, spawns and tiles.
+
+        Returns:
+            bytes: A 16-byte digest.
+        """
+        with open(self.path, 'rb') as map_file:
+            return hashlib.blake2b(map_file.read(), digest_size=16).digest()
+
+
+def save_map(path, tiles, spawns):
+    """
+    Write a map file.
+
+    Parameters:
+        path (str): The path of the file.
+        tiles (ndarray): The tile types of the map, `rows x columns`.
+        spawns (tuple): The (column, row) of the cell of each player.
+    """
+    tiles = np.ascontiguousarray(tiles, dtype=np.uint8)
+    rows, columns = tiles.shape
+    with open(path, 'wb') as map_file:
+        map_file.write(HEADER.pack(MAGIC, VERSION, columns, rows,
+                                   *spawns[0], *spawns[1]))
+        map_file.write(tiles.tobytes())
+
+
+def random_map(columns, rows, seed=None, density=0.3, tile=BRICK):
+    """
+    Return the tiles and spawns of a random map.
+
+    About `density` of the cells below the status bar hold `tile`. The
+    players start in the middle of the map, a screen apart as on the
+    default map, on cells kept empty.
+
+    Returns:
+        tuple: The tiles, `rows x columns`, and the spawns.
+
+    Raises:
+        ValueError: If the map is smaller than `MIN_COLUMNS x MIN_ROWS`,
+        too small for the players to start apart.
+    """
+    if columns < MIN_COLUMNS or rows < MIN_ROWS:
+        raise ValueError(f'a {columns}x{rows} map is too small for two '
+                         f'players to start apart')
+    rng = np.random.default_rng(seed)
+    tiles = np.where(rng.random((rows, columns)) < density,
+                     tile, EMPTY).astype(np.uint8)
+    tiles[:2] = EMPTY
+    distance = min(10, columns // 2 - 1)
+    spawns = ((columns // 2 - distance, rows // 2),
+              (columns // 2 + distance, rows // 2))
+    for column, row in spawns:
+        tiles[row, column] = EMPTY
+    return tiles, spawns
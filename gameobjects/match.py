@@ -0,0 +1,268 @@
+"""
+match.py: This module is part of the gameobjects package.
+
+This module contains the match: the registry of its game objects, its
+timers, its random generator and its replay recorder. All the state of a
+match lives in its `Match` instance, so one process can run many matches
+side by side, as the dedicated server does. A match is played on a random
+map the size of the screen, or on a map file of any size.
+"""
+
+import os
+import random
+
+from gameobjects.controls import read_input_frame
+from gameobjects.gameobjects import Bonus
+from gameobjects.profiler import NullProfiler
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT, image_bonuses
+from gameobjects.regeneration import BrickRegenerator
+from gameobjects.registry import EntityRegistry
+from gameobjects.replay import ReplayRecorder
+from gameobjects.tank import Tank
+from gameobjects.tilemap import BRICK
+from settings.settings import Settings
+
+
+class Match:
+    """
+    A duel between two tanks on a map of blocks.
+
+    On a map larger than the screen the camera of the registry follows the
+    tanks, and the bonuses, the bangs and the regeneration of the blocks
+    only come to life around it.
+
+    Attributes:
+    - objects_list (EntityRegistry): The registry of the game objects.
+    - game_map (GameMap): The map file the matches are played on, None for
+      a random map the size of the screen.
+    - regenerator (BrickRegenerator): Rebuilds the blocks every minute.
+    - profiler (FrameProfiler): Times the phases of every tick.
+    - replay_dir (str): The directory the replays are saved to, empty to
+      record no replays.
+    - seed (int): The seed of the current match.
+    - game_timer (int): The number of ticks played in the current match.
+    - bonus_timer (int): The ticks left until the next bonus.
+    - recorder (ReplayRecorder): Records the inputs of the current match,
+      None when no replays are recorded.
+
+    Methods:
+    - start(seed, controllers): Starts a new match on a fresh map.
+    - update(frame): Advances the match by one tick.
+    - is_over(): Returns True once a tank has lost all of its lives.
+    - winner(): Returns the index of the winning tank.
+    - save_replay(): Writes the replay of the current match.
+    """
+
+    def __init__(self, objects_list=None, profiler=None, replay_dir='',
+                 game_map=None):
+        if objects_list is None:
+            objects_list = EntityRegistry()
+        self.objects_list = objects_list
+        self.game_map = game_map
+        self.regenerator = BrickRegenerator(objects_list)
+        self.profiler = profiler or NullProfiler()
+        self.replay_dir = replay_dir
+        self.seed = None
+        self.game_timer = 0
+        self.bonus_timer = 1
+        self.recorder = None
+
+    def create_objects(self, controllers=(None, None)):
+        """
+        Create the tanks of both players and put the bricks of the map on
+        random free cells, or load the map file and put the tanks on its
+        spawns.
+
+        Parameters:
+        controllers (tuple): The controllers of player 1 and player 2. None
+        means the player uses the keyboard.
+        """
+        if self.game_map is not None:
+            self.objects_list.load_map(self.game_map)
+            size = Settings.GRID_SIZE
+            positions = [(column * size, row * size)
+                         for column, row in self.game_map.spawns]
+        else:
+            positions = (Settings.PLAYER1_INIT_POSITION,
+                         Settings.PLAYER2_INIT_POSITION)
+        Tank(
+            Settings.RED_COLOR,
+            positions[0],
+            0,
+            PLAYER1_INPUT,
+            self.objects_list,
+            controllers[0]
+        )
+        Tank(
+            Settings.BLUE_COLOR,
+            positions[1],
+            0,
+            PLAYER2_INPUT,
+            self.objects_list,
+            controllers[1]
+        )
+        if self.game_map is None:
+            for _ in range(Settings.BLOCKS_COUNT):
+                self.objects_list.place_tile(BRICK)
+
+    def start(self, seed=None, controllers=(None, None)):
+        """
+        Start a new match on a fresh map.
+
+        The random generator of the match is seeded with `seed`, so the
+        same seed and the same inputs always play out the same match. When
+        `replay_dir` is set, the inputs of the match are recorded.
+
+        Parameters:
+        seed (int): The seed of the match, a random one if None.
+        controllers (tuple): The controllers of player 1 and player 2.
+
+        Returns:
+        int: The seed of the match.
+        """
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.game_timer = 0
+        self.bonus_timer = 1
+        self.objects_list.clear()
+        self.objects_list.rng.seed(seed)
+        self.regenerator.reset()
+        self.create_objects(controllers)
+        self.follow()
+        if self.replay_dir:
+            tiles = self.objects_list.tiles
+            self.recorder = ReplayRecorder(
+                seed,
+                self.objects_list.count('tank'),
+                self.objects_list.bullet_engine is not None,
+                (tiles.columns, tiles.rows),
+                self.game_map.digest() if self.game_map is not None else b''
+            )
+        else:
+            self.recorder = None
+        return seed
+
+    def save_replay(self):
+        """Write the replay of the current match to `replay_dir`."""
+        if self.recorder is None:
+            return None
+        replay = self.recorder.finish(self.objects_list)
+        os.makedirs(self.replay_dir, exist_ok=True)
+        path = os.path.join(self.replay_dir, f'{replay.seed}.replay')
+        replay.save(path)
+        return path
+
+    def update_objects(self):
+        """
+        Rebuild the blocks every minute.
+
+        The regeneration is spread over the following ticks,
+        `Settings.REGENERATION_BUDGET` blocks per tick, to avoid a
+        frame-time spike.
+        """
+        if self.game_timer % (60 * Settings.FPS) == 0:  # Каждую минуту
+            self.regenerator.start()
+        self.regenerator.step()
+
+    def follow(self):
+        """Center the camera on the tanks."""
+        self.objects_list.camera.follow(
+            tank.rect.center for tank in self.objects_list.of_kind('tank')
+        )
+
+    def update(self, frame=None):
+        """
+        Advance the match by one tick.
+
+        Centers the camera on the tanks, hands the input frame of the tick
+        to the tanks, counts down the bonus timer and spawns a bonus when it
+        runs out, rebuilds the blocks when needed and updates every game
+        object within the area of the camera. The camera only depends on
+        the tanks, so it is not part of the saved state of the match.
+
+        :param frame: The input frame of the tick, read from the controllers
+            of the tanks if None.
+        """
+        objects_list = self.objects_list
+        profiler = self.profiler
+        if objects_list.pool is not None:
+            # Objects removed last tick can be recycled from now on
+            objects_list.pool.recycle()
+        self.game_timer += 1
+        self.follow()
+        tanks = list(objects_list.of_kind('tank'))
+        if frame is None:
+            frame = read_input_frame(tanks)
+        if self.recorder is not None:
+            self.recorder.record(frame)
+        for tank, mask in zip(tanks, frame):
+            tank.apply_input(mask)
+        profiler.lap('input')
+
+        if self.bonus_timer > 0:
+            self.bonus_timer -= 1
+        else:
+            self.bonus_timer = self.generate_bonus()
+        profiler.lap('bonus_timer')
+
+        self.update_objects()
+        profiler.lap('update_objects')
+
+        for obj in objects_list.of_kind('tank'):
+            obj.update()
+        profiler.lap('update.tank')
+        for obj in objects_list.of_kind('bullet'):
+            obj.update()
+        profiler.lap('update.bullet')
+        if objects_list.bullet_engine is not None:
+            objects_list.bullet_engine.update()
+            profiler.lap('update.bullet_engine')
+        # Bonuses and bangs away from the camera wait until it comes back
+        active = objects_list.camera.active
+        for obj in objects_list.of_kind('bonus'):
+            if active.colliderect(obj.rect):
+                obj.update()
+        profiler.lap('update.bonus')
+        for obj in objects_list.of_kind('bang'):
+            if active.colliderect(obj.rect):
+                obj.update()
+        profiler.lap('update.bang')
+
+    def generate_bonus(self):
+        """
+        Generate a bonus object and set a random timer for the next bonus.
+
+        The bonus is placed on a random free cell on the screen, so it
+        never lands inside a block. No bonus is generated while there is no
+        free cell.
+
+        Returns:
+            int: The randomly generated bonus timer.
+        """
+        objects_list = self.objects_list
+        position = objects_list.occupancy.sample_free(
+            objects_list.camera.bounds
+        )
+        if position is not None:
+            Bonus.create(position[0] + Settings.GRID_SIZE // 2,
+                         position[1] + Settings.GRID_SIZE // 2,
+                         objects_list.rng.randint(0, len(image_bonuses) - 1),
+                         objects_list
+                         )
+        return objects_list.rng.randint(120, 240)
+
+    def is_over(self):
+        """Return True once a tank has lost all of its lives."""
+        for obj in self.objects_list.of_kind('tank'):
+            if obj.lives < 1:
+                return True
+        return False
+
+    def winner(self):
+        """Return the index of the tank that won, None while both live."""
+        tanks = list(self.objects_list.of_kind('tank'))
+        for index, tank in enumerate(tanks):
+            if tank.lives < 1:
+                return (index + 1) % len(tanks)
+        return None
@@ -0,0 +1,728 @@
+"""
+netplay.py: This module is part of the gameobjects package.
+
+This module contains the two ends of the online mode. The host runs the
+authoritative simulation: it applies the inputs of the remote player one per
+tick and sends a snapshot of the game every tick, as a delta from the last
+snapshot the client acknowledged. The client predicts its own tank from its
+inputs right away, corrects the prediction when a snapshot shows where the
+tank really is, and draws everything else a few ticks in the past,
+interpolated between the snapshots it received.
+"""
+
+import time
+from collections import deque
+
+import pygame
+
+from gameobjects.base import GameObject
+from gameobjects.network import (
+    KIND_BANG,
+    KIND_BONUS,
+    KIND_BULLET,
+    KIND_TANK,
+    KIND_TILE,
+    PACKET_INPUT,
+    PACKET_SNAPSHOT,
+    MAX_REDUNDANT_INPUTS,
+    ProtocolError,
+    decode_input,
+    decode_snapshot,
+    encode_input,
+    encode_snapshot
+)
+from gameobjects.pygame_ui import (
+    image_bangs,
+    image_bonuses,
+    screen,
+    tank_sprites
+)
+from gameobjects.tank import Tank
+from gameobjects.tilemap import EMPTY, TILE_NAMES
+from settings.settings import Settings
+
+PLAYER_COLORS = (Settings.RED_COLOR, Settings.BLUE_COLOR)
+BANG_FRAME_STEP = 0.3
+BONUS_LIFETIME = 400
+
+
+class RemotePlayer:
+    """
+    The inputs and acknowledgements of one client of a host.
+
+    Inputs are queued by sequence number and one is applied per tick; when
+    none has arrived yet the last one is held.
+
+    Attributes:
+    - address (tuple): The address of the client.
+    - slot (int): The index of the tank the client drives.
+    - max_delay (int): The most inputs kept queued; older ones are dropped
+      so the input delay of the client stays bounded.
+    - ack (int): The tick of the latest snapshot the client received.
+    - last_input (int): The sequence number of the last input applied.
+    - timestamp (float): The client timestamp of its newest input, echoed
+      in the snapshots.
+    - heard (int): The host tick the last packet of the client arrived
+      after.
+
+    Methods:
+    - receive(seq, ack, timestamp, masks): Queues the inputs of a packet.
+    - next_input(): Returns the action mask for the next tick.
+    """
+
+    def __init__(self, address, slot, max_delay=6):
+        self.address = address
+        self.slot = slot
+        self.max_delay = max_delay
+        self.inputs = {}
+        self.next_seq = None
+        self.newest_seq = 0
+        self.last_input = 0
+        self.last_mask = 0
+        self.ack = 0
+        self.timestamp = 0.0
+        self.heard = 0
+
+    def receive(self, seq, ack, timestamp, masks):
+        """Queue the inputs of a packet not applied yet."""
+        self.ack = max(self.ack, ack)
+        if seq > self.newest_seq:
+            self.newest_seq = seq
+            self.timestamp = timestamp
+        first = seq - len(masks) + 1
+        if self.next_seq is None:
+            self.next_seq = first
+        for offset, mask in enumerate(masks):
+            if first + offset >= self.next_seq:
+                self.inputs[first + offset] = mask
+
+    def next_input(self):
+        """
+        Return the action mask of the client for the next tick.
+
+        Inputs are applied in order. An input lost with all its redundant
+        copies is skipped, and the input of the last tick is held while the
+        next one has not arrived yet.
+        """
+        if not self.inputs:
+            return self.last_mask
+        # Keep the queue short, so a burst of late packets does not delay
+        # the inputs of the client for the rest of the match
+        self.next_seq = max(self.next_seq,
+                            self.newest_seq - self.max_delay + 1)
+        if self.next_seq not in self.inputs:
+            self.next_seq = min(
+                (seq for seq in self.inputs if seq >= self.next_seq),
+                default=self.next_seq
+            )
+        mask = self.inputs.pop(self.next_seq, None)
+        for seq in [seq for seq in self.inputs if seq < self.next_seq]:
+            del self.inputs[seq]
+        if mask is None:
+            return self.last_mask
+        self.last_input = self.next_seq
+        self.last_mask = mask
+        self.next_seq += 1
+        return mask
+
+
+class NetHost:
+    """
+    The authoritative end of an online match.
+
+    The host simulates the game with its registry; remote players drive the
+    tanks at the indexes in `slots`, each taken by the first new address an
+    input arrives from. Every tick the host captures the state of the game
+    once and sends each client the entities changed since the last snapshot
+    that client acknowledged. Only the tiles within the active area of the
+    camera are captured: the tanks cannot leave the view, so the clients
+    need no other tile to predict or draw the game. Clients that have not
+    been heard from for `history` ticks get no snapshots until they send
+    again.
+
+    Attributes:
+    - transport (UdpTransport): The transport the packets go through.
+    - objects_list (EntityRegistry): The registry of the simulated game.
+    - players (dict): The connected `RemotePlayer` of every address.
+    - free_slots (list): The tank indexes no client drives yet.
+    - snapshots (int): The number of snapshots sent.
+    - full_snapshots (int): The number of snapshots sent without a
+      baseline.
+
+    Methods:
+    - poll(): Receives the inputs of the clients.
+    - handle(data, address): Handles a datagram received from a client.
+    - next_input(slot): Returns the action mask of the remote player
+      driving a tank for the next tick.
+    - send_snapshot(tick): Sends the state of the game after a tick.
+    """
+
+    def __init__(self, transport, objects_list, slots=(1,), history=64,
+                 max_delay=6):
+        self.transport = transport
+        self.objects_list = objects_list
+        self.history = history
+        self.max_delay = max_delay
+        self.players = {}
+        self.free_slots = list(slots)
+        self._slots = {}
+        self.states = {}
+        self.entities = {}
+        self._next_id = 0
+        self._used_ids = set()
+        self.tick = 0
+        self.snapshots = 0
+        self.full_snapshots = 0
+
+    def poll(self):
+        """Receive the input packets of the clients."""
+        for data, address in self.transport.receive():
+            self.handle(data, address)
+
+    def handle(self, data, address):
+        """
+        Queue the inputs of an input packet.
+
+        Returns:
+            bool: False if the packet was not accepted: it is not a valid
+            input packet, or it comes from a new address while every slot
+            is taken.
+        """
+        if not data or data[0] != PACKET_INPUT:
+            return False
+        try:
+            packet = decode_input(data)
+        except ProtocolError:
+            return False
+        player = self.players.get(address)
+        if player is None:
+            if not self.free_slots:
+                return False
+            player = RemotePlayer(address, self.free_slots.pop(0),
+                                  self.max_delay)
+            self.players[address] = player
+            self._slots[player.slot] = player
+        player.receive(*packet)
+        player.heard = self.tick
+        return True
+
+    def next_input(self, slot=1):
+        """Return the action mask of the tank at index `slot`."""
+        player = self._slots.get(slot)
+        return player.next_input() if player is not None else 0
+
+    def capture(self, tick):
+        """
+        Return the state of the game after `tick`.
+
+        Returns:
+            dict: The record of every entity by id, see
+            `gameobjects.network.KIND_RECORDS`.
+        """
+        entities = {}
+        state = {}
+        for obj in self.objects_list:
+            known = self.entities.get(obj)
+            if known is None:
+                known = (self._allocate_id(), self._static_record(obj, tick))
+            entities[obj] = known
+            state[known[0]] = known[1]
+        active = self.objects_list.camera.active
+        for column, row, tile in self.objects_list.tiles.occupied(active):
+            key = (column, row, tile)
+            known = self.entities.get(key)
+            if known is None:
+                known = (self._allocate_id(), (KIND_TILE, column, row, tile))
+            entities[key] = known
+            state[known[0]] = known[1]
+        for player, tank in enumerate(self.objects_list.of_kind('tank')):
+            state[entities[tank][0]] = (
+                KIND_TANK, tank.rect.x, tank.rect.y, tank.direct, tank.rank,
+                tank.hit_points, tank.lives, round(tank.speed * 10), player
+            )
+        self.entities = entities
+        self._used_ids = set(state)
+        return state
+
+    def send_snapshot(self, tick):
+        """Send the state of the game after `tick` to every client."""
+        self.tick = tick
+        state = self.capture(tick)
+        self.states[tick] = state
+        self.states.pop(tick - self.history, None)
+        if not self.players:
+            return
+        tank_ids = [self.entities[tank][0]
+                    for tank in self.objects_list.of_kind('tank')]
+        tiles = self.objects_list.tiles
+        map_size = (tiles.columns, tiles.rows)
+        for player in self.players.values():
+            # A client silent for longer than the history has most likely
+            # left; it would only get full snapshots
+            if tick - player.heard > self.history:
+                continue
+            baseline = self.states.get(player.ack)
+            if baseline is None:
+                baseline_tick, baseline = 0, {}
+                self.full_snapshots += 1
+            else:
+                baseline_tick = player.ack
+            your_id = (tank_ids[player.slot]
+                       if player.slot < len(tank_ids) else 0)
+            self.transport.send(encode_snapshot(
+                tick, baseline_tick, state, baseline, player.last_input,
+                player.timestamp, your_id, map_size
+            ), player.address)
+            self.snapshots += 1
+
+    def _allocate_id(self):
+        # Ids wrap around, skipping the ids still in use, so a long match
+        # never gives a new entity the id of one the clients still show;
+        # 0 means "no entity"
+        while True:
+            self._next_id = self._next_id % 0xFFFF + 1
+            if self._next_id not in self._used_ids:
+                return self._next_id
+
+    @staticmethod
+    def _static_record(obj, tick):
+        """
+        Return the record of an entity that never changes.
+
+        Bullets, bonuses and bangs are sent with the tick they were seen at,
+        so the client can work out where they are, or which frame they show,
+        at any later tick. Tanks get their record every tick instead.
+        """
+        if obj.type == 'bullet':
+            return (KIND_BULLET, round(obj.parent_x), round(obj.parent_y),
+                    obj.bullet_x, obj.bullet_y, tick)
+        if obj.type == 'bonus':
+            return (KIND_BONUS, obj.rect.x, obj.rect.y, obj.bonus_index,
+                    tick + obj.timer)
+        if obj.type == 'bang':
+            return (KIND_BANG, round(obj.px), round(obj.py),
+                    tick - round(obj.frame / BANG_FRAME_STEP))
+        return None
+
+
+class RemoteTank(GameObject):
+    """
+    A tank of another player, drawn from the snapshots.
+
+    Attributes:
+    - color (tuple): The color of the player.
+    - rank, direct, hit_points, lives: The stats of the tank in the latest
+      snapshot.
+    - samples (deque): The recent (tick, x, y) positions of the tank.
+
+    Methods:
+    - push(tick, record): Adds the state of the tank in a snapshot.
+    - interpolate(tick): Moves the tank to where it was at `tick`.
+    - position(alpha): Returns the center of the tank.
+    """
+
+    def __init__(self, tick, record, objects_list):
+        self.type = 'tank'
+        self.samples = deque(maxlen=32)
+        self.sprite_key = None
+        self.push(tick, record)
+        self.rect = self.image.get_rect(topleft=(record[1], record[2]))
+        super().__init__(objects_list)
+
+    def push(self, tick, record):
+        """Add the state of the tank in the snapshot of `tick`."""
+        (_, x, y, self.direct, self.rank, self.hit_points, self.lives,
+         _, player) = record
+        self.color = PLAYER_COLORS[player % len(PLAYER_COLORS)]
+        if self.samples and self.samples[-1][0] >= tick:
+            return
+        self.samples.append((tick, x, y))
+        if self.sprite_key != (self.rank, self.direct):
+            self.sprite_key = (self.rank, self.direct)
+            self.image = tank_sprites[self.sprite_key]
+
+    def interpolate(self, tick):
+        """Move the tank to its position at `tick`."""
+        samples = self.samples
+        if tick >= samples[-1][0]:
+            x, y = samples[-1][1:]
+        elif tick <= samples[0][0]:
+            x, y = samples[0][1:]
+        else:
+            for index in range(len(samples) - 1, 0, -1):
+                if samples[index - 1][0] <= tick:
+                    break
+            tick0, x0, y0 = samples[index - 1]
+            tick1, x1, y1 = samples[index]
+            fraction = (tick - tick0) / (tick1 - tick0)
+            x = x0 + (x1 - x0) * fraction
+            y = y0 + (y1 - y0) * fraction
+        position = (round(x), round(y))
+        if self.rect.topleft != position:
+            self.rect.topleft = position
+            self.objects_list.moved(self)
+
+    def update(self):
+        pass
+
+    def position(self, alpha=1.0):
+        """
+        Return the center of the tank where it was interpolated to.
+
+        The tank is moved between snapshots by `interpolate`, so `alpha` is
+        only taken for the camera, which follows every tank alike.
+        """
+        return self.rect.center
+
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        """Draw the tank where it was interpolated to, minus `offset`."""
+        return screen.blit(self.image,
+                           self.rect.move(-offset[0], -offset[1]))
+
+    def damage(self, value, rank=None):
+        pass
+
+
+class RemoteBullet(GameObject):
+    """A bullet moving in a straight line from where it was first seen."""
+
+    def __init__(self, record, objects_list):
+        self.type = 'bullet'
+        _, self.x0, self.y0, self.vx, self.vy, self.tick0 = record
+        self.x, self.y = self.x0, self.y0
+        self.rect = pygame.Rect(self.x0, self.y0, 10, 10)
+        super().__init__(objects_list)
+
+    def interpolate(self, tick):
+        """Move the bullet to its position at `tick`."""
+        age = max(tick - self.tick0, 0)
+        self.x = self.x0 + self.vx * age
+        self.y = self.y0 + self.vy * age
+        self.rect.topleft = (round(self.x), round(self.y))
+        self.objects_list.moved(self)
+
+    def update(self):
+        pass
+
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        return pygame.draw.circle(
+            screen, 'yellow', (self.x - offset[0], self.y - offset[1]), 2
+        )
+
+    def damage(self, value, rank=None):
+        pass
+
+
+class RemoteBonus(GameObject):
+    """A bonus blinking until the tick it expires at."""
+
+    def __init__(self, record, objects_list):
+        self.type = 'bonus'
+        _, x, y, self.bonus_index, self.expires = record
+        self.image = image_bonuses[self.bonus_index]
+        self.rect = self.image.get_rect(topleft=(x, y))
+        self.timer = BONUS_LIFETIME
+        super().__init__(objects_list)
+
+    def interpolate(self, tick):
+        self.timer = max(int(self.expires - tick), 0)
+
+    def update(self):
+        pass
+
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        if self.timer % 30 < 15:
+            return screen.blit(self.image,
+                               self.rect.move(-offset[0], -offset[1]))
+        return None
+
+    def damage(self, value, rank=None):
+        pass
+
+
+class RemoteBang(GameObject):
+    """An explosion animated from the tick it started at."""
+
+    def __init__(self, record, objects_list):
+        self.type = 'bang'
+        _, self.px, self.py, self.tick0 = record
+        self.frame = 0
+        self.rect = image_bangs[0].get_rect(center=(self.px, self.py))
+        super().__init__(objects_list)
+
+    def interpolate(self, tick):
+        frame = int((tick - self.tick0) * BANG_FRAME_STEP)
+        self.frame = min(max(frame, 0), len(image_bangs) - 1)
+
+    def update(self):
+        pass
+
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        image = image_bangs[self.frame]
+        return screen.blit(image, image.get_rect(
+            center=(self.px - offset[0], self.py - offset[1])
+        ))
+
+    def damage(self, value, rank=None):
+        pass
+
+
+REMOTE_ENTITIES = {
+    KIND_BULLET: RemoteBullet,
+    KIND_BONUS: RemoteBonus,
+    KIND_BANG: RemoteBang,
+}
+
+
+class NetClient:
+    """
+    The remote end of an online match.
+
+    The client mirrors the game of the host in its own registry. Its tank is
+    a real `Tank`, moved by the local inputs as soon as they are read; every
+    snapshot puts it back where the host has it after the last input the
+    host applied, and the inputs the host has not applied yet are replayed
+    on top. The other entities are drawn `interpolation` ticks in the past,
+    between the snapshots received around that tick.
+
+    Attributes:
+    - transport (UdpTransport): The transport the packets go through.
+    - host (tuple): The address of the host.
+    - objects_list (EntityRegistry): The registry the game is mirrored in.
+    - move_input (tuple): The keys of the local tank, in `ACTIONS` order.
+    - interpolation (int): How many ticks behind the latest snapshot the
+      other entities are drawn.
+    - local_tank (Tank): The tank of the local player, None until the first
+      snapshot arrives.
+    - latest_tick (int): The tick of the latest snapshot received.
+    - rtt_samples (list): The round-trip times measured, in seconds.
+    - corrections (int): The number of snapshots that moved the local tank
+      away from where it was predicted.
+    - correction_distance (float): The total distance of the corrections,
+      in pixels.
+
+    Methods:
+    - tick(mask): Sends the input of a tick and predicts its effect.
+    - receive(): Applies the snapshots received.
+    - interpolate(alpha): Moves the other entities to the render time.
+    """
+
+    def __init__(self, transport, host, objects_list, move_input,
+                 interpolation=4, clock=time.perf_counter, history=64):
+        self.transport = transport
+        self.host = host
+        self.objects_list = objects_list
+        self.move_input = move_input
+        self.interpolation = interpolation
+        self.clock = clock
+        self.history = history
+        self.seq = 0
+        self.sent = deque(maxlen=MAX_REDUNDANT_INPUTS)
+        self.pending = deque()
+        self.predicted = {}
+        self.states = {}
+        self.applied = {}
+        self.entities = {}
+        self.animated = set()
+        self.local_id = 0
+        self.local_tank = None
+        self.latest_tick = 0
+        self.render_tick = 0.0
+        self.rtt_samples = []
+        self._echo = 0.0
+        self.snapshots = 0
+        self.corrections = 0
+        self.correction_distance = 0.0
+
+    def tick(self, mask):
+        """
+        Play the action mask of the next tick.
+
+        The snapshots received are applied first, then the input is sent to
+        the host together with the last few inputs, in case packets are
+        lost, and the local tank is moved by it right away, within the view
+        centered on the tanks.
+        """
+        self.receive()
+        self.seq += 1
+        self.sent.append(mask)
+        self.pending.append((self.seq, mask))
+        self.transport.send(
+            encode_input(self.seq, self.latest_tick, self.clock(),
+                         list(self.sent)),
+            self.host
+        )
+        if self.local_tank is not None:
+            # The host keeps the tanks within a view centered on them
+            # before it moves them; so does the prediction
+            self.objects_list.camera.follow(
+                tank.rect.center
+                for tank in self.objects_list.of_kind('tank')
+            )
+            self._predict(mask)
+            self.predicted[self.seq] = self.local_tank.rect.topleft
+
+        self.render_tick += 1
+        target = self.latest_tick - self.interpolation
+        if abs(self.render_tick - target) > self.interpolation:
+            self.render_tick = target
+        self.interpolate(0.0)
+
+    def receive(self):
+        """Apply the newest snapshot received, if any."""
+        newest = None
+        for data, address in self.transport.receive():
+            if address != self.host or not data:
+                continue
+            if data[0] != PACKET_SNAPSHOT:
+                continue
+            try:
+                snapshot = decode_snapshot(data, self.states)
+            except ProtocolError:
+                continue
+            if snapshot is None:
+                continue
+            tick, state = snapshot[:2]
+            self.states[tick] = state
+            self.states.pop(tick - self.history, None)
+            if tick > self.latest_tick:
+                self.latest_tick = tick
+                newest = snapshot
+        if newest is not None:
+            self._apply(*newest)
+
+    def interpolate(self, alpha):
+        """Move the other entities to where they are drawn this frame."""
+        tick = self.render_tick + alpha
+        for entity in self.animated:
+            entity.interpolate(tick)
+
+    def _apply(self, tick, state, last_input, timestamp, your_id, map_size):
+        """Mirror the state of a snapshot and reconcile the local tank."""
+        self.snapshots += 1
+        tiles = self.objects_list.tiles
+        if (tiles.columns, tiles.rows) != map_size:
+            self._resize(*map_size)
+        if timestamp and timestamp != self._echo:
+            self._echo = timestamp
+            self.rtt_samples.append(self.clock() - timestamp)
+        for entity_id in self.applied.keys() - state.keys():
+            self._remove(entity_id)
+        for entity_id, record in state.items():
+            kind = record[0]
+            entity = self.entities.get(entity_id)
+            previous = self.applied.get(entity_id)
+            if previous is not None and previous[0] != kind:
+                self._remove(entity_id)
+                entity = previous = None
+            if kind == KIND_TANK:
+                if entity_id == your_id:
+                    if not isinstance(entity, Tank):
+                        if entity is not None:
+                            self._remove(entity_id)
+                        self._create_local_tank(entity_id, record)
+                elif isinstance(entity, RemoteTank):
+                    entity.push(tick, record)
+                else:
+                    if entity is not None:
+                        self._remove(entity_id)
+                    entity = RemoteTank(tick, record, self.objects_list)
+                    self.entities[entity_id] = entity
+                    self.animated.add(entity)
+            elif entity is None or previous != record:
+                # Only tanks change; any other record that differs is a
+                # new entity that reused the id
+                self._remove(entity_id)
+                self.entities[entity_id] = self._create(record)
+        self.applied = state
+        if your_id in state:
+            self._reconcile(state[your_id], last_input)
+
+    def _resize(self, columns, rows):
+        """
+        Make the map as big as the map of the host, empty: the tiles near the
+        view come with the snapshots.
+        """
+        tiles = self.objects_list.tiles
+        tiles.load(bytearray(columns * rows), columns, rows)
+        self.objects_list.camera.set_world(columns * tiles.cell_size,
+                                           rows * tiles.cell_size)
+        for entity_id, entity in list(self.entities.items()):
+            if isinstance(entity, tuple):
+                del self.entities[entity_id]
+
+    def _create(self, record):
+        kind = record[0]
+        if kind == KIND_TILE:
+            # A tile is put on the map and kept as its record
+            _, column, row, tile = record
+            tiles = self.objects_list.tiles
+            if (column < tiles.columns and row < tiles.rows
+                    and tile < len(TILE_NAMES)):
+                tiles.set(column, row, tile)
+            return record
+        entity = REMOTE_ENTITIES[kind](record, self.objects_list)
+        self.animated.add(entity)
+        return entity
+
+    def _create_local_tank(self, entity_id, record):
+        player = record[8]
+        tank = Tank(PLAYER_COLORS[player % len(PLAYER_COLORS)],
+                    (record[1], record[2]), record[3], self.move_input,
+                    self.objects_list)
+        self.entities[entity_id] = self.local_tank = tank
+        self.local_id = entity_id
+        self.pending.clear()
+        self.predicted.clear()
+
+    def _remove(self, entity_id):
+        entity = self.entities.pop(entity_id, None)
+        if entity is None:
+            return
+        if isinstance(entity, tuple):
+            _, column, row, tile = entity
+            if self.objects_list.tiles.get(column, row) == tile:
+                self.objects_list.tiles.set(column, row, EMPTY)
+            return
+        if entity is self.local_tank:
+            self.local_tank = None
+        self.animated.discard(entity)
+        if entity in self.objects_list:
+            self.objects_list.remove(entity)
+
+    def _reconcile(self, record, last_input):
+        """
+        Put the local tank where the host has it and replay the inputs the
+        host has not applied yet.
+        """
+        tank = self.local_tank
+        (_, x, y, tank.direct, tank.rank, tank.hit_points, tank.lives,
+         speed, _) = record
+        tank.speed = speed / 10
+        while self.pending and self.pending[0][0] <= last_input:
+            self.pending.popleft()
+        predicted = self.predicted.get(last_input)
+        for seq in [seq for seq in self.predicted if seq <= last_input]:
+            del self.predicted[seq]
+
+        tank.change_tank_state()
+        tank.rect.topleft = (x, y)
+        tank.previous_center = tank.rect.center
+        self.objects_list.moved(tank)
+        for seq, mask in self.pending:
+            self._predict(mask)
+            self.predicted[seq] = tank.rect.topleft
+
+        if predicted is not None and predicted != (x, y):
+            self.corrections += 1
+            self.correction_distance += (
+                (predicted[0] - x) ** 2 + (predicted[1] - y) ** 2
+            ) ** 0.5
+
+    def _predict(self, mask):
+        """Move the local tank by one tick of input, without shooting."""
+        tank = self.local_tank
+        tank.previous_center = tank.rect.center
+        tank.apply_input(mask)
+        tank.change_tank_state()
+        tank.check_boundaries()
@@ -0,0 +1,296 @@
+"""
+network.py: This module is part of the gameobjects package.
+
+This module contains the transport and the wire format of the online mode.
+Datagrams are sent over UDP; `LinkConditioner` wraps a transport to add
+latency, jitter and packet loss, so the online mode can be tested over the
+loopback interface under realistic network conditions.
+
+During a match two kinds of packets are exchanged:
+- input packets, from the client to the host, carry the action masks of
+  the last few ticks of the client, so a lost packet is covered by the next
+  one, together with the last snapshot received and a timestamp used to
+  measure the round-trip time;
+- snapshot packets, from the host to the client, carry the entities that
+  changed since a snapshot the client acknowledged (or all of them when
+  there is no such snapshot), the entities removed since then, the last
+  input of the client the host has applied and the echoed timestamp.
+
+An entity is sent as its id, its kind and a fixed-size record of the fields
+of that kind. Bullets, bangs and bonuses are sent once, with the tick they
+were first seen: the client derives their position or animation frame from
+it, so only tanks and new or removed entities use bandwidth each tick. Each
+tile near the view of the host is an entity too, sent when it comes within
+the area the camera simulates and removed when it leaves the area or is
+destroyed. The map itself is never sent: the snapshot header only carries
+its size, so a snapshot holds at most the tiles of a screen and its margin
+and stays well below the size limit of a datagram whatever the size of the
+map.
+"""
+
+import heapq
+import random
+import socket
+import struct
+import time
+
+PACKET_INPUT = 1
+PACKET_SNAPSHOT = 2
+PACKET_FIND_MATCH = 3
+PACKET_MATCH_FOUND = 4
+PACKET_JOIN = 5
+
+# Matchmaking: a client asks the lobby of a dedicated server for a match
+# with a bare PACKET_FIND_MATCH byte; the lobby answers with the id of the
+# match and the port of the worker hosting it, and the client then joins
+# the match on that port before sending its inputs there.
+MATCH_FOUND = struct.Struct('<BIH')
+JOIN = struct.Struct('<BI')
+
+# Input packet header: type, newest input sequence number, last snapshot
+# tick received, client timestamp, number of action masks that follow.
+INPUT_HEADER = struct.Struct('<BIIdB')
+MAX_REDUNDANT_INPUTS = 8
+
+# Snapshot header: type, tick, baseline tick (0 for a full snapshot), last
+# input applied, echoed client timestamp, id of the client's tank, number of
+# columns and of rows of the map, number of changed and of removed entities.
+SNAPSHOT_HEADER = struct.Struct('<BIIIdHHHHH')
+ENTITY_HEADER = struct.Struct('<HB')
+REMOVED_ID = struct.Struct('<H')
+
+KIND_TANK = 0
+KIND_TILE = 1
+KIND_BULLET = 2
+KIND_BONUS = 3
+KIND_BANG = 4
+
+# The fields of each kind:
+# - tank: x, y, direction, rank, hit points, lives, speed * 10, player;
+# - tile: column, row, tile type;
+# - bullet: x, y, x and y velocity, tick it was at (x, y);
+# - bonus: x, y, bonus index, tick it appeared;
+# - bang: center x, center y, tick it appeared.
+KIND_RECORDS = {
+    KIND_TANK: struct.Struct('<hhBBbbBB'),
+    KIND_TILE: struct.Struct('<HHB'),
+    KIND_BULLET: struct.Struct('<hhhhI'),
+    KIND_BONUS: struct.Struct('<hhBI'),
+    KIND_BANG: struct.Struct('<hhI'),
+}
+
+
+class ProtocolError(Exception):
+    """Raised when a datagram cannot be decoded."""
+
+
+def encode_input(seq, ack, timestamp, masks):
+    """Return an input packet carrying the masks of inputs up to `seq`."""
+    masks = bytes(masks[-MAX_REDUNDANT_INPUTS:])
+    return INPUT_HEADER.pack(PACKET_INPUT, seq, ack, timestamp,
+                             len(masks)) + masks
+
+
+def decode_input(data):
+    """
+    Decode an input packet.
+
+    Returns:
+        tuple: The newest sequence number, the acknowledged snapshot tick,
+        the client timestamp and the masks, oldest first.
+    """
+    try:
+        _, seq, ack, timestamp, count = INPUT_HEADER.unpack_from(data)
+    except struct.error as error:
+        raise ProtocolError(str(error)) from error
+    masks = data[INPUT_HEADER.size:INPUT_HEADER.size + count]
+    if len(masks) != count:
+        raise ProtocolError('truncated input packet')
+    return seq, ack, timestamp, masks
+
+
+def encode_snapshot(tick, baseline_tick, state, baseline, last_input,
+                    timestamp, your_id, map_size):
+    """
+    Return a snapshot packet with the delta from `baseline` to `state`.
+
+    States map entity ids to `(kind, *fields)` tuples. Only the entities
+    that are new or changed since the baseline are written, followed by the
+    ids of the entities that no longer exist. `map_size` is the number of
+    columns and of rows of the map.
+    """
+    changed = [
+        (entity_id, record) for entity_id, record in state.items()
+        if baseline.get(entity_id) != record
+    ]
+    removed = [entity_id for entity_id in baseline if entity_id not in state]
+    parts = [SNAPSHOT_HEADER.pack(
+        PACKET_SNAPSHOT, tick, baseline_tick, last_input, timestamp,
+        your_id, *map_size, len(changed), len(removed)
+    )]
+    for entity_id, record in changed:
+        parts.append(ENTITY_HEADER.pack(entity_id, record[0]))
+        parts.append(KIND_RECORDS[record[0]].pack(*record[1:]))
+    for entity_id in removed:
+        parts.append(REMOVED_ID.pack(entity_id))
+    return b''.join(parts)
+
+
+def decode_snapshot(data, baselines):
+    """
+    Decode a snapshot packet against the states received before.
+
+    Parameters:
+        data (bytes): The packet.
+        baselines (dict): The states already received, by tick.
+
+    Returns:
+        tuple: The tick, the full state, the last input applied by the host,
+        the echoed timestamp, the id of the client's tank and the
+        (columns, rows) of the map, or None if the baseline of the delta is
+        unknown.
+    """
+    try:
+        (_, tick, baseline_tick, last_input, timestamp, your_id, columns,
+         rows, changed, removed) = SNAPSHOT_HEADER.unpack_from(data)
+        if baseline_tick:
+            baseline = baselines.get(baseline_tick)
+            if baseline is None:
+                return None
+            state = dict(baseline)
+        else:
+            state = {}
+        offset = SNAPSHOT_HEADER.size
+        for _ in range(changed):
+            entity_id, kind = ENTITY_HEADER.unpack_from(data, offset)
+            offset += ENTITY_HEADER.size
+            record = KIND_RECORDS[kind]
+            state[entity_id] = (kind,) + record.unpack_from(data, offset)
+            offset += record.size
+        for _ in range(removed):
+            state.pop(REMOVED_ID.unpack_from(data, offset)[0], None)
+            offset += REMOVED_ID.size
+    except (struct.error, KeyError) as error:
+        raise ProtocolError(f'bad snapshot packet: {error}') from error
+    return tick, state, last_input, timestamp, your_id, (columns, rows)
+
+
+class UdpTransport:
+    """
+    A non-blocking UDP socket that counts the traffic.
+
+    Attributes:
+    - socket (socket): The UDP socket.
+    - bytes_sent (int): The number of payload bytes sent.
+    - bytes_received (int): The number of payload bytes received.
+    - dropped (int): The number of datagrams the socket refused to send.
+
+    Methods:
+    - send(data, address): Sends a datagram.
+    - receive(): Returns the datagrams waiting, as (data, address) pairs.
+    - close(): Closes the socket.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.bind(address)
+        self.address = self.socket.getsockname()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.dropped = 0
+
+    def send(self, data, address):
+        """
+        Send a datagram to `address`, dropping it if the socket cannot take
+        it: the buffer is full, the peer is gone or the datagram is too big.
+        """
+        self.bytes_sent += len(data)
+        try:
+            self.socket.sendto(data, address)
+        except OSError:
+            self.dropped += 1
+
+    def receive(self):
+        """Return all datagrams received since the last call."""
+        datagrams = []
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, ConnectionError):
+                return datagrams
+            self.bytes_received += len(data)
+            datagrams.append((data, address))
+
+    def close(self):
+        self.socket.close()
+
+
+class LinkConditioner:
+    """
+    Delay and drop the datagrams sent through a transport.
+
+    Every datagram is dropped with probability `loss`, otherwise it is held
+    back for `latency` seconds plus a random jitter of up to `jitter`
+    seconds, so datagrams can also arrive out of order.
+
+    Attributes:
+    - transport (UdpTransport): The transport the datagrams go through.
+    - latency (float): The one-way delay, in seconds.
+    - jitter (float): The maximum extra delay, in seconds.
+    - loss (float): The probability of dropping a datagram.
+    - clock (callable): Returns the current time in seconds.
+    - bytes_sent (int): The number of payload bytes sent, dropped ones
+      included.
+
+    Methods:
+    - send(data, address): Queues a datagram.
+    - receive(): Sends the datagrams that are due and returns the datagrams
+      received.
+    - close(): Closes the transport.
+    """
+
+    def __init__(self, transport, latency=0.0, jitter=0.0, loss=0.0,
+                 clock=time.perf_counter, seed=None):
+        self.transport = transport
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.bytes_sent = 0
+        self._queue = []
+        self._order = 0
+
+    @property
+    def address(self):
+        return self.transport.address
+
+    @property
+    def bytes_received(self):
+        return self.transport.bytes_received
+
+    def send(self, data, address):
+        """Queue a datagram, or drop it with probability `loss`."""
+        # Dropped datagrams count as sent, as they would on a real link
+        self.bytes_sent += len(data)
+        if self.rng.random() < self.loss:
+            return
+        due = self.clock() + self.latency + self.rng.random() * self.jitter
+        self._order += 1
+        heapq.heappush(self._queue, (due, self._order, data, address))
+        self.flush()
+
+    def flush(self):
+        """Send the queued datagrams whose delay has elapsed."""
+        now = self.clock()
+        while self._queue and self._queue[0][0] <= now:
+            _, _, data, address = heapq.heappop(self._queue)
+            self.transport.send(data, address)
+
+    def receive(self):
+        self.flush()
+        return self.transport.receive()
+
+    def close(self):
+        self.transport.close()
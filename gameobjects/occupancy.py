@@ -0,0 +1,293 @@
+"""
+occupancy.py: This module is part of the gameobjects package.
+
+This module contains the occupancy index of the playing field. It counts how
+many objects overlap each grid cell and how many cells are free, so a free
+spot for a block, a tank or a bonus is drawn directly from the free cells
+instead of by trial and error, and a full map is detected right away.
+Cells holding a tile of the tile map count as occupied. The counts are kept
+in a flat array, so the occupancy of a map of a million cells is built from
+its tiles in a few milliseconds.
+
+The free cells of every chunk of `CHUNK x CHUNK` cells are counted too, so a
+free cell is drawn by chunk, looking one by one only at the cells along the
+edges of the area drawn from, whatever the size of the map and however few
+free cells the area has left. Which cell is drawn only depends on which
+cells are free, never on the order they became free in, so a saved game
+needs nothing but its tiles and objects to draw the same cells once it is
+restored.
+"""
+
+from array import array
+from random import Random
+
+import numpy as np
+
+from gameobjects.tilemap import EMPTY
+from settings.settings import Settings
+
+CHUNK = 8
+
+
+def _array(typecode, values):
+    """Return the items of a NumPy array as an `array` of `typecode`."""
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+    return result
+
+
+class Occupancy:
+    """
+    Occupancy map of the grid cells and the number of free cells.
+
+    Only the cells of the playing field are tracked: the first
+    `first_row` rows hold the status bar and are never handed out.
+
+    Attributes:
+    - columns (int): The number of columns of the grid.
+    - rows (int): The number of rows of the grid.
+    - first_row (int): The first row of the playing field.
+    - cell_size (int): The size of a cell in pixels.
+    - counts (array): The number of objects overlapping each cell, indexed
+      by `row * columns + column`.
+    - rng (Random): The random generator free cells are drawn with.
+
+    Methods:
+    - add(obj): Marks the cells overlapped by an object as occupied.
+    - discard(obj): Releases the cells of an object.
+    - move(obj): Refreshes the cells of an object after it moved.
+    - tile_changed(column, row, old, new): Occupies or releases the cell of
+      a tile put on or removed from the tile map.
+    - map_loaded(tile_map): Takes the size and the tiles of a new map.
+    - clear(): Marks all cells as free.
+    - is_free(column, row): Tells whether a cell is free.
+    - free_count(): Returns the number of free cells.
+    - sample_free(area): Returns the position of a random free cell.
+    """
+
+    def __init__(self, columns=Settings.GRID_WIDTH, rows=Settings.GRID_HEIGHT,
+                 first_row=2, cell_size=Settings.GRID_SIZE, rng=None):
+        self.columns = columns
+        self.rows = rows
+        self.first_row = first_row
+        self.cell_size = cell_size
+        self.rng = rng or Random()
+        self.counts = array('H', [0]) * (columns * rows)
+        self._free_count = 0
+        # The number of free cells of every chunk, row by row
+        self._chunk_free = array('q')
+        self._chunk_columns = 0
+        self._object_cells = {}
+        self.clear()
+
+    def _cells(self, rect):
+        """Return the indexes of the playing field cells overlapped by rect."""
+        size = self.cell_size
+        left = max(rect.left // size, 0)
+        top = max(rect.top // size, self.first_row)
+        right = min(max(rect.left, rect.right - 1) // size, self.columns - 1)
+        bottom = min(max(rect.top, rect.bottom - 1) // size, self.rows - 1)
+        return tuple(
+            row * self.columns + column
+            for row in range(top, bottom + 1)
+            for column in range(left, right + 1)
+        )
+
+    def _occupy(self, cell):
+        self.counts[cell] += 1
+        if self.counts[cell] == 1:
+            self._free_count -= 1
+            row, column = divmod(cell, self.columns)
+            self._chunk_free[row // CHUNK * self._chunk_columns
+                             + column // CHUNK] -= 1
+
+    def _release(self, cell):
+        self.counts[cell] -= 1
+        if self.counts[cell] == 0:
+            self._free_count += 1
+            row, column = divmod(cell, self.columns)
+            self._chunk_free[row // CHUNK * self._chunk_columns
+                             + column // CHUNK] += 1
+
+    def add(self, obj):
+        """Mark the cells overlapped by the object as occupied."""
+        cells = self._cells(obj.rect)
+        self._object_cells[obj] = cells
+        for cell in cells:
+            self._occupy(cell)
+
+    def discard(self, obj):
+        """Release the cells of the object if it is registered."""
+        cells = self._object_cells.pop(obj, None)
+        if cells is None:
+            return
+        for cell in cells:
+            self._release(cell)
+
+    def move(self, obj):
+        """Update the cells of an object whose rect has changed."""
+        old_cells = self._object_cells.get(obj)
+        if old_cells is None:
+            return
+        cells = self._cells(obj.rect)
+        if cells == old_cells:
+            return
+        self._object_cells[obj] = cells
+        for cell in cells:
+            self._occupy(cell)
+        for cell in old_cells:
+            self._release(cell)
+
+    def tile_changed(self, column, row, old, new):
+        """Occupy a cell a tile was put on, release it when it is removed."""
+        if row < self.first_row or (old == EMPTY) == (new == EMPTY):
+            return
+        if old == EMPTY:
+            self._occupy(row * self.columns + column)
+        else:
+            self._release(row * self.columns + column)
+
+    def map_loaded(self, tile_map):
+        """
+        Take the size of a new map and occupy the cells of its tiles.
+
+        The registered objects keep their cells.
+        """
+        self.columns, self.rows = tile_map.columns, tile_map.rows
+        occupied = (tile_map.tiles != EMPTY).astype(np.uint16)
+        occupied[:self.first_row] = 0
+        self.counts = _array('H', occupied)
+        for cells in self._object_cells.values():
+            for cell in cells:
+                self.counts[cell] += 1
+        self._count_free()
+
+    def _count_free(self):
+        """Count the free cells of the field and of every chunk."""
+        counts = np.frombuffer(self.counts, dtype=np.uint16)
+        free = np.flatnonzero(counts[self.first_row * self.columns:] == 0)
+        free += self.first_row * self.columns
+        self._free_count = free.size
+        self._chunk_columns = -(-self.columns // CHUNK)
+        chunk_rows = -(-self.rows // CHUNK)
+        rows, columns = np.divmod(free, self.columns)
+        chunks = rows // CHUNK * self._chunk_columns + columns // CHUNK
+        self._chunk_free = _array('q', np.bincount(
+            chunks, minlength=chunk_rows * self._chunk_columns
+        ).astype(np.int64))
+
+    def clear(self):
+        """Forget all objects and mark every cell of the field as free."""
+        self.counts = array('H', [0]) * (self.columns * self.rows)
+        self._object_cells.clear()
+        self._count_free()
+
+    def is_free(self, column, row):
+        """Return True if no object overlaps the given cell."""
+        return self.counts[row * self.columns + column] == 0
+
+    def free_count(self):
+        """Return the number of free cells of the playing field."""
+        return self._free_count
+
+    def sample_free(self, area=None):
+        """
+        Return the top-left pixel position of a random free cell.
+
+        Parameters:
+            area (Rect): If given, only the cells within this rect, in
+            pixels, are drawn from.
+
+        Returns:
+            tuple: The (x, y) position of the cell, or None if the playing
+            field, or the area, is full.
+        """
+        if not self._free_count:
+            return None
+        if area is None:
+            return self._sample_area(0, self.first_row, self.columns - 1,
+                                     self.rows - 1)
+        size = self.cell_size
+        return self._sample_area(
+            max(-(-area.left // size), 0),
+            max(-(-area.top // size), self.first_row),
+            min(area.right // size, self.columns) - 1,
+            min(area.bottom // size, self.rows) - 1
+        )
+
+    def _sample_area(self, left, top, right, bottom):
+        """
+        Draw a free cell of a range of columns and rows.
+
+        The free cells of the chunks wholly within the range are known from
+        their counts; the cells of the range outside those chunks, along its
+        edges, are looked at one by one. The edge cells come first, then
+        the cells of the chunks, in row order, so the cell drawn only
+        depends on which cells are free.
+        """
+        if left > right or top > bottom:
+            return None
+        counts = np.frombuffer(self.counts, dtype=np.uint16).reshape(
+            self.rows, self.columns
+        )
+        chunk_free = np.frombuffer(self._chunk_free, dtype=np.int64).reshape(
+            -1, self._chunk_columns
+        )
+        # The chunks wholly within the range; a chunk cut by the edge of the
+        # map, or by the status bar, whose cells are never counted as free,
+        # is whole if the range reaches the edge
+        chunk_left = -(-left // CHUNK)
+        chunk_top = 0 if top == self.first_row else -(-top // CHUNK)
+        chunk_right = (self._chunk_columns if right == self.columns - 1
+                       else (right + 1) // CHUNK)
+        chunk_bottom = (chunk_free.shape[0] if bottom == self.rows - 1
+                        else (bottom + 1) // CHUNK)
+        if chunk_left < chunk_right and chunk_top < chunk_bottom:
+            inner_left, inner_top = chunk_left * CHUNK, chunk_top * CHUNK
+            inner_right = min(chunk_right * CHUNK, self.columns)
+            inner_bottom = min(chunk_bottom * CHUNK, self.rows)
+            edges = ((top, inner_top, left, right + 1),
+                     (inner_bottom, bottom + 1, left, right + 1),
+                     (max(inner_top, top), inner_bottom, left, inner_left),
+                     (max(inner_top, top), inner_bottom, inner_right,
+                      right + 1))
+            chunks = np.cumsum(chunk_free[chunk_top:chunk_bottom,
+                                          chunk_left:chunk_right])
+        else:
+            edges = ((top, bottom + 1, left, right + 1),)
+            chunks = np.zeros(1, dtype=np.int64)
+
+        edge_cells = []
+        for row_start, row_end, column_start, column_end in edges:
+            if row_start >= row_end or column_start >= column_end:
+                continue
+            rows, columns = np.nonzero(
+                counts[row_start:row_end, column_start:column_end] == 0
+            )
+            edge_cells.append((rows + row_start) * self.columns
+                              + columns + column_start)
+        edge_count = sum(cells.size for cells in edge_cells)
+        total = edge_count + int(chunks[-1])
+        if not total:
+            return None
+        index = self.rng.randint(0, total - 1)
+        if index < edge_count:
+            edge_cells = np.concatenate(edge_cells)
+            row, column = divmod(int(edge_cells[index]), self.columns)
+        else:
+            # Find the chunk holding the cell, then the cell in the chunk
+            index -= edge_count
+            chunk = int(np.searchsorted(chunks, index, side='right'))
+            if chunk:
+                index -= int(chunks[chunk - 1])
+            chunk_row, chunk_column = divmod(chunk, chunk_right - chunk_left)
+            row_end = (chunk_top + chunk_row + 1) * CHUNK
+            row_start = max(row_end - CHUNK, top)
+            column_start = (chunk_left + chunk_column) * CHUNK
+            rows, columns = np.nonzero(
+                counts[row_start:row_end,
+                       column_start:column_start + CHUNK] == 0
+            )
+            row = row_start + int(rows[index])
+            column = column_start + int(columns[index])
+        return column * self.cell_size, row * self.cell_size
@@ -0,0 +1,62 @@
+"""
+pool.py: This module is part of the gameobjects package.
+
+This module contains the pool that recycles short-lived game objects.
+Bullets, bangs and bonuses only live for a few ticks, and a heavy
+firefight creates and drops dozens of them every second, each with its own
+rect. Instead of leaving the dropped objects to the garbage collector,
+the registry hands them to the pool, and the next object of the same class
+is a recycled one whose attributes and rect are simply set again.
+"""
+
+
+class EntityPool:
+    """
+    Free lists of removed game objects, per class.
+
+    An object removed from the registry is only recycled from the next
+    tick on, once `recycle` has been called: code still holding it during
+    the tick it was removed in, or comparing it with the objects it saw
+    before, never sees it come back as another object.
+
+    Attributes:
+    - capacity (int): The maximum number of objects kept per class.
+    - free (dict): The objects ready to be recycled, by class.
+    - released (list): The objects removed during the current tick.
+    - allocated (int): The number of objects that had to be allocated.
+    - reused (int): The number of objects recycled.
+
+    Methods:
+    - acquire(cls): Returns a recycled object of a class, or None.
+    - release(obj): Takes an object that was removed from the game.
+    - recycle(): Makes the objects removed so far available.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.free = {}
+        self.released = []
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, cls):
+        """Return a recycled object of class `cls`, or None if none is free."""
+        free = self.free.get(cls)
+        if free:
+            self.reused += 1
+            return free.pop()
+        self.allocated += 1
+        return None
+
+    def release(self, obj):
+        """Keep an object removed from the game for recycling."""
+        if len(self.released) < self.capacity:
+            self.released.append(obj)
+
+    def recycle(self):
+        """Make the objects released so far available to `acquire`."""
+        for obj in self.released:
+            free = self.free.setdefault(type(obj), [])
+            if len(free) < self.capacity:
+                free.append(obj)
+        self.released.clear()
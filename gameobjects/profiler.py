@@ -0,0 +1,204 @@
+"""
+profiler.py: This module is part of the gameobjects package.
+
+This module contains the frame profiler used to see where the time of a
+frame goes, and the on-screen overlay that shows its measurements. The
+profiler works like a stopwatch with laps: every call to `lap` charges the
+time elapsed since the previous lap to a named phase, so instrumenting a
+phase costs a single clock read. `NullProfiler` has the same interface and
+does nothing, for when profiling is disabled.
+"""
+
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+from gameobjects.registry import KINDS
+from settings.settings import Settings
+
+
+def percentile(values, fraction):
+    """Return the value below which `fraction` of `values` fall."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class FrameProfiler:
+    """
+    Measure the time spent in each phase of the recent frames.
+
+    Attributes:
+    - history (deque): The phase timings of the last frames, in seconds,
+      oldest first. Each entry maps a phase name to its time, plus the
+      'frame' total and the entity counts of the frame.
+    - phases (dict): The names of all phases seen so far, in order.
+    - export_path (str): The file the history is written to every time it
+      has been filled anew, empty to disable the rolling export.
+    - enabled (bool): Always True, the profiler measures.
+
+    Methods:
+    - begin_frame(): Starts measuring a new frame.
+    - lap(phase): Charges the time since the previous lap to a phase.
+    - end_frame(objects_list): Stores the frame with the entity counts of
+      the registry.
+    - percentile(key, fraction): Returns a percentile over the history.
+    - export(path): Writes the history to a .csv or .json file.
+    """
+
+    enabled = True
+
+    def __init__(self, history=Settings.PROFILER_HISTORY,
+                 export_path=Settings.PROFILER_EXPORT):
+        self.history = deque(maxlen=history)
+        self.phases = {}
+        self.export_path = export_path
+        self._frames = 0
+        self._frame = {}
+        self._frame_start = self._last = time.perf_counter()
+
+    def begin_frame(self):
+        """Start measuring a new frame."""
+        self._frame = {}
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time elapsed since the previous lap to `phase`."""
+        now = time.perf_counter()
+        frame = self._frame
+        frame[phase] = frame.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def end_frame(self, objects_list=None):
+        """Finish the frame and add it to the history."""
+        frame = self._frame
+        frame['frame'] = self._last - self._frame_start
+        for phase in frame:
+            self.phases.setdefault(phase, None)
+        if objects_list is not None:
+            for kind in KINDS:
+                frame['count.' + kind] = objects_list.count(kind)
+            if objects_list.bullet_engine is not None:
+                frame['count.bullet'] += objects_list.bullet_engine.count
+        self.history.append(frame)
+
+        self._frames += 1
+        if self.export_path and self._frames % self.history.maxlen == 0:
+            self.export(self.export_path)
+
+    def percentile(self, key, fraction):
+        """Return the `fraction` percentile of `key` over the history."""
+        return percentile([frame.get(key, 0.0) for frame in self.history],
+                          fraction)
+
+    def export(self, path):
+        """Write the history to `path`, as JSON or else as CSV."""
+        frames = list(self.history)
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as export_file:
+                json.dump(frames, export_file)
+            return
+        columns = list(dict.fromkeys(key for frame in frames
+                                     for key in frame))
+        with open(path, 'w', newline='', encoding='utf-8') as export_file:
+            writer = csv.DictWriter(export_file, columns, restval=0)
+            writer.writeheader()
+            writer.writerows(frames)
+
+
+class NullProfiler:
+    """A profiler that measures nothing, used when profiling is disabled."""
+
+    enabled = False
+
+    def begin_frame(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def end_frame(self, objects_list=None):
+        pass
+
+
+class PerformanceOverlay:
+    """
+    On-screen panel showing the measurements of a `FrameProfiler`.
+
+    The panel is rendered into a cached surface and refreshed only every
+    `refresh_frames` frames, so showing it costs a single blit most frames.
+
+    Attributes:
+    - profiler (FrameProfiler): The profiler whose data is shown.
+    - visible (bool): Whether the panel is drawn.
+    - position (tuple): The top-left corner of the panel on the screen.
+
+    Methods:
+    - toggle(): Shows or hides the panel.
+    - draw(surface): Draws the panel and returns its rect, or None while
+      hidden.
+    """
+
+    def __init__(self, profiler, refresh_frames=15,
+                 position=(5, 2 * Settings.GRID_SIZE + 5)):
+        self.profiler = profiler
+        self.refresh_frames = refresh_frames
+        self.position = position
+        self.visible = False
+        self.font = pygame.font.Font(None, 18)
+        self.surface = None
+        self._frames_left = 0
+
+    def toggle(self):
+        """Show the panel if it is hidden, hide it otherwise."""
+        self.visible = not self.visible
+        self._frames_left = 0
+
+    def _lines(self):
+        profiler = self.profiler
+        last = profiler.history[-1] if profiler.history else {}
+        lines = [
+            f"frame {last.get('frame', 0.0) * 1e3:6.2f} ms"
+            f"  p50 {profiler.percentile('frame', 0.5) * 1e3:6.2f}"
+            f"  p95 {profiler.percentile('frame', 0.95) * 1e3:6.2f}"
+            f"  p99 {profiler.percentile('frame', 0.99) * 1e3:6.2f}"
+        ]
+        for phase in profiler.phases:
+            if phase == 'frame':
+                continue
+            lines.append(
+                f"{phase:<16} p50 "
+                f"{profiler.percentile(phase, 0.5) * 1e3:6.3f}"
+                f"  p95 {profiler.percentile(phase, 0.95) * 1e3:6.3f}"
+            )
+        counts = [f"{key[len('count.'):]} {value}"
+                  for key, value in last.items()
+                  if key.startswith('count.')]
+        lines.append('  '.join(counts))
+        return lines
+
+    def _render(self):
+        lines = [self.font.render(line, True, Settings.GREEN_COLOR)
+                 for line in self._lines()]
+        width = max(line.get_width() for line in lines) + 8
+        height = sum(line.get_height() for line in lines) + 8
+        self.surface = pygame.Surface((width, height))
+        self.surface.set_alpha(200)
+        y = 4
+        for line in lines:
+            self.surface.blit(line, (4, y))
+            y += line.get_height()
+
+    def draw(self, surface):
+        """Draw the panel onto `surface` and return the drawn rect."""
+        if not self.visible:
+            return None
+        self._frames_left -= 1
+        if self._frames_left <= 0 or self.surface is None:
+            self._render()
+            self._frames_left = self.refresh_frames
+        return surface.blit(self.surface, self.position)
@@ -12,18 +12,23 @@ buttons, labels, and other interactive components.
 """
 
 import pygame
+from gameobjects.assets import AssetManager, LazyMapping
+from gameobjects.audio import AudioManager, NullAudio, SoundPolicy
 from settings.settings import Settings
 
-pygame.mixer.init()
 settings = Settings()
-screen = pygame.display.set_mode(
-    (
-        Settings.SCREEN_WIDTH,
-        Settings.SCREEN_HEIGHT
-    ),
-    flags=0,
-    depth=32
-)
+if settings.HEADLESS:
+    screen = pygame.Surface((Settings.SCREEN_WIDTH, Settings.SCREEN_HEIGHT))
+else:
+    pygame.mixer.init()
+    screen = pygame.display.set_mode(
+        (
+            Settings.SCREEN_WIDTH,
+            Settings.SCREEN_HEIGHT
+        ),
+        flags=0,
+        depth=32
+    )
 PLAYER1_INPUT = (
     pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s, pygame.K_SPACE
 )
@@ -31,105 +36,255 @@ PLAYER2_INPUT = (
     pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_RETURN
 )
 
-image_brick = [
-    pygame.image.load("images/block_brick.png"),
-    pygame.image.load("images/block_armor.png")
-]
-
-image_tank = [
-    pygame.image.load("images/tank_level_0.png"),
-    pygame.image.load("images/tank_level_1.png"),
-    pygame.image.load("images/tank_level_2.png"),
-    pygame.image.load("images/tank_level_3.png"),
-    pygame.image.load("images/tank_level_4.png"),
-    pygame.image.load("images/tank_level_5.png"),
-    pygame.image.load("images/tank_level_6.png"),
-    pygame.image.load("images/tank_level_7.png")
-]
-image_bangs = [
-    pygame.image.load("images/bang_0.png"),
-    pygame.image.load("images/bang_1.png"),
-    pygame.image.load("images/bang_2.png")
-]
-
-image_bonuses = [
-    pygame.image.load("images/bonus_star.png"),
-    pygame.image.load("images/bonus_tank.png"),
-    pygame.image.load("images/bonus_helmet.png"),
-    # pygame.image.load("images/bonus_bomb.png"),
-    # pygame.image.load("images/bonus_time.png"),
-    # pygame.image.load("images/bonus_shovel.png")
-]
-
-sound_effects = {
-    "star": pygame.mixer.Sound("sounds/star.wav"),
-    "bonus": pygame.mixer.Sound("sounds/bonus.wav"),
-    "impact": pygame.mixer.Sound("sounds/impact.wav"),
-    "shoot": pygame.mixer.Sound("sounds/shoot.wav"),
-    "track_long": pygame.mixer.Sound("sounds/track_long.wav"),
-    "tank_hit": pygame.mixer.Sound("sounds/tank_hit.wav"),
-    "block_hit": pygame.mixer.Sound("sounds/block_hit.wav")
-}
 
+class NullSound:
+    """Stand-in for sounds when running without audio."""
 
-class UI:
-    """Manage and update the User Interface (UI) elements of the game."""
+    def play(self, *args, **kwargs):
+        pass
 
-    def __init__(self, objects_list):
-        """Initialize the UI elements."""
-        pygame.init()
-        self.objects = objects_list
-        self.screen = pygame.display.set_mode(
-            (
-                settings.SCREEN_WIDTH,
-                settings.SCREEN_HEIGHT
-            ),
-            0,
-            32
-        )
-        self.font_ui = pygame.font.Font(None, 30)
-        self.clock = pygame.time.Clock()
+    def stop(self):
+        pass
 
-    def update(self):
+    def get_busy(self):
+        return False
+
+    def set_volume(self, *args):
         pass
 
-    def draw_tank(self, obj, index):
-        """Draw the tank on the gaming interface."""
-        pygame.draw.rect(
-            self.screen, obj.color,
-            (5 + index * 500, 5, 22, 22)
+
+assets = AssetManager(headless=settings.HEADLESS, silent_sound=NullSound())
+
+# Indexed by tile type, see gameobjects.tilemap
+image_tiles = assets.images([
+    "images/block_none.png",
+    "images/block_brick.png",
+    "images/block_armor.png",
+    "images/block_water.png",
+    "images/block_ice.png",
+    "images/block_bushes.png"
+])
+
+image_tank = assets.images([
+    f"images/tank_level_{rank}.png" for rank in range(8)
+])
+
+
+def build_tank_sprite(image, direct):
+    """
+    Rotate and scale a tank image for one of the directions in
+    `Settings.MOVES_INPUT`.
+
+    Parameters:
+        image (Surface): The tank image, facing up.
+        direct (int): The index of the direction the tank faces.
+
+    Returns:
+        Surface: The sprite of the tank.
+    """
+    sprite = pygame.transform.rotate(image, -direct * 90)
+    return pygame.transform.scale(
+        sprite,
+        (
+            sprite.get_width() - 5,
+            sprite.get_height() - 5
         )
+    )
+
+
+def load_tank_sprite(key):
+    """Return the sprite of a (rank, direction) key, built once."""
+    rank, direct = key
+    return assets.get(
+        ('tank_sprite', rank, direct),
+        lambda: build_tank_sprite(image_tank[rank], direct)
+    )
+
+
+tank_sprites = LazyMapping(load_tank_sprite, {
+    (rank, direct): (rank, direct)
+    for rank in range(len(image_tank))
+    for direct in range(len(Settings.MOVES_INPUT))
+})
+
+image_bangs = assets.images([
+    "images/bang_0.png",
+    "images/bang_1.png",
+    "images/bang_2.png"
+])
+
+image_bonuses = assets.images([
+    "images/bonus_star.png",
+    "images/bonus_tank.png",
+    "images/bonus_helmet.png",
+    # "images/bonus_bomb.png",
+    # "images/bonus_time.png",
+    # "images/bonus_shovel.png"
+])
+
+sound_files = {
+    "star": "sounds/star.wav",
+    "bonus": "sounds/bonus.wav",
+    "impact": "sounds/impact.wav",
+    "shoot": "sounds/shoot.wav",
+    "track_long": "sounds/track.wav",
+    "tank_hit": "sounds/tank_hit.wav",
+    "block_hit": "sounds/block_hit.wav"
+}
+
+sound_effects = assets.sounds(sound_files)
+
+sound_policies = {
+    "track_long": SoundPolicy(priority=1, max_voices=2, cooldown=0.0,
+                              volume=0.2),
+    "block_hit": SoundPolicy(priority=2, max_voices=2, cooldown=0.05,
+                             volume=1.0),
+    "shoot": SoundPolicy(priority=3, max_voices=2, cooldown=0.05,
+                         volume=1.0),
+    "tank_hit": SoundPolicy(priority=4, max_voices=2, cooldown=0.05,
+                            volume=1.0),
+    "impact": SoundPolicy(priority=5, max_voices=2, cooldown=0.0,
+                          volume=1.0),
+    "star": SoundPolicy(priority=5, max_voices=1, cooldown=0.0, volume=1.0),
+    "bonus": SoundPolicy(priority=5, max_voices=1, cooldown=0.0, volume=1.0)
+}
 
-        tank_life_img = pygame.transform.scale(
+if settings.HEADLESS:
+    audio = NullAudio()
+else:
+    audio = AudioManager(sound_effects, sound_policies,
+                         settings.AUDIO_CHANNELS)
+
+
+class StatusBar:
+    """
+    The status bar at the top of the screen, showing the state of the tanks.
+
+    The bar is rendered into a cached surface, which is only rendered again
+    when the hit points, lives or rank of a tank change. The rendered texts
+    and the life icon are cached as well, keyed on what they show.
+
+    Attributes:
+    - font (Font): The font of the hit points and the rank.
+    - surface (Surface): The rendered status bar.
+    - rect (Rect): The area of the screen covered by the bar.
+    - state (tuple): The values shown, one (color, hit_points, lives, rank)
+      tuple per tank.
+    - texts (dict): The rendered texts, keyed by (text, color).
+
+    Methods:
+    - text(text, color): Returns the rendered text.
+    - life_icon(): Returns the icon drawn for each life.
+    - update(tanks): Renders the bar again if the state of a tank changed.
+    - draw(surface, tanks): Draws the bar onto a surface.
+    """
+
+    def __init__(self, font,
+                 size=(Settings.SCREEN_WIDTH, 2 * Settings.GRID_SIZE)):
+        self.font = font
+        self.surface = pygame.Surface(size, 0, screen)
+        self.rect = self.surface.get_rect()
+        self.state = None
+        self.texts = {}
+
+    def text(self, text, color):
+        """Return `text` rendered in `color`, rendering it only once."""
+        key = (text, color)
+        rendered = self.texts.get(key)
+        if rendered is None:
+            rendered = self.texts[key] = self.font.render(text, 1, color)
+        return rendered
+
+    @staticmethod
+    def life_icon():
+        """Return the scaled-down tank image drawn for each life."""
+        return assets.get('life_icon', lambda: pygame.transform.scale(
             image_tank[0],
             (
                 image_tank[0].get_width() - 15,
                 image_tank[0].get_height() - 15
             )
-        )
+        ))
 
-        tank_life_img_width = tank_life_img.get_width()
-        lives = getattr(obj, 'lives')
+    def render_tank(self, index, color, hit_points, lives, rank):
+        """Render the state of the tank shown at position `index`."""
+        surface = self.surface
+        pygame.draw.rect(surface, color, (5 + index * 500, 5, 22, 22))
+
+        life_icon = self.life_icon()
         for i in range(lives):
             life_position = (
-                i * (tank_life_img.get_width() + 2) + 5 + index * 500,
-                5 + tank_life_img.get_height() + 2)
-            self.screen.blit(tank_life_img, life_position)
-
-        text = self.font_ui.render(str(getattr(obj, 'hit_points')), 1,
-                                   obj.color)
-        rect = text.get_rect(
-            center=(5 + index * 500 + 32 + 22, 5 + 11))
-        self.screen.blit(text, rect)
-
-        # Draw tank rank
-        rank_text = self.font_ui.render(f"Rank: {getattr(obj, 'rank')}", 1,
-                                        obj.color)
+                i * (life_icon.get_width() + 2) + 5 + index * 500,
+                5 + life_icon.get_height() + 2)
+            surface.blit(life_icon, life_position)
+
+        text = self.text(str(hit_points), color)
+        rect = text.get_rect(center=(5 + index * 500 + 32 + 22, 5 + 11))
+        surface.blit(text, rect)
+
+        rank_text = self.text(f"Rank: {rank}", color)
         rank_rect = rank_text.get_rect(
-            center=(5 + index * 500 + tank_life_img_width + 90, 5 + 11))
-        self.screen.blit(rank_text, rank_rect)
+            center=(5 + index * 500 + life_icon.get_width() + 90, 5 + 11))
+        surface.blit(rank_text, rank_rect)
+
+    def update(self, tanks):
+        """
+        Render the bar again if what it shows has changed.
+
+        Returns:
+            bool: True if the bar was rendered again.
+        """
+        state = tuple(
+            (tank.color, tank.hit_points, tank.lives, tank.rank)
+            for tank in tanks
+        )
+        if state == self.state:
+            return False
+        self.state = state
+        self.surface.fill(settings.BOARD_BACKGROUND_COLOR)
+        for index, tank_state in enumerate(state):
+            self.render_tank(index, *tank_state)
+        pygame.draw.line(
+            self.surface,
+            settings.WHITE_COLOR,
+            (0, 3 * settings.GRID_HEIGHT),
+            (settings.SCREEN_WIDTH, 3 * settings.GRID_HEIGHT)
+        )
+        return True
+
+    def draw(self, surface, tanks):
+        """
+        Draw the bar onto `surface`.
+
+        Returns:
+            Rect: The area of the bar if it changed since the last frame,
+            otherwise None.
+        """
+        changed = self.update(tanks)
+        surface.blit(self.surface, self.rect)
+        return self.rect if changed else None
+
+
+class UI:
+    """Manage and update the User Interface (UI) elements of the game."""
+
+    def __init__(self, objects_list):
+        """Initialize the UI elements."""
+        self.objects = objects_list
+        if settings.HEADLESS:
+            pygame.font.init()
+        else:
+            pygame.init()
+        # The window is opened once, when this module is imported
+        self.screen = screen
+        self.font_ui = pygame.font.Font(None, 30)
+        self.status_bar = StatusBar(self.font_ui)
+        self.clock = pygame.time.Clock()
+
+    def update(self):
+        pass
 
-    def draw_text(self, text, font, color, location):
+    def draw_text(self, text, font, color, location, surface=None):
         """
         Draws the specified text on the screen using the given font, color,
         and location.
@@ -141,31 +296,33 @@ class UI:
             values (red, green, blue).
             location (tuple): The location on the screen where the text should
             be drawn, specified as a tuple of x and y coordinates.
+            surface (pygame.Surface): The surface to draw on, the screen by
+            default.
 
         Returns:
             None
         """
         render = font.render(text, True, color)
         rect = render.get_rect(center=location)
-        self.screen.blit(render, rect)
+        (surface or self.screen).blit(render, rect)
 
-    def draw_title_screen(self):
-        """
-
-        Draws the title screen for the game.
+    def cached_screen(self, key, render):
+        """Return the full-screen surface cached under `key`, rendering it
+        with `render` the first time."""
+        return assets.get(('screen', key), render)
 
-        Parameters:
-            self: The current instance of the class.
+    def render_title_screen(self):
+        """
+        Render the title screen into a new surface.
 
         Returns:
-            None
-
+            pygame.Surface: The title screen.
         """
-
+        surface = pygame.Surface(self.screen.get_size(), 0, self.screen)
         font_name = pygame.font.get_default_font()
 
-        self.screen.fill(settings.BOARD_BACKGROUND_COLOR)
-        logo = pygame.image.load("images/game_logo.jpg")
+        surface.fill(settings.BOARD_BACKGROUND_COLOR)
+        logo = assets.image("images/game_logo.jpg")
         logo = pygame.transform.scale(
             logo,
             (
@@ -179,7 +336,7 @@ class UI:
                 settings.SCREEN_HEIGHT // 2
             )
         )
-        self.screen.blit(logo, rect.topleft)
+        surface.blit(logo, rect.topleft)
 
         font = pygame.font.Font(font_name, settings.FONT_SIZE)
         self.draw_text(
@@ -189,7 +346,8 @@ class UI:
             (
                 settings.SCREEN_WIDTH // 2,
                 settings.SCREEN_HEIGHT // 2 + 100
-            )
+            ),
+            surface
         )
 
         font = pygame.font.Font(font_name, settings.SMALL_FONT_SIZE)
@@ -199,15 +357,41 @@ class UI:
             (
                 settings.SCREEN_WIDTH // 2,
                 settings.SCREEN_HEIGHT // 2 + 200
-            )
+            ),
+            surface
+        )
+        return surface
+
+    def draw_title_screen(self):
+        """
+
+        Draws the title screen for the game.
+
+        The screen is rendered once and blitted from the cache afterwards.
+
+        Parameters:
+            self: The current instance of the class.
+
+        Returns:
+            None
+
+        """
+        self.screen.blit(
+            self.cached_screen('title', self.render_title_screen), (0, 0)
         )
         pygame.display.update()
 
-    def game_over(self, winner):
-        """Perform actions when the game is over."""
+    def render_game_over(self, winner):
+        """
+        Render the game over screen of a winner into a new surface.
+
+        Returns:
+            pygame.Surface: The game over screen.
+        """
+        surface = pygame.Surface(self.screen.get_size(), 0, self.screen)
         font_name = pygame.font.get_default_font()
         font = pygame.font.Font(font_name, 55)
-        self.screen.fill(settings.BOARD_BACKGROUND_COLOR)  # black color
+        surface.fill(settings.BOARD_BACKGROUND_COLOR)  # black color
         # Game Over Text
         self.draw_text(
             'Game Over',
@@ -216,7 +400,8 @@ class UI:
             (
                 settings.SCREEN_WIDTH // 2,
                 settings.SCREEN_HEIGHT // 2 + 5
-            )
+            ),
+            surface
         )
 
         self.draw_text(
@@ -226,7 +411,8 @@ class UI:
             (
                 settings.SCREEN_WIDTH // 2,
                 settings.SCREEN_HEIGHT // 2 + 80
-            )
+            ),
+            surface
         )
 
         font = pygame.font.Font(font_name, 25)
@@ -237,17 +423,30 @@ class UI:
             (
                 settings.SCREEN_WIDTH // 2,
                 settings.SCREEN_HEIGHT // 2 + 200
-            )
+            ),
+            surface
         )
+        return surface
 
-    def draw(self):
-        """Draw the UI elements on the gaming interface."""
-        for i, obj in enumerate(self.objects):
-            if obj.type == 'tank':
-                self.draw_tank(obj, i)
-        pygame.draw.line(
-            self.screen,
-            settings.WHITE_COLOR,
-            (0, 3 * settings.GRID_HEIGHT),
-            (settings.SCREEN_WIDTH, 3 * settings.GRID_HEIGHT)
+    def game_over(self, winner):
+        """Perform actions when the game is over.
+
+        The screen of each winner is rendered once and blitted from the
+        cache afterwards.
+        """
+        self.screen.blit(
+            self.cached_screen(
+                ('game_over', winner),
+                lambda: self.render_game_over(winner)
+            ),
+            (0, 0)
         )
+
+    def draw(self):
+        """
+        Draw the UI elements on the gaming interface.
+
+        Returns:
+            Rect: The area of the status bar if it changed, otherwise None.
+        """
+        return self.status_bar.draw(self.screen, self.objects.of_kind('tank'))
@@ -0,0 +1,107 @@
+"""
+regeneration.py: This module is part of the gameobjects package.
+
+This module contains the scheduler that periodically regenerates the blocks
+of the map. Instead of replacing every block within a single frame, the
+replacement is spread over many ticks with a fixed amount of work per tick,
+which removes the periodic frame-time spike. On a map larger than the
+screen only the blocks around the camera are regenerated, so the work does
+not grow with the size of the map.
+"""
+
+import time
+
+from gameobjects.tilemap import ARMOR, BRICK, EMPTY
+from settings.settings import Settings
+
+# The tiles that are regenerated; water, ice and bushes stay where they are
+REGENERATED = (BRICK, ARMOR)
+
+
+class BrickRegenerator:
+    """
+    Replace the blocks of the map a few at a time.
+
+    `start` schedules the cells of the current bricks and armor blocks
+    within the area of the camera, row by row; every call to `step` then
+    replaces at most `budget` of them with a new brick or, with a
+    probability of `armor_chance` percent, an armor block on a random free
+    cell of the area. The regenerator listens to the tile map,
+    so a block destroyed before its turn is simply dropped from the
+    schedule. The rolls are drawn from the random generator of the
+    registry.
+
+    Attributes:
+    - objects_list (EntityRegistry): The registry of game objects.
+    - budget (int): The maximum number of blocks replaced per tick.
+    - armor_chance (int): The chance, in percent, of placing an armor block.
+    - pending (dict): The (column, row) of the blocks still scheduled, in
+      order, as the keys of an ordered dict.
+    - worst_step_time (float): The longest time spent in `step`, in
+      seconds.
+
+    Methods:
+    - start(): Schedules the replacement of all current blocks.
+    - step(): Replaces the next batch of scheduled blocks.
+    - reset(): Cancels the regeneration in progress.
+    - tile_changed(column, row, old, new): Drops a block removed from the
+      map from the schedule.
+    - map_loaded(tile_map): Cancels the regeneration when the whole map is
+      replaced.
+    - active: Whether a regeneration is in progress.
+    """
+
+    def __init__(self, objects_list, budget=Settings.REGENERATION_BUDGET,
+                 armor_chance=30):
+        self.objects_list = objects_list
+        self.budget = budget
+        self.armor_chance = armor_chance
+        self.pending = {}
+        self.worst_step_time = 0.0
+        objects_list.tiles.add_listener(self)
+
+    @property
+    def active(self):
+        """True while scheduled blocks are waiting to be replaced."""
+        return bool(self.pending)
+
+    def start(self):
+        """Schedule the replacement of every block around the camera."""
+        area = self.objects_list.camera.area
+        self.pending = {
+            (column, row): None
+            for column, row, tile in self.objects_list.tiles.occupied(area)
+            if tile in REGENERATED
+        }
+
+    def reset(self):
+        """Forget the blocks still scheduled, e.g. when a match restarts."""
+        self.pending = {}
+
+    def tile_changed(self, column, row, old, new):
+        """Unschedule a block that was destroyed or replaced."""
+        if self.pending:
+            self.pending.pop((column, row), None)
+
+    def map_loaded(self, tile_map):
+        """Forget the scheduled blocks of the map that was replaced."""
+        self.reset()
+
+    def step(self):
+        """Replace up to `budget` scheduled blocks."""
+        if not self.pending:
+            return
+        start = time.perf_counter()
+        objects_list = self.objects_list
+        area = objects_list.camera.area
+        replaced = 0
+        while self.pending and replaced < self.budget:
+            column, row = next(iter(self.pending))
+            objects_list.tiles.set(column, row, EMPTY)
+            if objects_list.rng.randint(0, 100) < self.armor_chance:
+                objects_list.place_tile(ARMOR, area)
+            else:
+                objects_list.place_tile(BRICK, area)
+            replaced += 1
+        self.worst_step_time = max(self.worst_step_time,
+                                   time.perf_counter() - start)
@@ -0,0 +1,186 @@
+"""
+registry.py: This module is part of the gameobjects package.
+
+This module contains the entity registry that holds all game objects. The
+objects are kept in a separate container per kind (tanks, bullets, bonuses
+and effects), so adding and removing an object is O(1) and loops only have
+to touch the kinds of objects they care about. The terrain is not made of
+objects but of the tiles of the registry's tile map, and the camera tells
+which part of the map is on the screen and simulated.
+"""
+
+from random import Random
+
+from gameobjects.camera import Camera
+from gameobjects.occupancy import Occupancy
+from gameobjects.pool import EntityPool
+from gameobjects.spatial import SpatialHash
+from gameobjects.tilemap import TileMap
+
+KINDS = ('tank', 'bullet', 'bonus', 'bang')
+
+
+class EntityRegistry:
+    """A registry of game objects grouped by their `type`.
+
+    Each kind is stored in an insertion-ordered dict used as an ordered set.
+    Iterating the registry yields the kinds in `KINDS` order. Every kind is
+    snapshotted when iteration reaches it, so objects may add or remove
+    objects while the registry is iterated: objects added to a kind that has
+    not been reached yet are visited, objects removed before they are reached
+    are skipped.
+
+    Besides the grid and the occupancy map, other indexes (such as the bullet
+    engine) can be attached with `add_index`. An index is any object with
+    `add`, `discard`, `move` and `clear` methods; it is told about every
+    object added to, removed from or moved in the registry.
+
+    All randomness of the game is drawn from `rng`, so a match is fully
+    determined by its seed and the inputs of the players.
+
+    Attributes:
+        rng (Random): The random generator of the game.
+        grid (SpatialHash): The spatial hash used for neighborhood queries.
+        occupancy (Occupancy): The occupancy map used to find free cells.
+    It is a listener of the tile map, so cells holding a tile are not free.
+        tiles (TileMap): The terrain of the map.
+        camera (Camera): The part of the map on the screen, which also
+    bounds the tanks and the simulated objects.
+        bullet_engine (BulletManager): The vectorized bullet engine, if
+    bullets are simulated by one instead of as Bullet objects.
+        indexes (list): The indexes kept in sync with the registry.
+        pool (EntityPool): Recycles the removed objects of pooled classes,
+    None when pooling is disabled.
+        changes (dict): The number of times an object of each kind was added
+    or removed, so caches of a kind can tell when they are out of date.
+
+    Methods:
+        append(obj): Adds the object and registers it in the indexes.
+        remove(obj): Removes the object and unregisters it from the indexes.
+        clear(): Removes all objects and tiles.
+        of_kind(*kinds): Iterates over the objects of the given kinds.
+        count(kind): Returns the number of objects of a kind.
+        moved(obj): Refreshes the grid cells of an object after it moved.
+        add_index(index): Attaches an index and fills it with the objects.
+        attach_bullet_engine(bullet_engine): Attaches a bullet engine.
+        nearby(rect): Returns the objects registered near the given rect.
+        place_tile(tile, area): Puts a tile on a random free cell.
+        load_map(game_map): Puts the terrain of a map file.
+    """
+
+    def __init__(self, objects=(), seed=None, pooling=True):
+        self._kinds = {kind: {} for kind in KINDS}
+        self.rng = Random(seed)
+        self.grid = SpatialHash()
+        self.occupancy = Occupancy(rng=self.rng)
+        self.tiles = TileMap()
+        self.tiles.add_listener(self.occupancy)
+        self.camera = Camera()
+        self.indexes = [self.grid, self.occupancy]
+        self.bullet_engine = None
+        self.changes = dict.fromkeys(KINDS, 0)
+        self.pool = EntityPool() if pooling else None
+        for obj in objects:
+            self.append(obj)
+
+    def __iter__(self):
+        return self.of_kind(*self._kinds)
+
+    def __len__(self):
+        return sum(len(objects) for objects in self._kinds.values())
+
+    def __contains__(self, obj):
+        objects = self._kinds.get(obj.type)
+        return objects is not None and obj in objects
+
+    def append(self, obj):
+        """Add the object to the container of its kind."""
+        objects = self._kinds.get(obj.type)
+        if objects is None:
+            objects = self._kinds[obj.type] = {}
+        objects[obj] = None
+        self.changes[obj.type] = self.changes.get(obj.type, 0) + 1
+        for index in self.indexes:
+            index.add(obj)
+
+    def remove(self, obj):
+        """Remove the object, raise ValueError if it is not registered."""
+        try:
+            del self._kinds[obj.type][obj]
+        except KeyError:
+            raise ValueError(f'{obj!r} is not in the registry') from None
+        self.changes[obj.type] += 1
+        for index in self.indexes:
+            index.discard(obj)
+        if obj.pooled and self.pool is not None:
+            self.pool.release(obj)
+
+    def clear(self):
+        """Remove all objects and empty the tile map."""
+        self.tiles.clear()
+        for kind, objects in self._kinds.items():
+            objects.clear()
+            self.changes[kind] = self.changes.get(kind, 0) + 1
+        for index in self.indexes:
+            index.clear()
+
+    def of_kind(self, *kinds):
+        """Iterate over the objects of the given kinds, kind by kind."""
+        for kind in kinds:
+            objects = self._kinds.get(kind)
+            if not objects:
+                continue
+            for obj in list(objects):
+                if obj in objects:
+                    yield obj
+
+    def count(self, kind):
+        """Return the number of objects of the given kind."""
+        return len(self._kinds.get(kind, ()))
+
+    def moved(self, obj):
+        """Refresh the grid cells of an object after its rect changed."""
+        for index in self.indexes:
+            index.move(obj)
+
+    def add_index(self, index):
+        """Attach an index and register the objects already added."""
+        self.indexes.append(index)
+        for obj in self:
+            index.add(obj)
+
+    def attach_bullet_engine(self, bullet_engine):
+        """Simulate bullets with a vectorized engine from now on."""
+        self.add_index(bullet_engine)
+        self.bullet_engine = bullet_engine
+
+    def nearby(self, rect):
+        """Return the objects registered in the cells overlapped by rect."""
+        return self.grid.query(rect)
+
+    def place_tile(self, tile, area=None):
+        """
+        Put a tile on a random free cell, within `area` if given.
+
+        Returns:
+            tuple: The (column, row) of the cell, or None if the playing
+            field is full.
+        """
+        position = self.occupancy.sample_free(area)
+        if position is None:
+            return None
+        size = self.occupancy.cell_size
+        column, row = position[0] // size, position[1] // size
+        self.tiles.set(column, row, tile)
+        return column, row
+
+    def load_map(self, game_map):
+        """
+        Put the terrain of a map file and make the world its size.
+
+        Raises:
+            MapError: If the tile layer of the map cannot be read.
+        """
+        self.tiles.load(game_map.tiles(), game_map.columns, game_map.rows)
+        size = self.tiles.cell_size
+        self.camera.set_world(game_map.columns * size, game_map.rows * size)
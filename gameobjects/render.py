@@ -0,0 +1,177 @@
+"""
+render.py: This module is part of the gameobjects package.
+
+This module contains the renderers used by the game loop to draw a frame of
+gameplay. `FullRenderer` redraws the whole window every frame.
+`DirtyRectRenderer` only restores the background under the objects that were
+drawn in the previous frame and passes the changed areas to
+`pygame.display.update`, which greatly reduces the fill-rate on slow
+machines. The full renderer stays available as a fallback.
+
+Both renderers center the camera on the tanks before drawing and only draw
+the objects within its view and margin, at their position relative to the
+view, so the cost of a frame depends on what is on the screen, not on the
+size of the map.
+"""
+
+import pygame
+
+from gameobjects.profiler import NullProfiler
+
+# The kinds of objects drawn every frame, in drawing order. The tiles of the
+# map are part of the terrain layer.
+DYNAMIC_KINDS = ('bonus', 'tank', 'bullet', 'bang')
+DRAW_PHASES = {kind: 'draw.' + kind for kind in DYNAMIC_KINDS}
+
+
+class FullRenderer:
+    """
+    Redraw the whole window every frame.
+
+    Attributes:
+    - objects_list (EntityRegistry): The registry of game objects.
+    - terrain (TerrainLayer): The cached layer holding the tiles.
+    - ui (UI): The user interface drawn over the objects.
+    - profiler (FrameProfiler): Times the drawing phases.
+    - overlay (PerformanceOverlay): The profiler panel drawn on top of the
+      frame, or None.
+
+    Methods:
+    - follow(alpha): Centers the camera on the tanks as they are drawn.
+    - draw(alpha): Draws a frame and updates the whole display.
+    - invalidate(): Does nothing, every frame is a full redraw.
+    """
+
+    def __init__(self, objects_list, terrain, ui, profiler=None,
+                 overlay=None):
+        self.objects_list = objects_list
+        self.terrain = terrain
+        self.ui = ui
+        self.profiler = profiler or NullProfiler()
+        self.overlay = overlay
+
+    def follow(self, alpha):
+        """
+        Center the camera on the tanks, `alpha` of the way from their
+        previous to their current positions, and scroll the terrain.
+
+        Returns:
+            bool: True if the view moved, so the whole screen changed.
+        """
+        camera = self.objects_list.camera
+        camera.follow(tank.position(alpha)
+                      for tank in self.objects_list.of_kind('tank'))
+        return self.terrain.scroll(camera.offset)
+
+    def draw_objects(self, alpha):
+        """
+        Draw the dynamic objects within the view of the camera kind by kind
+        and return their rects.
+        """
+        profiler = self.profiler
+        camera = self.objects_list.camera
+        visible = camera.visible
+        offset = camera.offset
+        drawn_rects = []
+        for kind in DYNAMIC_KINDS:
+            for obj in self.objects_list.of_kind(kind):
+                if visible(obj.rect):
+                    rect = obj.draw(alpha, offset)
+                    if rect:
+                        drawn_rects.append(rect)
+            profiler.lap(DRAW_PHASES[kind])
+        if self.objects_list.bullet_engine is not None:
+            drawn_rects += self.objects_list.bullet_engine.draw(
+                alpha, camera
+            )
+            profiler.lap('draw.bullet_engine')
+        return drawn_rects
+
+    def draw_ui(self):
+        """
+        Draw the HUD and the profiler overlay.
+
+        Returns:
+            list: The rects of the HUD, if it changed, and of the overlay.
+        """
+        rects = [self.ui.draw()]
+        self.profiler.lap('ui.draw')
+        if self.overlay is not None:
+            rects.append(self.overlay.draw(self.ui.screen))
+        return [rect for rect in rects if rect]
+
+    def draw(self, alpha=1.0):
+        """Draw the terrain, the objects, the tiles covering them and the UI,
+        then flip the display.
+
+        `alpha` is the fraction of the current tick elapsed, passed on to
+        the objects to interpolate their positions.
+        """
+        self.follow(alpha)
+        self.terrain.pop_dirty()
+        self.terrain.draw()
+        self.profiler.lap('fill')
+        self.draw_objects(alpha)
+        self.terrain.draw_covers()
+        self.draw_ui()
+        pygame.display.update()
+        self.profiler.lap('display.update')
+
+    def invalidate(self):
+        pass
+
+
+class DirtyRectRenderer(FullRenderer):
+    """
+    Redraw only the parts of the window that changed.
+
+    Every frame the background is restored from the terrain layer under the
+    rects drawn in the previous frame and under the terrain tiles changed
+    since then. All moving objects and the HUD are drawn again and only the
+    union of the old and new rects is sent to the display. A frame where
+    the camera scrolled is redrawn in full. Covering tiles
+    are drawn again over the objects every frame, so an object moving
+    under one stays hidden. The HUD is opaque
+    and only sent to the display when it changed.
+
+    Attributes:
+    - previous_rects (list): The rects drawn in the previous frame.
+    - full_redraw (bool): Whether the next frame has to redraw everything.
+
+    Methods:
+    - draw(alpha): Draws a frame and updates the changed areas of the
+      display.
+    - invalidate(): Requests a full redraw, e.g. after another screen was
+      shown.
+    """
+
+    def __init__(self, objects_list, terrain, ui, profiler=None,
+                 overlay=None):
+        super().__init__(objects_list, terrain, ui, profiler, overlay)
+        self.previous_rects = []
+        self.full_redraw = True
+
+    def draw(self, alpha=1.0):
+        """Restore the background under changed areas and redraw them."""
+        if self.follow(alpha) or self.full_redraw:
+            self.terrain.pop_dirty()
+            self.terrain.draw()
+            dirty_rects = [self.ui.screen.get_rect()]
+            self.full_redraw = False
+        else:
+            dirty_rects = self.previous_rects + self.terrain.pop_dirty()
+            for rect in dirty_rects:
+                self.terrain.restore(rect)
+        self.profiler.lap('fill')
+
+        drawn_rects = self.draw_objects(alpha)
+        self.terrain.draw_covers()
+        drawn_rects += self.draw_ui()
+
+        pygame.display.update(dirty_rects + drawn_rects)
+        self.previous_rects = drawn_rects
+        self.profiler.lap('display.update')
+
+    def invalidate(self):
+        """Redraw the whole window on the next frame."""
+        self.full_redraw = True
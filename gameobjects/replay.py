@@ -0,0 +1,192 @@
+"""
+replay.py: This module is part of the gameobjects package.
+
+This module contains the replay recorder and the replay file format. All
+randomness of a match comes from the random generator of the registry and
+all input from the per-tick input frames, so a match is fully described by
+its seed and its input frames; replaying them re-runs the match exactly.
+
+A replay file starts with a fixed header: the magic bytes b'TNKR', the
+format version, the seed, the number of tanks, the flags of the simulation
+modes, the number of ticks, a digest of the final state of the match, all
+zeros if unknown, and the map the match was played on: its number of
+columns and rows and the digest of its map file, all zeros for the random
+map of the seed. The input frames follow, one byte per tank and tick.
+
+The same inputs only replay the match on the same map, so a replay is
+refused on any other map.
+"""
+
+import hashlib
+import struct
+
+from settings.settings import Settings
+
+MAGIC = b'TNKR'
+VERSION = 2
+HEADER = struct.Struct('<4sHqBBI16sHH16s')
+FLAG_VECTORIZED_BULLETS = 1
+DEFAULT_MAP_SIZE = (Settings.GRID_WIDTH, Settings.GRID_HEIGHT)
+
+
+class ReplayError(Exception):
+    """Raised when a replay file cannot be read."""
+
+
+class Replay:
+    """
+    The seed and the input frames of a match.
+
+    Attributes:
+    - seed (int): The seed of the random generator of the match.
+    - tanks (int): The number of tanks, and of bytes in every frame.
+    - vectorized_bullets (bool): Whether the bullets were simulated by the
+      vectorized bullet engine.
+    - frames (list): The input frames of the match, one per tick.
+    - digest (bytes): The digest of the final state of the match, empty if
+      unknown.
+    - map_size (tuple): The number of columns and rows of the map.
+    - map_digest (bytes): The digest of the map file, empty for the random
+      map of the seed.
+
+    Methods:
+    - save(path): Writes the replay to a file.
+    - load(path): Reads a replay from a file.
+    - check_map(game_map): Tells whether a map is the map of the replay.
+    """
+
+    def __init__(self, seed, tanks, frames=None, digest=b'',
+                 vectorized_bullets=False, map_size=DEFAULT_MAP_SIZE,
+                 map_digest=b''):
+        self.seed = seed
+        self.tanks = tanks
+        self.vectorized_bullets = vectorized_bullets
+        self.frames = frames if frames is not None else []
+        self.digest = digest
+        self.map_size = tuple(map_size)
+        self.map_digest = map_digest
+
+    def save(self, path):
+        """Write the replay to `path`."""
+        with open(path, 'wb') as replay_file:
+            replay_file.write(HEADER.pack(
+                MAGIC, VERSION, self.seed, self.tanks,
+                FLAG_VECTORIZED_BULLETS if self.vectorized_bullets else 0,
+                len(self.frames),
+                self.digest.ljust(16, b'\0'),
+                *self.map_size,
+                self.map_digest.ljust(16, b'\0')
+            ))
+            replay_file.write(b''.join(self.frames))
+
+    @classmethod
+    def load(cls, path):
+        """Read the replay stored in `path`."""
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        if len(data) < HEADER.size:
+            raise ReplayError(f'{path} is not a replay file')
+        (magic, version, seed, tanks, flags, ticks, digest, columns, rows,
+         map_digest) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError(f'{path} is not a replay file')
+        if version != VERSION:
+            raise ReplayError(f'{path} has unsupported version {version}')
+        body = data[HEADER.size:]
+        if len(body) != tanks * ticks:
+            raise ReplayError(f'{path} is truncated')
+        frames = [body[i:i + tanks] for i in range(0, len(body), tanks)]
+        if digest == bytes(16):
+            digest = b''
+        if map_digest == bytes(16):
+            map_digest = b''
+        return cls(seed, tanks, frames, digest,
+                   bool(flags & FLAG_VECTORIZED_BULLETS), (columns, rows),
+                   map_digest)
+
+    def check_map(self, game_map):
+        """
+        Check that the match is replayed on the map it was played on.
+
+        Parameters:
+            game_map (GameMap): The map file the match is replayed on, None
+            for the random map of the seed.
+
+        Raises:
+            ReplayError: If the map is not the map of the replay.
+        """
+        columns, rows = self.map_size
+        if game_map is None:
+            if self.map_digest:
+                raise ReplayError(f'the match was played on a {columns}x'
+                                  f'{rows} map file, give it with --map')
+            if self.map_size != DEFAULT_MAP_SIZE:
+                raise ReplayError(f'the match was played on a {columns}x'
+                                  f'{rows} random map, not '
+                                  f'{DEFAULT_MAP_SIZE[0]}x'
+                                  f'{DEFAULT_MAP_SIZE[1]}')
+        elif not self.map_digest:
+            raise ReplayError('the match was played on the random map of '
+                              'its seed, not on a map file')
+        elif ((game_map.columns, game_map.rows) != self.map_size
+              or game_map.digest() != self.map_digest):
+            raise ReplayError(f'{game_map.path} is not the {columns}x{rows} '
+                              f'map the match was played on')
+
+
+class ReplayRecorder:
+    """
+    Record the input frames of a match.
+
+    Attributes:
+    - replay (Replay): The replay being recorded.
+
+    Methods:
+    - record(frame): Appends the input frame of a tick.
+    - finish(objects_list): Stores the digest of the final state and
+      returns the replay.
+    """
+
+    def __init__(self, seed, tanks, vectorized_bullets=False,
+                 map_size=DEFAULT_MAP_SIZE, map_digest=b''):
+        self.replay = Replay(seed, tanks,
+                             vectorized_bullets=vectorized_bullets,
+                             map_size=map_size, map_digest=map_digest)
+
+    def record(self, frame):
+        """Append the input frame of the tick being simulated."""
+        self.replay.frames.append(frame)
+
+    def finish(self, objects_list):
+        """Seal the replay with the digest of the final game state."""
+        self.replay.digest = state_digest(objects_list)
+        return self.replay
+
+
+def state_digest(objects_list):
+    """
+    Return a digest of the state of the game.
+
+    The digest covers every object's kind, class and rect, the stats of the
+    tanks, the tile map, the bullets of the bullet engine and the state of
+    the random generator, so two runs end with the same digest only if they
+    went the same way.
+
+    Returns:
+        bytes: A 16-byte digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects_list:
+        digest.update(repr((
+            obj.type, type(obj).__name__, tuple(obj.rect),
+            getattr(obj, 'hit_points', None), getattr(obj, 'lives', None),
+            getattr(obj, 'rank', None)
+        )).encode())
+    digest.update(objects_list.tiles.cells)
+    bullet_engine = objects_list.bullet_engine
+    if bullet_engine is not None:
+        count = bullet_engine.count
+        for name in ('x', 'y', 'vx', 'vy', 'damage', 'owner'):
+            digest.update(getattr(bullet_engine, name)[:count].tobytes())
+    digest.update(repr(objects_list.rng.getstate()).encode())
+    return digest.digest()
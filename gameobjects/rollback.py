@@ -0,0 +1,173 @@
+"""
+rollback.py: This module is part of the gameobjects package.
+
+This module contains the rollback layer for fighting-game-style netcode.
+The match is played ahead on predicted inputs; when the real input of a
+past tick arrives and differs from the prediction, the match is put back in
+the state it was in before that tick and the ticks since are simulated
+again with the corrected inputs.
+
+The state before every recent tick is kept in a ring buffer of snapshot
+slots allocated once, and packed straight into its slot. The tiles are
+written to a slot only if they changed since the state the slot holds was
+saved, and a restore only changes the tiles of the map that differ, so both
+mostly pay for the objects that move.
+"""
+
+from gameobjects import snapshot
+from gameobjects.pygame_ui import audio
+
+SLOT_SIZE = 8192
+
+
+class RollbackSession:
+    """
+    Play a match on inputs that may be corrected later.
+
+    Tick `n` is the `n`-th tick played through the session. Before a tick
+    is played, the state of the match is saved in the slot of the tick and
+    its input frame is kept, so any of the last `depth` ticks can be played
+    again. A restore forgets the ticks after the one restored: until they
+    are played again, only the ticks before it whose slots they did not
+    take can be restored. Sounds are muted while ticks are simulated again,
+    since they were heard the first time. A restore stops the replay
+    recorder of the match, so the confirmed inputs are the caller's to
+    keep.
+
+    Attributes:
+    - match (Match): The match played.
+    - depth (int): The number of past ticks that can be rolled back.
+    - tick (int): The number of ticks played.
+    - rollbacks (int): The number of rollbacks done.
+    - resimulated (int): The number of ticks simulated again.
+    - max_rollback (int): The deepest rollback done, in ticks.
+
+    Methods:
+    - advance(frame): Plays the next tick.
+    - correct(tick, frame): Replaces the input of a past tick and plays
+      the ticks since again if it changed.
+    - restore(tick): Puts the match back in its state before a tick.
+    - frame(tick): Returns the input frame a tick was played with.
+    - tile_changed(column, row, old, new): Notes that the tiles changed.
+    - map_loaded(tile_map): Notes that the tiles changed.
+    """
+
+    def __init__(self, match, depth=16, slot_size=SLOT_SIZE):
+        self.match = match
+        self.depth = depth
+        self.tick = 0
+        self._states = [bytearray(slot_size) for _ in range(depth)]
+        self._sizes = [0] * depth
+        # The tick whose state each slot holds
+        self._ticks = [None] * depth
+        self._frames = [b''] * depth
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.max_rollback = 0
+        # Each version of the tiles gets a number; a slot keeps the number of
+        # the version it holds
+        self._terrains = [None] * depth
+        self._terrain = 0
+        self._terrain_count = 0
+        self._terrain_changes = None
+        self._tile_changes = 0
+        match.objects_list.tiles.add_listener(self)
+
+    def tile_changed(self, column, row, old, new):
+        """Note that the tiles changed since the last state saved."""
+        self._tile_changes += 1
+
+    def map_loaded(self, tile_map):
+        """Note that the tiles changed since the last state saved."""
+        self._tile_changes += 1
+
+    def _current_terrain(self):
+        """Return the number of the current tiles."""
+        if self._tile_changes != self._terrain_changes:
+            self._terrain_changes = self._tile_changes
+            self._terrain_count += 1
+            self._terrain = self._terrain_count
+        return self._terrain
+
+    def _check(self, tick):
+        if not (tick < self.tick and self._ticks[tick % self.depth] == tick):
+            raise ValueError(
+                f'tick {tick} is not among the last {self.depth} ticks '
+                f'played'
+            )
+
+    def _play(self, frame):
+        """Save the state before the next tick, then play it."""
+        slot = self.tick % self.depth
+        terrain = self._current_terrain()
+        self._sizes[slot] = snapshot.save_into(
+            self.match, self._states[slot], self._terrains[slot] != terrain
+        )
+        self._terrains[slot] = terrain
+        self._ticks[slot] = self.tick
+        self._frames[slot] = frame
+        self.match.update(frame)
+        self.tick += 1
+
+    def advance(self, frame):
+        """Play the next tick with `frame`, predicted or confirmed."""
+        self._play(frame)
+
+    def frame(self, tick):
+        """Return the input frame tick `tick` was last played with."""
+        self._check(tick)
+        return self._frames[tick % self.depth]
+
+    def restore(self, tick):
+        """
+        Put the match back in its state before tick `tick`.
+
+        The ticks from `tick` on are forgotten: the next tick played is
+        `tick` again.
+
+        Raises:
+            ValueError: If `tick` is not among the last `depth` ticks.
+        """
+        self._check(tick)
+        slot = tick % self.depth
+        with memoryview(self._states[slot]) as state:
+            snapshot.load(state[:self._sizes[slot]], self.match)
+        # The match has the tiles saved in the slot again
+        self._current_terrain()
+        self._terrain = self._terrains[slot]
+        self.tick = tick
+
+    def correct(self, tick, frame):
+        """
+        Replace the input frame of a past tick.
+
+        If the frame differs from the one the tick was played with, the
+        match is rolled back to before the tick and every tick since is
+        played again, with the corrected frame and then the frames they
+        were played with.
+
+        Returns:
+            int: The number of ticks simulated again, 0 if the frame did not
+            change.
+
+        Raises:
+            ValueError: If `tick` is not among the last `depth` ticks.
+        """
+        if self.frame(tick) == frame:
+            return 0
+        present = self.tick
+        frames = [self._frames[past % self.depth]
+                  for past in range(tick + 1, present)]
+        self.restore(tick)
+        muted, audio.muted = audio.muted, True
+        try:
+            self._play(frame)
+            for past_frame in frames:
+                self._play(past_frame)
+        finally:
+            audio.muted = muted
+        depth = present - tick
+        self.rollbacks += 1
+        self.resimulated += depth
+        self.max_rollback = max(self.max_rollback, depth)
+        return depth
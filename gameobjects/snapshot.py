@@ -0,0 +1,574 @@
+"""
+snapshot.py: This module is part of the gameobjects package.
+
+This module contains the save format of a match: a compact, versioned binary
+snapshot of everything the simulation needs to carry on exactly where it
+was, used to save and resume games and as keyframes. Snapshots are packed
+with `struct` from fixed-size records, into a new buffer or, with
+`save_into`, into one reused from save to save, so encoding and decoding a
+full map takes a fraction of a millisecond.
+
+A snapshot is laid out as:
+- the header: the magic bytes b'TNKS', the format version, the flags of
+  the simulation modes, the seed and the timers of the match, the size of
+  the grid and the number of records of every section below;
+- the state of the random generator, 625 32-bit words;
+- the tile map as a bitset, one bit per cell in row order, set for the
+  cells holding a tile;
+- the cells, then the types, of the tiles that are not bricks, in row
+  order; every other tile of the bitset is a brick;
+- one record per tank.
+Then the sections whose length varies from tick to tick:
+- the cells of the blocks still waiting to be regenerated, in order;
+- one record per bullet, bonus and bang;
+- the order the tanks, bullets, bonuses and bangs were last registered in
+  the spatial hash, which decides which of two objects in a cell is hit
+  first;
+- the bullets of the vectorized bullet engine, if one is attached.
+
+The sections whose size only changes with the map come first, so two
+snapshots of the same match line up byte for byte and `diff` can encode the
+second one as the few chunks that differ from the first.
+
+The tile map takes a bit per cell plus the few tiles that are not bricks,
+and loading only changes the tiles that differ, so saving and loading are
+cheap enough to run every tick whatever the number of blocks. The free
+cells of the occupancy map are not saved: they follow from the tiles and
+the objects, and which free cell is drawn next only depends on which cells
+are free, so the restored match draws the same cells.
+
+Only the state of the simulation is saved: the controllers of the tanks are
+kept by `load`, and a replay being recorded is stopped.
+"""
+
+import struct
+from array import array
+
+import numpy as np
+
+from gameobjects.bullet import Bullet
+from gameobjects.gameobjects import Bang, Bonus
+from gameobjects.pygame_ui import (
+    PLAYER1_INPUT,
+    PLAYER2_INPUT,
+    audio,
+    image_bonuses,
+    tank_sprites
+)
+from gameobjects.tank import Tank
+from gameobjects.tilemap import BRICK, EMPTY, TILE_NAMES
+
+MAGIC = b'TNKS'
+DELTA_MAGIC = b'TNKD'
+VERSION = 5
+FLAG_VECTORIZED_BULLETS = 1
+
+# Header: magic, version, flags, seed, game timer, bonus timer, grid
+# columns and rows, number of tanks, pending blocks, bullets, bonuses,
+# bangs, registered objects, bullet engine owners and bullets, number of
+# tiles that are not bricks.
+HEADER = struct.Struct('<4sHBqIiHHBHHHHHBHI')
+RNG_WORDS = 625
+# The tile of the cells set in the bitset and not listed after it
+DEFAULT_TILE = BRICK
+
+# The fields of each kind:
+# - tank: color, left, top, previous center, direction, rank, rank and
+#   direction of the sprite, speed, hit points, lives, shoot timer, shoot
+#   delay, bullet speed, bullet damage, flags (bit 0: moving, bits 1-7:
+#   index of the player's keys);
+# - bullet: index of the tank that fired it, position, previous position,
+#   velocity, damage, hit points;
+# - bonus: center, timer, bonus index;
+# - bang: center, animation frame.
+TANK = struct.Struct('<BBBhhhhBBBBdbbHhhhB')
+BULLET = struct.Struct('<Bhhhhhhhb')
+BONUS = struct.Struct('<hhhB')
+BANG = struct.Struct('<ddd')
+
+# Registration order entries are (kind << 14) | index
+ORDER_KINDS = ('tank', 'bullet', 'bonus', 'bang')
+ORDER_SHIFT = 14
+
+# Delta header: magic, version, size of the base snapshot, size of the new
+# snapshot. A bitmask of the changed chunks and the chunks follow.
+DELTA_HEADER = struct.Struct('<4sHII')
+CHUNK = 16
+
+PLAYER_INPUTS = (PLAYER1_INPUT, PLAYER2_INPUT)
+ENGINE_ARRAYS = (('x', np.float64), ('y', np.float64),
+                 ('previous_x', np.float64), ('previous_y', np.float64),
+                 ('vx', np.float64), ('vy', np.float64),
+                 ('damage', np.int32), ('owner', np.int32))
+ENGINE_RECORD_SIZE = sum(np.dtype(dtype).itemsize
+                         for _, dtype in ENGINE_ARRAYS)
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot or a delta cannot be decoded."""
+
+
+def _array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    return values
+
+
+def save(match):
+    """
+    Return a snapshot of the match.
+
+    Parameters:
+        match (Match): The match to save.
+
+    Returns:
+        bytes: The snapshot.
+
+    Raises:
+        SnapshotError: If a tank has custom keys.
+    """
+    buffer = bytearray()
+    save_into(match, buffer)
+    return bytes(buffer)
+
+
+def save_into(match, buffer, terrain=True):
+    """
+    Write a snapshot of the match at the start of a buffer.
+
+    The records are packed in place, so a buffer reused from save to save,
+    like a slot of the rollback ring, is not allocated again.
+
+    Parameters:
+        match (Match): The match to save.
+        buffer (bytearray): The buffer, extended if it is too small.
+        terrain (bool): If False, the tiles are not written: the buffer
+        holds them from an earlier snapshot of the same map, whose tiles
+        have not changed since.
+
+    Returns:
+        int: The size of the snapshot.
+
+    Raises:
+        SnapshotError: If a tank has custom keys.
+    """
+    objects_list = match.objects_list
+    tiles = objects_list.tiles
+    columns, rows = tiles.columns, tiles.rows
+    cells = columns * rows
+    bullet_engine = objects_list.bullet_engine
+
+    tanks = list(objects_list.of_kind('tank'))
+    bullets = list(objects_list.of_kind('bullet'))
+    bonuses = list(objects_list.of_kind('bonus'))
+    bangs = list(objects_list.of_kind('bang'))
+    tank_index = {tank: index for index, tank in enumerate(tanks)}
+    try:
+        players = [PLAYER_INPUTS.index(tank.move_input) for tank in tanks]
+    except ValueError:
+        raise SnapshotError('a tank has custom keys') from None
+
+    pending = array('I', [row * columns + column
+                          for column, row in match.regenerator.pending])
+    indexes = {
+        kind: {obj: index for index, obj in enumerate(objects)}
+        for kind, objects in zip(ORDER_KINDS, (tanks, bullets, bonuses,
+                                               bangs))
+    }
+    order = array('H')
+    for obj in objects_list.grid:
+        order.append(ORDER_KINDS.index(obj.type) << ORDER_SHIFT
+                     | indexes[obj.type][obj])
+    owners = b''
+    engine_count = 0
+    if bullet_engine is not None:
+        owners = bytes(tank_index[tank] for tank in bullet_engine.owners)
+        engine_count = bullet_engine.count
+
+    if terrain:
+        layer = np.frombuffer(tiles.cells, dtype=np.uint8)
+        special = np.flatnonzero((layer != EMPTY) & (layer != DEFAULT_TILE))
+        special_count = special.size
+    else:
+        # The earlier snapshot in the buffer has the same tiles
+        special_count = HEADER.unpack_from(buffer)[-1]
+    bitset_size = (cells + 7) // 8
+
+    size = HEADER.size + sum((
+        4 * RNG_WORDS, bitset_size, 5 * special_count,
+        TANK.size * len(tanks), 4 * len(pending),
+        BULLET.size * len(bullets), BONUS.size * len(bonuses),
+        BANG.size * len(bangs), 2 * len(order), len(owners),
+        ENGINE_RECORD_SIZE * engine_count
+    ))
+    if len(buffer) < size:
+        buffer.extend(bytes(size - len(buffer)))
+
+    HEADER.pack_into(
+        buffer, 0, MAGIC, VERSION,
+        FLAG_VECTORIZED_BULLETS if bullet_engine is not None else 0,
+        match.seed or 0, match.game_timer, match.bonus_timer, columns, rows,
+        len(tanks), len(pending), len(bullets), len(bonuses),
+        len(bangs), len(order), len(owners), engine_count, special_count
+    )
+    offset = _put(buffer, HEADER.size,
+                  array('I', objects_list.rng.getstate()[1]))
+    if terrain:
+        _put(buffer, offset, np.packbits(layer != EMPTY, bitorder='little'))
+        _put(buffer, offset + bitset_size, special.astype('<u4'))
+        _put(buffer, offset + bitset_size + 4 * special_count,
+             layer[special])
+    offset += bitset_size + 5 * special_count
+
+    for tank, player in zip(tanks, players):
+        TANK.pack_into(
+            buffer, offset, *tank.color, tank.rect.x, tank.rect.y,
+            *tank.previous_center, tank.direct, tank.rank, *tank.sprite_key,
+            tank.speed, tank.hit_points, tank.lives, tank.shoot_timer,
+            tank.shoot_delay, tank.bullet_speed, tank.bullet_damage,
+            tank.moving | player << 1
+        )
+        offset += TANK.size
+    offset = _put(buffer, offset, pending)
+    for bullet in bullets:
+        BULLET.pack_into(
+            buffer, offset, tank_index[bullet.parent], bullet.parent_x,
+            bullet.parent_y, bullet.previous_x, bullet.previous_y,
+            bullet.bullet_x, bullet.bullet_y, bullet._damage,
+            bullet.hit_points
+        )
+        offset += BULLET.size
+    for bonus in bonuses:
+        BONUS.pack_into(buffer, offset, *bonus.rect.center, bonus.timer,
+                        bonus.bonus_index)
+        offset += BONUS.size
+    for bang in bangs:
+        BANG.pack_into(buffer, offset, bang.px, bang.py, bang.frame)
+        offset += BANG.size
+    offset = _put(buffer, offset, order)
+    if bullet_engine is not None:
+        offset = _put(buffer, offset, owners)
+        for name, _ in ENGINE_ARRAYS:
+            offset = _put(buffer, offset,
+                          getattr(bullet_engine, name)[:engine_count])
+    return size
+
+
+def _put(buffer, offset, values):
+    """Copy the bytes of `values` into `buffer` at `offset`, return its end."""
+    with memoryview(values) as view:
+        end = offset + view.nbytes
+        buffer[offset:end] = view.cast('B')
+    return end
+
+
+def load(data, match):
+    """
+    Restore the match saved in a snapshot.
+
+    All objects of the match are replaced by the saved ones. The tanks keep
+    the controllers of the tanks they replace, in order. The snapshot is
+    checked before the match is changed, so a match is left untouched by an
+    invalid snapshot. The occupancy map follows the restored tiles and
+    objects.
+
+    Parameters:
+        data (bytes): The snapshot.
+        match (Match): The match to restore the snapshot into.
+
+    Raises:
+        SnapshotError: If the snapshot is invalid or was saved with another
+        grid or bullet simulation mode.
+    """
+    data = memoryview(data)
+    try:
+        (magic, version, flags, seed, game_timer, bonus_timer, columns, rows,
+         tank_count, pending_count, bullet_count, bonus_count,
+         bang_count, order_count, owner_count, engine_count,
+         special_count) = HEADER.unpack_from(data)
+    except struct.error as error:
+        raise SnapshotError(str(error)) from error
+    if magic != MAGIC:
+        raise SnapshotError('not a snapshot')
+    if version != VERSION:
+        raise SnapshotError(f'unsupported snapshot version {version}')
+
+    objects_list = match.objects_list
+    bullet_engine = objects_list.bullet_engine
+    if (columns, rows) != (objects_list.tiles.columns,
+                           objects_list.tiles.rows):
+        raise SnapshotError(f'snapshot of a {columns}x{rows} grid')
+    if (flags & FLAG_VECTORIZED_BULLETS) != (bullet_engine is not None):
+        raise SnapshotError('snapshot of another bullet simulation mode')
+    cells = columns * rows
+    sizes = (
+        4 * RNG_WORDS, (cells + 7) // 8, 4 * special_count, special_count,
+        TANK.size * tank_count, 4 * pending_count,
+        BULLET.size * bullet_count, BONUS.size * bonus_count,
+        BANG.size * bang_count, 2 * order_count, owner_count,
+        ENGINE_RECORD_SIZE * engine_count
+    )
+    if len(data) != HEADER.size + sum(sizes):
+        raise SnapshotError('truncated snapshot')
+    sections = []
+    offset = HEADER.size
+    for size in sizes:
+        sections.append(data[offset:offset + size])
+        offset += size
+    (rng_words, bitset, special_cells, special_tiles, tank_records,
+     pending, bullet_records, bonus_records, bang_records, order, owners,
+     engine_records) = sections
+
+    tank_fields = list(TANK.iter_unpack(tank_records))
+    bullet_fields = list(BULLET.iter_unpack(bullet_records))
+    bonus_fields = list(BONUS.iter_unpack(bonus_records))
+    bang_fields = list(BANG.iter_unpack(bang_records))
+    pending = _array('I', pending)
+    order = _array('H', order)
+    _check(tank_fields, bullet_fields, bonus_fields, bang_fields, pending,
+           order, owners, cells)
+    tiles = _tiles(bitset, special_cells, special_tiles, cells)
+
+    match.regenerator.reset()
+    match.recorder = None
+    match.seed = seed
+    match.game_timer = game_timer
+    match.bonus_timer = bonus_timer
+    objects_list.rng.setstate((3, tuple(_array('I', rng_words)), None))
+
+    # The tanks are kept when they match the saved ones, so they keep their
+    # controllers; bullets, bonuses and bangs are always created again
+    tanks = list(objects_list.of_kind('tank'))
+    inputs = [PLAYER_INPUTS[fields[-1] >> 1] for fields in tank_fields]
+    if [tank.move_input for tank in tanks] != inputs:
+        controllers = [tank.controller for tank in tanks]
+        controllers += [None] * (tank_count - len(controllers))
+        for tank in tanks:
+            if tank.moving:
+                audio.stop_loop("track_long", tank)
+            objects_list.remove(tank)
+        tanks = [
+            Tank(fields[:3], fields[3:5], fields[7], move_input,
+                 objects_list, controller)
+            for fields, move_input, controller in zip(tank_fields, inputs,
+                                                      controllers)
+        ]
+    for obj in list(objects_list.of_kind('bullet', 'bonus', 'bang')):
+        objects_list.remove(obj)
+    if objects_list.pool is not None:
+        # The whole state is replaced, so the objects just removed can be
+        # recycled right away, which keeps a rollback from allocating
+        objects_list.pool.recycle()
+
+    objects_list.tiles.replace(tiles)
+    match.regenerator.pending = {
+        (cell % columns, cell // columns): None for cell in pending
+    }
+
+    for tank, fields in zip(tanks, tank_fields):
+        (red, green, blue, x, y, previous_x, previous_y, direct, rank,
+         sprite_rank, sprite_direct, speed, hit_points, lives, shoot_timer,
+         shoot_delay, bullet_speed, bullet_damage, tank_flags) = fields
+        tank.color = (red, green, blue)
+        tank.direct = direct
+        tank.rank = rank
+        tank.sprite_key = (sprite_rank, sprite_direct)
+        tank.image = tank_sprites[tank.sprite_key]
+        tank.rect = tank.image.get_rect(topleft=(x, y))
+        tank.previous_center = (previous_x, previous_y)
+        tank.speed = speed
+        tank.hit_points = hit_points
+        tank.lives = lives
+        tank.shoot_timer = shoot_timer
+        tank.shoot_delay = shoot_delay
+        tank.bullet_speed = bullet_speed
+        tank.bullet_damage = bullet_damage
+        moving = bool(tank_flags & 1)
+        if moving != tank.moving:
+            tank.moving = moving
+            if moving:
+                audio.start_loop("track_long", tank)
+            else:
+                audio.stop_loop("track_long", tank)
+        objects_list.moved(tank)
+
+    bullets = []
+    for (parent, x, y, previous_x, previous_y, bullet_x, bullet_y, damage,
+         hit_points) in bullet_fields:
+        bullet = Bullet.create(tanks[parent], x, y, bullet_x, bullet_y,
+                               damage, objects_list)
+        bullet.previous_x, bullet.previous_y = previous_x, previous_y
+        bullet.hit_points = hit_points
+        bullets.append(bullet)
+    bonuses = []
+    for x, y, timer, bonus_index in bonus_fields:
+        bonus = Bonus.create(x, y, bonus_index, objects_list)
+        bonus.timer = timer
+        bonuses.append(bonus)
+    bangs = []
+    for px, py, frame in bang_fields:
+        bang = Bang.create(px, py, objects_list)
+        bang.frame = frame
+        bangs.append(bang)
+
+    # Register the moving objects again in their saved order, which puts
+    # them in the same order within every cell of the spatial hash
+    grid = objects_list.grid
+    objects = (tanks, bullets, bonuses, bangs)
+    mask = (1 << ORDER_SHIFT) - 1
+    for code in order:
+        obj = objects[code >> ORDER_SHIFT][code & mask]
+        grid.discard(obj)
+        grid.add(obj)
+
+    if bullet_engine is not None:
+        bullet_engine.owners = [tanks[index] for index in owners]
+        bullet_engine._owner_index = {
+            tank: index for index, tank in enumerate(bullet_engine.owners)
+        }
+        if engine_count > len(bullet_engine.x):
+            bullet_engine._allocate(engine_count)
+        offset = 0
+        for name, dtype in ENGINE_ARRAYS:
+            size = np.dtype(dtype).itemsize * engine_count
+            getattr(bullet_engine, name)[:engine_count] = np.frombuffer(
+                engine_records[offset:offset + size], dtype=dtype
+            )
+            offset += size
+        bullet_engine.count = engine_count
+
+
+def _check(tank_fields, bullet_fields, bonus_fields, bang_fields, pending,
+           order, owners, cells):
+    """
+    Check the records of a snapshot against each other.
+
+    Raises:
+        SnapshotError: If a record holds an unknown value or refers to an
+        object or a cell that does not exist.
+    """
+    tank_count = len(tank_fields)
+    for fields in tank_fields:
+        if fields[-1] >> 1 >= len(PLAYER_INPUTS):
+            raise SnapshotError('unknown player keys')
+        if fields[9:11] not in tank_sprites:
+            raise SnapshotError('unknown tank sprite')
+    if any(fields[0] >= tank_count for fields in bullet_fields):
+        raise SnapshotError('bullet of an unknown tank')
+    if any(fields[3] >= len(image_bonuses) for fields in bonus_fields):
+        raise SnapshotError('unknown bonus')
+    if any(index >= tank_count for index in owners):
+        raise SnapshotError('bullet engine owner is an unknown tank')
+
+    counts = (tank_count, len(bullet_fields), len(bonus_fields),
+              len(bang_fields))
+    mask = (1 << ORDER_SHIFT) - 1
+    for code in order:
+        kind = code >> ORDER_SHIFT
+        if kind >= len(ORDER_KINDS) or code & mask >= counts[kind]:
+            raise SnapshotError('registration order of an unknown object')
+    if any(cell >= cells for cell in pending):
+        raise SnapshotError('pending block out of the map')
+
+
+def _tiles(bitset, special_cells, special_tiles, cells):
+    """
+    Return the tile map of a snapshot, one byte per cell.
+
+    Raises:
+        SnapshotError: If the bitset has bits past the last cell, or a
+        listed tile is unknown, a brick, listed twice, out of order or on a
+        cell without a tile.
+    """
+    bits = np.frombuffer(bitset, dtype=np.uint8)
+    occupied = np.unpackbits(bits, bitorder='little')
+    if occupied[cells:].any():
+        raise SnapshotError('tiles out of the map')
+    tiles = occupied[:cells] * np.uint8(DEFAULT_TILE)
+    special_cells = np.frombuffer(special_cells, dtype='<u4')
+    special_tiles = np.frombuffer(special_tiles, dtype=np.uint8)
+    if special_cells.size:
+        if (special_cells[-1] >= cells
+                or (np.diff(special_cells.astype(np.int64)) <= 0).any()
+                or not occupied[special_cells].all()):
+            raise SnapshotError('tiles that are not bricks do not match '
+                                'the map')
+        if int(special_tiles.max()) >= len(TILE_NAMES):
+            raise SnapshotError('unknown tile type')
+        if ((special_tiles == EMPTY) | (special_tiles == DEFAULT_TILE)).any():
+            raise SnapshotError('an empty cell or a brick is listed')
+        tiles[special_cells] = special_tiles
+    return tiles
+
+
+def save_file(match, path):
+    """Write a snapshot of the match to `path`."""
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(save(match))
+
+
+def load_file(path, match):
+    """Restore the match saved in the snapshot file `path`."""
+    with open(path, 'rb') as snapshot_file:
+        load(snapshot_file.read(), match)
+
+
+def diff(base, snapshot):
+    """
+    Return a delta that turns the snapshot `base` into `snapshot`.
+
+    Both snapshots are cut into chunks of `CHUNK` bytes; the delta holds a
+    bitmask of the chunks that differ and those chunks. Between two ticks
+    of a match only a few chunks change, so the delta is a small fraction
+    of a snapshot.
+    """
+    size = len(snapshot)
+    changed = bytearray(((size + CHUNK - 1) // CHUNK + 7) // 8)
+    chunks = []
+    for index, start in enumerate(range(0, size, CHUNK)):
+        chunk = snapshot[start:start + CHUNK]
+        if base[start:start + CHUNK] != chunk:
+            changed[index >> 3] |= 1 << (index & 7)
+            chunks.append(chunk)
+    return b''.join([
+        DELTA_HEADER.pack(DELTA_MAGIC, VERSION, len(base), size),
+        changed
+    ] + chunks)
+
+
+def patch(base, delta):
+    """
+    Apply a delta made by `diff` to the snapshot `base`.
+
+    Returns:
+        bytes: The snapshot the delta was made from.
+
+    Raises:
+        SnapshotError: If the delta is invalid or was made against another
+        snapshot size.
+    """
+    try:
+        magic, version, base_size, size = DELTA_HEADER.unpack_from(delta)
+    except struct.error as error:
+        raise SnapshotError(str(error)) from error
+    if magic != DELTA_MAGIC or version != VERSION:
+        raise SnapshotError('not a snapshot delta of this version')
+    if base_size != len(base):
+        raise SnapshotError('delta made against another snapshot')
+    chunk_count = (size + CHUNK - 1) // CHUNK
+    offset = DELTA_HEADER.size + (chunk_count + 7) // 8
+    changed = delta[DELTA_HEADER.size:offset]
+    snapshot = bytearray(base[:size])
+    snapshot.extend(bytes(size - len(snapshot)))
+    for index in range(chunk_count):
+        if changed[index >> 3] >> (index & 7) & 1:
+            start = index * CHUNK
+            end = min(start + CHUNK, size)
+            chunk = delta[offset:offset + end - start]
+            if len(chunk) != end - start:
+                raise SnapshotError('truncated delta')
+            snapshot[start:end] = chunk
+            offset += end - start
+    if offset != len(delta):
+        raise SnapshotError('delta has trailing data')
+    return bytes(snapshot)
@@ -0,0 +1,252 @@
+"""
+spatial.py: This module is part of the gameobjects package.
+
+This module contains a uniform spatial hash used to answer collision
+queries. The world is split into square cells of `Settings.GRID_SIZE`
+pixels; every game object is registered in the cells its rect overlaps, so a
+collision check only has to look at the objects sharing a neighborhood
+instead of scanning the whole objects list.
+
+It also contains the swept tests used for fast moving objects: a walk over
+the cells a moving rect crosses, and the time a moving rect first touches
+another rect, so that nothing is skipped however far an object moves in a
+tick.
+"""
+
+import math
+
+import pygame
+
+from settings.settings import Settings
+
+
+def cells_for_rect(rect: pygame.Rect, cell_size: int = Settings.GRID_SIZE):
+    """Return the (column, row) keys of all cells overlapped by `rect`."""
+    left = rect.left // cell_size
+    top = rect.top // cell_size
+    right = (rect.right - 1) // cell_size if rect.width > 0 else left
+    bottom = (rect.bottom - 1) // cell_size if rect.height > 0 else top
+    return tuple(
+        (col, row)
+        for row in range(top, bottom + 1)
+        for col in range(left, right + 1)
+    )
+
+
+def swept_cells(x, y, width, height, dx, dy,
+                cell_size: int = Settings.GRID_SIZE):
+    """
+    Yield the cells a rect overlaps while it moves by (dx, dy).
+
+    The rect is `width` by `height` pixels at (x, y) when the move starts
+    and at (x + dx, y + dy) when it ends. The cells are walked with a DDA
+    over the edges of the rect: each step moves its leading or trailing
+    edge into the next column or row, so the cost is proportional to the
+    number of cells crossed, whatever the length of the move.
+
+    Yields:
+        tuple: The time the rect starts to overlap the cell, from 0 at the
+        start of the move to 1 at its end, then the column and row of the
+        cell, in the order of the times.
+    """
+    left = math.floor(x / cell_size)
+    right = math.ceil((x + width) / cell_size) - 1
+    top = math.floor(y / cell_size)
+    bottom = math.ceil((y + height) / cell_size) - 1
+    for row in range(top, bottom + 1):
+        for column in range(left, right + 1):
+            yield 0.0, column, row
+
+    def crossings(start, size, first, last, delta):
+        """Times the leading edge enters and the trailing edge leaves."""
+        if delta > 0:
+            return (((last + 1) * cell_size - start - size) / delta,
+                    ((first + 1) * cell_size - start) / delta)
+        if delta < 0:
+            return ((first * cell_size - start) / delta,
+                    (last * cell_size - start - size) / delta)
+        return math.inf, math.inf
+
+    x_enter, x_leave = crossings(x, width, left, right, dx)
+    y_enter, y_leave = crossings(y, height, top, bottom, dy)
+    while True:
+        time = min(x_enter, x_leave, y_enter, y_leave)
+        if time >= 1:
+            return
+        # A cell left at the time another is entered is never overlapped
+        # by both edges, so the trailing edges move first
+        if time == x_leave:
+            if dx > 0:
+                left += 1
+            else:
+                right -= 1
+        elif time == y_leave:
+            if dy > 0:
+                top += 1
+            else:
+                bottom -= 1
+        elif time == x_enter:
+            if dx > 0:
+                right += 1
+                column = right
+            else:
+                left -= 1
+                column = left
+            for row in range(top, bottom + 1):
+                yield time, column, row
+        else:
+            if dy > 0:
+                bottom += 1
+                row = bottom
+            else:
+                top -= 1
+                row = top
+            for column in range(left, right + 1):
+                yield time, column, row
+        x_enter, x_leave = crossings(x, width, left, right, dx)
+        y_enter, y_leave = crossings(y, height, top, bottom, dy)
+
+
+def sweep_time(x, y, width, height, dx, dy, rect: pygame.Rect):
+    """
+    Return when a rect moving by (dx, dy) starts to overlap `rect`.
+
+    The moving rect is the one of `swept_cells`. Returns the time from 0,
+    if it overlaps `rect` from the start, to 1, or None if it does not
+    overlap `rect` at any time of the move.
+    """
+    enter, leave = -math.inf, math.inf
+    for start, size, delta, low, high in (
+            (x, width, dx, rect.left, rect.right),
+            (y, height, dy, rect.top, rect.bottom)):
+        if delta:
+            first = (low - start - size) / delta
+            last = (high - start) / delta
+            if first > last:
+                first, last = last, first
+            enter = max(enter, first)
+            leave = min(leave, last)
+        elif not (start < high and start + size > low):
+            return None
+    if enter < leave and enter < 1 and leave > 0:
+        return max(enter, 0.0)
+    return None
+
+
+def leave_time(x, y, dx, dy, rect: pygame.Rect):
+    """
+    Return when a point moving by (dx, dy) leaves `rect`, edges included.
+
+    Returns the last time, from 0 to 1, the point is within `rect`, 0 if
+    it starts outside, or None if it stays within `rect` to the end of the
+    move.
+    """
+    if not (rect.left <= x <= rect.right and rect.top <= y <= rect.bottom):
+        return 0.0
+    time = math.inf
+    if dx:
+        time = ((rect.right if dx > 0 else rect.left) - x) / dx
+    if dy:
+        time = min(time, ((rect.bottom if dy > 0 else rect.top) - y) / dy)
+    return time if time < 1 else None
+
+
+class SpatialHash:
+    """
+    Uniform grid that maps cells to the game objects overlapping them.
+
+    Objects are stored per cell in insertion-ordered dicts, so neighborhood
+    queries return objects in a stable order and the simulation stays
+    deterministic.
+
+    Attributes:
+    - cell_size (int): The size of a cell in pixels.
+
+    Methods:
+    - add(obj): Registers an object in the cells its rect overlaps.
+    - discard(obj): Unregisters an object, if it is registered.
+    - move(obj): Refreshes the cells of an object after its rect changed.
+    - query(rect): Returns the objects registered near the given rect.
+    - at(column, row): Returns the objects registered in a cell.
+    """
+
+    def __init__(self, cell_size: int = Settings.GRID_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._object_cells = {}
+
+    def __len__(self):
+        return len(self._object_cells)
+
+    def __contains__(self, obj):
+        return obj in self._object_cells
+
+    def __iter__(self):
+        """
+        Iterate over the objects in the order they were last registered.
+
+        An object moved to other cells is registered again, so this is also
+        the order of the objects within every cell.
+        """
+        return iter(self._object_cells)
+
+    def add(self, obj):
+        """Register the object in every cell its rect overlaps."""
+        cells = cells_for_rect(obj.rect, self.cell_size)
+        self._object_cells[obj] = cells
+        for cell in cells:
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                bucket = self._cells[cell] = {}
+            bucket[obj] = None
+
+    def discard(self, obj):
+        """Remove the object from the grid if it is registered."""
+        cells = self._object_cells.pop(obj, None)
+        if cells is None:
+            return
+        for cell in cells:
+            bucket = self._cells[cell]
+            del bucket[obj]
+            if not bucket:
+                del self._cells[cell]
+
+    def move(self, obj):
+        """Update the cells of an object whose rect has changed."""
+        old_cells = self._object_cells.get(obj)
+        if old_cells is None:
+            return
+        if old_cells == cells_for_rect(obj.rect, self.cell_size):
+            return
+        self.discard(obj)
+        self.add(obj)
+
+    def clear(self):
+        """Forget all registered objects."""
+        self._cells.clear()
+        self._object_cells.clear()
+
+    def query(self, rect: pygame.Rect):
+        """
+        Return the objects registered in the cells overlapped by `rect`.
+
+        The result is a candidate list: callers still have to run an exact
+        `colliderect` test, since sharing a cell does not imply overlap.
+        """
+        size = self.cell_size
+        left, top = rect.left // size, rect.top // size
+        right = max(left, (rect.right - 1) // size)
+        bottom = max(top, (rect.bottom - 1) // size)
+        if left == right and top == bottom:
+            return list(self._cells.get((left, top), ()))
+        found = {}
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                bucket = self._cells.get((col, row))
+                if bucket:
+                    found.update(bucket)
+        return list(found)
+
+    def at(self, column, row):
+        """Return the objects registered in a cell, in registration order."""
+        return list(self._cells.get((column, row), ()))
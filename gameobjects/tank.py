@@ -1,11 +1,17 @@
-from random import randint
-
 import pygame
 from gameobjects.base import GameObject
 from gameobjects.bullet import Bullet
-from gameobjects.blocks import BrickBlock
 from settings.settings import Settings
-from gameobjects.pygame_ui import image_tank, screen, sound_effects
+from gameobjects.controls import (
+    KeyboardController,
+    PressedKeys,
+    decode_keys
+)
+from gameobjects.pygame_ui import (
+    tank_sprites,
+    screen,
+    audio
+)
 
 
 class Tank(GameObject):
@@ -18,136 +24,205 @@ class Tank(GameObject):
             direct: int,
             move_input: tuple[int, int, int, int, int],
             objects_list: list,
-            sound_chanel: int
-
+            controller=None
     ):
         """Initialize the attributes of the Tank."""
-        super().__init__(objects_list)
         self.type = 'tank'
         self.color = color
         self.rank = 0
         self.direct = direct
         self.rect = pygame.Rect(obj_coordinates[0], obj_coordinates[1],
                                 Settings.GRID_SIZE, Settings.GRID_SIZE)
-        self.image = pygame.transform.rotate(image_tank[self.rank],
-                                             -self.direct * 90)
+        self.sprite_key = (self.rank, self.direct)
+        self.image = tank_sprites[self.sprite_key]
         self.rect = self.image.get_rect(center=self.rect.center)
+        self.previous_center = self.rect.center
         self.speed = Settings.SPEED
         self.hit_points = Settings.HP
         self.lives = Settings.LIVES
 
+        self.move_input = move_input
         self.move_left = move_input[0]
         self.move_right = move_input[1]
         self.move_up = move_input[2]
         self.move_down = move_input[3]
         self.key_shoot = move_input[4]
+        self.controller = controller or KeyboardController()
+        self.keys = PressedKeys()
 
         self.shoot_timer = 0
         self.shoot_delay = 90
         self.bullet_speed = 5
         self.bullet_damage = 1
 
-        self.sound_channel = pygame.mixer.Channel(sound_chanel)
-        self.sound_channel.set_volume(0.2)
+        self.moving = False
+        super().__init__(objects_list)
 
     def update(self):
         """Update the state of the Tank."""
+        self.previous_center = self.rect.center
         self.change_tank_state()
         self.check_boundaries()
         self.shoot_bullet()
 
+    def apply_input(self, mask):
+        """Hold the keys of an action mask during the next update."""
+        self.keys = decode_keys(mask, self.move_input)
+
     def check_boundaries(self):
-        """Checks and adjusts for boundaries"""
-        keys = pygame.key.get_pressed()
+        """Checks and adjusts for boundaries
+
+        The tank is stopped by the other objects, except bonuses, and by
+        the tiles tanks cannot drive onto. On a slippery tile a tank that
+        was moving keeps sliding ahead while no key is held, until it
+        leaves the tile or runs into something.
+
+        The tank cannot leave the view of the camera, below the status bar,
+        so both players always see their tank. A tank outside the view, as
+        after a respawn, is not pulled in: it just cannot move further out.
+        """
+        keys = self.keys
+        tiles = self.objects_list.tiles
+        bounds = self.objects_list.camera.bounds
 
         # original positions
         prev_x, prev_y = self.rect.topleft
 
-        # Don't play the sound by default
-        should_play_sound = False
-
         if keys[self.move_left]:
-            should_play_sound = True
+            move = 3
+        elif keys[self.move_right]:
+            move = 1
+        elif keys[self.move_up]:
+            move = 0
+        elif keys[self.move_down]:
+            move = 2
+        else:
+            move = None
+        sliding = (move is None and self.moving
+                   and tiles.is_slippery(*self.rect.center))
+        if sliding:
+            move = self.direct
+
+        # Play the sound while the tank moves
+        should_play_sound = move is not None
+
+        if move == 3:
             self.rect.x -= self.speed
-            if self.rect.x < 0:
-                self.rect.x = 0
+            if self.rect.x < bounds.left:
+                self.rect.x = min(bounds.left, prev_x)
             self.direct = 3
-        elif keys[self.move_right]:
-            should_play_sound = True
+        elif move == 1:
             self.rect.x += self.speed
-            if self.rect.x > Settings.SCREEN_WIDTH - self.rect.width:
-                self.rect.x = Settings.SCREEN_WIDTH - self.rect.width
+            if self.rect.x > bounds.right - self.rect.width:
+                self.rect.x = max(bounds.right - self.rect.width, prev_x)
             self.direct = 1
-        elif keys[self.move_up]:
-            should_play_sound = True
+        elif move == 0:
             self.rect.y -= self.speed
-            if self.rect.y < 0:
-                self.rect.y = 0
+            if self.rect.y < bounds.top:
+                self.rect.y = min(bounds.top, prev_y)
             self.direct = 0
-        elif keys[self.move_down]:
-            should_play_sound = True
+        elif move == 2:
             self.rect.y += self.speed
-            if self.rect.y > (Settings.SCREEN_HEIGHT - 2) - self.rect.height:
-                self.rect.y = (Settings.SCREEN_HEIGHT - 2) - self.rect.height
+            if self.rect.y > (bounds.bottom - 2) - self.rect.height:
+                self.rect.y = max((bounds.bottom - 2) - self.rect.height,
+                                  prev_y)
             self.direct = 2
 
-        if self.rect.y < 2 * Settings.GRID_SIZE:
-            self.rect.y = 2 * Settings.GRID_SIZE
+        if self.rect.y < bounds.top + 2 * Settings.GRID_SIZE:
+            self.rect.y = min(bounds.top + 2 * Settings.GRID_SIZE, prev_y)
 
-        # Play the tank moving sound if tank is moving
-        if should_play_sound:
-            if not self.sound_channel.get_busy():
-                self.sound_channel.play(sound_effects["track_long"])
-        else:
-            self.sound_channel.stop()  # Stop the sound
+        # Loop the tank moving sound while the tank is moving; the audio
+        # manager is only told when the tank starts or stops
+        if should_play_sound != self.moving:
+            self.moving = should_play_sound
+            if should_play_sound:
+                audio.start_loop("track_long", self)
+            else:
+                audio.stop_loop("track_long", self)
 
         # check collision
-        for obj in self.objects_list:
-            if obj != self and obj.type != 'bonus' and self.rect.colliderect(
-                    obj.rect):
-                self.rect.topleft = prev_x, prev_y
+        if tiles.blocks_tanks(self.rect):
+            self.rect.topleft = prev_x, prev_y
+        else:
+            for obj in self.objects_list.nearby(self.rect):
+                if (obj != self and obj.type != 'bonus'
+                        and self.rect.colliderect(obj.rect)):
+                    self.rect.topleft = prev_x, prev_y
+
+        # A slide ends when the tank could not move
+        if sliding and self.rect.topleft == (prev_x, prev_y):
+            self.moving = False
+            audio.stop_loop("track_long", self)
+        self.objects_list.moved(self)
 
     def shoot_bullet(self):
-        """Checks if shooting is possible and shoots"""
-        keys = pygame.key.get_pressed()
+        """Checks if shooting is possible and shoots
+
+        The bullet is handed to the vectorized bullet engine when one is
+        attached to the registry, otherwise a Bullet object is created.
+        """
+        keys = self.keys
         if keys[self.key_shoot] and self.shoot_timer == 0:
             bullet_x = Settings.MOVES_INPUT[self.direct][0] * self.bullet_speed
             bullet_y = Settings.MOVES_INPUT[self.direct][1] * self.bullet_speed
-            Bullet(self, self.rect.centerx, self.rect.centery, bullet_x,
-                   bullet_y, self.bullet_damage, self.objects_list)
+            bullet_engine = self.objects_list.bullet_engine
+            if bullet_engine is not None:
+                bullet_engine.spawn(self, self.rect.centerx,
+                                    self.rect.centery, bullet_x, bullet_y,
+                                    self.bullet_damage)
+            else:
+                Bullet.create(self, self.rect.centerx, self.rect.centery,
+                              bullet_x, bullet_y, self.bullet_damage,
+                              self.objects_list)
             self.shoot_timer = self.shoot_delay
 
             # Start to play the shooting sound
-            sound_effects["shoot"].play()
+            audio.play("shoot")
 
         if self.shoot_timer > 0:
             self.shoot_timer -= 1
 
     def change_tank_state(self):
-        """Change image and direction based on the Tank state"""
-        self.image = pygame.transform.rotate(
-            image_tank[self.rank],
-            -self.direct * 90
-        )
-        self.image = pygame.transform.scale(
-            self.image,
-            (
-                self.image.get_width() - 5,
-                self.image.get_height() - 5
-            )
-        )
+        """Change image and direction based on the Tank state
+
+        The sprite is looked up in the pre-built `tank_sprites` cache and
+        only swapped when the rank or the direction has changed since the
+        last call.
+        """
+        sprite_key = (self.rank, self.direct)
+        if sprite_key == self.sprite_key:
+            return
+        self.sprite_key = sprite_key
+        self.image = tank_sprites[sprite_key]
         self.rect = self.image.get_rect(center=self.rect.center)
+        self.objects_list.moved(self)
+
+    def position(self, alpha=1.0):
+        """Return the center of the Tank, `alpha` of the way from its
+        previous to its current position."""
+        previous_x, previous_y = self.previous_center
+        center_x, center_y = self.rect.center
+        return (previous_x + (center_x - previous_x) * alpha,
+                previous_y + (center_y - previous_y) * alpha)
+
+    def draw(self, alpha=1.0, offset=(0, 0)):
+        """Draw the Tank on the gaming interface.
 
-    def draw(self):
-        """Draw the Tank on the gaming interface."""
-        screen.blit(self.image, self.rect)
+        The tank is drawn between its previous and current positions,
+        `alpha` of the way from the former to the latter, at its position
+        on the map minus `offset`.
+        """
+        x, y = self.position(alpha)
+        rect = self.image.get_rect(center=(round(x) - offset[0],
+                                           round(y) - offset[1]))
+        return screen.blit(self.image, rect)
 
     def damage(self, value, rank=None):
         """Apply damage to the Tank."""
         self.hit_points -= value
-        sound_effects["tank_hit"].play()
+        audio.play("tank_hit")
         if self.hit_points <= 0:
-            sound_effects["impact"].play()  # Play the destruction sound
+            audio.play("impact")  # Play the destruction sound
             self.reset()
         elif self.rank > 0:
             self.rank -= 1
@@ -156,27 +231,31 @@ class Tank(GameObject):
 
     @staticmethod
     def create_if_no_collision(objects_list, grid_size):
-        """Create the tank if there's no collision."""
-        while True:
-            x = randint(
-                0,
-                Settings.SCREEN_WIDTH // Settings.GRID_SIZE - 1
-            ) * Settings.GRID_SIZE
-            y = randint(
-                2,
-                Settings.SCREEN_HEIGHT // Settings.GRID_SIZE - 1
-            ) * Settings.GRID_SIZE
-            rect = pygame.Rect(x, y, grid_size, grid_size)
-            if not BrickBlock.is_colliding(rect, objects_list):
-                return x, y
+        """Find a free cell to place the tank on.
+
+        Returns the (x, y) position of a random free cell of the occupancy
+        map within the view of the camera, or None if there is none.
+        """
+        return objects_list.occupancy.sample_free(objects_list.camera.bounds)
 
     def reset(self):
-        """Reset the tank's state."""
-        x, y = self.create_if_no_collision(
+        """Reset the tank's state.
+
+        The tank respawns on a random free cell on the screen, or where it
+        is if there is none.
+        """
+        position = self.create_if_no_collision(
             self.objects_list,
             Settings.GRID_SIZE
         )
-        self.rect = pygame.Rect(x, y, Settings.GRID_SIZE, Settings.GRID_SIZE)
+        if position is not None:
+            self.rect = self.image.get_rect(
+                center=pygame.Rect(
+                    position, (Settings.GRID_SIZE, Settings.GRID_SIZE)
+                ).center
+            )
+            self.previous_center = self.rect.center
+            self.objects_list.moved(self)
 
         self.rank = 0
         self.speed = Settings.SPEED
@@ -186,4 +265,3 @@ class Tank(GameObject):
         self.bullet_speed = 5
         self.bullet_damage = 1
         self.lives -= 1
-        self.sound_channel.set_volume(0.2)
@@ -0,0 +1,156 @@
+"""
+terrain.py: This module is part of the gameobjects package.
+
+This module contains the terrain layer: a surface slightly larger than the
+screen on which the tiles under the screen are pre-composited. Tiles almost
+never change, so instead of blitting every tile each frame the game blits
+this single surface and only re-draws a tile when it is placed or
+destroyed. When the camera scrolls by less than a cell the surface is only
+blitted elsewhere; when it crosses a cell the tiles under the screen are
+composited again, so the cost never depends on the size of the map. Tiles
+that cover what is under them, such as bushes, are drawn over the objects
+instead.
+"""
+
+import pygame
+
+from gameobjects.pygame_ui import image_tiles, screen
+from gameobjects.tilemap import COVERS, EMPTY
+from settings.settings import Settings
+
+
+class TerrainLayer:
+    """
+    A cached surface holding the images of the tiles under the screen.
+
+    The layer listens to the `TileMap` of the registry, so it is told about
+    every tile that is put on or removed from the map and keeps its
+    surface up to date. The surface holds a window of the map, one cell
+    wider and taller than the screen, whose first cell is `origin`.
+
+    Attributes:
+    - surface (Surface): The background with the tiles drawn on it.
+    - columns (int): The number of columns of the window.
+    - rows (int): The number of rows of the window.
+    - origin (tuple): The (column, row) of the first cell of the window.
+    - offset (tuple): The position of the view of the camera on the map.
+    - covers (dict): The image and rect on the map of every covering tile
+      of the window, drawn over the objects, by cell.
+    - dirty (list): The rects of the screen changed since the last call
+      to `pop_dirty`.
+
+    Methods:
+    - tile_changed(column, row, old, new): Redraws the tile of a cell.
+    - map_loaded(tile_map): Draws the tiles of a new map.
+    - scroll(offset): Moves the layer under the view of the camera.
+    - pop_dirty(): Returns and forgets the changed rects.
+    - draw(): Blits the layer onto the screen.
+    - draw_covers(): Blits the covering tiles onto the screen.
+    - restore(rect): Blits the part of the layer under a rect.
+    """
+
+    def __init__(self, size=(Settings.SCREEN_WIDTH, Settings.SCREEN_HEIGHT),
+                 cell_size=Settings.GRID_SIZE):
+        self.cell_size = cell_size
+        self.columns = -(-size[0] // cell_size) + 1
+        self.rows = -(-size[1] // cell_size) + 1
+        self.surface = pygame.Surface(
+            (self.columns * cell_size, self.rows * cell_size), 0, screen
+        )
+        self.origin = (0, 0)
+        self.offset = (0, 0)
+        self.tile_map = None
+        self.covers = {}
+        self.dirty = []
+        self.surface.fill(Settings.BOARD_BACKGROUND_COLOR)
+
+    @property
+    def position(self):
+        """The position of the surface on the screen."""
+        return (self.origin[0] * self.cell_size - self.offset[0],
+                self.origin[1] * self.cell_size - self.offset[1])
+
+    def _draw_tile(self, column, row, tile):
+        size = self.cell_size
+        rect = pygame.Rect((column - self.origin[0]) * size,
+                           (row - self.origin[1]) * size, size, size)
+        self.surface.fill(Settings.BOARD_BACKGROUND_COLOR, rect)
+        self.covers.pop((column, row), None)
+        if COVERS[tile]:
+            self.covers[(column, row)] = (
+                image_tiles[tile],
+                pygame.Rect(column * size, row * size, size, size)
+            )
+        elif tile != EMPTY:
+            self.surface.blit(image_tiles[tile], rect)
+        return rect.move(self.position)
+
+    def tile_changed(self, column, row, old, new):
+        """Draw the new tile of a cell of the window, or clear the cell."""
+        if (0 <= column - self.origin[0] < self.columns
+                and 0 <= row - self.origin[1] < self.rows):
+            self.dirty.append(self._draw_tile(column, row, new))
+
+    def map_loaded(self, tile_map):
+        """Draw the tiles of the window from a new map."""
+        self.tile_map = tile_map
+        self._composite()
+
+    def _composite(self):
+        """Draw every tile of the window again."""
+        size = self.cell_size
+        left, top = self.origin
+        self.surface.fill(Settings.BOARD_BACKGROUND_COLOR)
+        self.covers.clear()
+        window = pygame.Rect(left * size, top * size,
+                             self.columns * size, self.rows * size)
+        blits = []
+        for column, row, tile in self.tile_map.occupied(window):
+            if COVERS[tile]:
+                self.covers[(column, row)] = (
+                    image_tiles[tile],
+                    pygame.Rect(column * size, row * size, size, size)
+                )
+            else:
+                blits.append((image_tiles[tile],
+                              ((column - left) * size, (row - top) * size)))
+        self.surface.blits(blits, False)
+        self.dirty = [self.surface.get_rect(topleft=self.position)]
+
+    def scroll(self, offset):
+        """
+        Put the layer under the view of the camera at `offset` on the map.
+
+        Returns:
+            bool: True if the view moved, so the whole screen changed.
+        """
+        if offset == self.offset:
+            return False
+        self.offset = offset
+        origin = (offset[0] // self.cell_size, offset[1] // self.cell_size)
+        if origin != self.origin:
+            self.origin = origin
+            self._composite()
+        return True
+
+    def pop_dirty(self):
+        """Return the rects of the screen changed since the last call."""
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+    def draw(self):
+        """Blit the whole layer onto the screen."""
+        return screen.blit(self.surface, self.position)
+
+    def draw_covers(self):
+        """Blit the covering tiles over what was drawn on the screen."""
+        if self.covers:
+            x, y = self.offset
+            screen.blits([(image, rect.move(-x, -y))
+                          for image, rect in self.covers.values()], False)
+
+    def restore(self, rect):
+        """Blit the part of the layer under `rect` back onto the screen."""
+        x, y = self.position
+        rect = rect.clip(self.surface.get_rect(topleft=(x, y)))
+        return screen.blit(self.surface, rect, rect.move(-x, -y))
@@ -0,0 +1,239 @@
+"""
+tilemap.py: This module is part of the gameobjects package.
+
+This module contains the terrain of the map: a grid of tiles stored as one
+byte per cell. Bricks, armor, water, ice and bushes are not game objects but
+tile types, and what a tile does is a rule of its type, looked up in tables
+indexed by the type: whether tanks can drive onto it, whether bullets stop
+on it, the rank a tank needs to destroy it with a bullet, whether tanks
+slide on it and whether it hides what is under it. Colliding with the
+terrain is a lookup of the few cells a rect overlaps, so neither the memory
+nor the cost of a tick grows with the number of blocks on the map.
+"""
+
+import numpy as np
+
+from gameobjects.pygame_ui import audio
+from gameobjects.spatial import cells_for_rect
+from settings.settings import Settings
+
+EMPTY = 0
+BRICK = 1
+ARMOR = 2
+WATER = 3
+ICE = 4
+BUSHES = 5
+TILE_NAMES = ('empty', 'brick', 'armor', 'water', 'ice', 'bushes')
+
+# The rules of each tile type, indexed by the type:
+# - BLOCKS_TANKS: tanks cannot drive onto the tile;
+# - STOPS_BULLETS: bullets hit the tile instead of flying over it;
+# - BREAK_RANK: the rank the tank that fired a bullet needs for the bullet
+#   to destroy the tile, NEVER if bullets do not destroy it;
+# - SLIPPERY: tanks keep sliding on the tile when no key is held;
+# - COVERS: the tile is drawn over the tanks and the bullets.
+NEVER = 255
+BLOCKS_TANKS = (False, True, True, True, False, False)
+STOPS_BULLETS = (False, True, True, False, False, False)
+BREAK_RANK = (NEVER, 0, 3, NEVER, NEVER, NEVER)
+SLIPPERY = (False, False, False, False, True, False)
+COVERS = (False, False, False, False, False, True)
+
+# The same tables as arrays, to look up many tiles at once
+STOPS_BULLETS_ARRAY = np.array(STOPS_BULLETS, dtype=bool)
+
+
+class TileMap:
+    """
+    A grid of tiles, one byte per cell.
+
+    The tiles are kept in a flat buffer of bytes, indexed by
+    `row * columns + column`, for fast lookups of single cells, and `tiles`
+    is a 2D NumPy view of the same bytes, `tiles[row, column]`, for
+    vectorized lookups. Cells outside the map are empty. The buffer is a
+    `bytearray`, or the pages of a map file once one is loaded.
+
+    Listeners are told about every tile that changes through their
+    `tile_changed(column, row, old, new)` method, so the occupancy map, the
+    drawn terrain and the regeneration of the blocks stay in sync with the
+    map. When the whole map is put at once, because a map is loaded, the map
+    is cleared or the listener was just added, they are told through their
+    `map_loaded(tile_map)` method instead and read the new map in bulk.
+
+    Attributes:
+    - columns (int): The number of columns of the map.
+    - rows (int): The number of rows of the map.
+    - cell_size (int): The size of a cell in pixels.
+    - cells (bytearray): The tile type of every cell, a `bytearray` or a
+      `memoryview` of a map file.
+    - tiles (ndarray): The tile types as a `rows x columns` uint8 array.
+    - listeners (list): The objects told about the tiles that change.
+
+    Methods:
+    - get(column, row): Returns the tile type of a cell.
+    - set(column, row, tile): Changes the tile of a cell.
+    - replace(data): Puts the tiles of a whole map at once.
+    - load(cells, columns, rows): Works on the tiles of another map.
+    - clear(): Empties every cell.
+    - count(): Returns the number of cells holding a tile.
+    - occupied(rect): Iterates over the cells holding a tile.
+    - add_listener(listener): Tells an object about the map and its
+      changes.
+    - blocks_tanks(rect): Tells whether a rect overlaps a tile tanks cannot
+      drive onto.
+    - is_slippery(x, y): Tells whether the tile under a point is slippery.
+    - stops_bullets(column, row): Tells whether bullets hit a cell.
+    - damage(column, row, value, rank): Hits a cell with a bullet.
+    """
+
+    def __init__(self, columns=Settings.GRID_WIDTH, rows=Settings.GRID_HEIGHT,
+                 cell_size=Settings.GRID_SIZE):
+        self.cell_size = cell_size
+        self.listeners = []
+        self._use(bytearray(columns * rows), columns, rows)
+
+    def _use(self, cells, columns, rows):
+        self.columns = columns
+        self.rows = rows
+        self.cells = cells
+        self.tiles = np.frombuffer(cells, dtype=np.uint8).reshape(
+            rows, columns
+        )
+
+    def get(self, column, row):
+        """Return the tile type of a cell, EMPTY outside the map."""
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return self.cells[row * self.columns + column]
+        return EMPTY
+
+    def set(self, column, row, tile):
+        """
+        Put `tile` on a cell, EMPTY to clear it.
+
+        Raises:
+            IndexError: If the cell is outside the map.
+        """
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            raise IndexError(f'cell ({column}, {row}) is outside the map')
+        cell = row * self.columns + column
+        old = self.cells[cell]
+        if old == tile:
+            return
+        self.cells[cell] = tile
+        for listener in self.listeners:
+            listener.tile_changed(column, row, old, tile)
+
+    def replace(self, data):
+        """
+        Put the tiles of a whole map, `columns * rows` bytes in row order.
+
+        Only the cells that differ are changed, so replacing a map by a
+        slightly different one is cheap.
+
+        Raises:
+            ValueError: If `data` does not hold one byte per cell or holds
+            an unknown tile type.
+        """
+        new = np.frombuffer(data, dtype=np.uint8)
+        if new.size != len(self.cells):
+            raise ValueError('tile data does not fit the map')
+        if new.size and int(new.max()) >= len(TILE_NAMES):
+            raise ValueError('unknown tile type')
+        current = np.frombuffer(self.cells, dtype=np.uint8)
+        for cell in np.flatnonzero(current != new).tolist():
+            row, column = divmod(cell, self.columns)
+            self.set(column, row, int(new[cell]))
+
+    def load(self, cells, columns, rows):
+        """
+        Work on `cells`, the tiles of a `columns x rows` map in row order.
+
+        The tiles are not copied: `cells` can be a writable memory-mapped
+        file, and only the listeners read the whole map.
+
+        Raises:
+            ValueError: If `cells` does not hold one byte per cell or holds
+            an unknown tile type.
+        """
+        if len(cells) != columns * rows:
+            raise ValueError('tile data does not fit the map')
+        tiles = np.frombuffer(cells, dtype=np.uint8)
+        if tiles.max(initial=EMPTY) >= len(TILE_NAMES):
+            raise ValueError('unknown tile type')
+        self._use(cells, columns, rows)
+        self._loaded()
+
+    def _loaded(self):
+        for listener in self.listeners:
+            listener.map_loaded(self)
+
+    def clear(self):
+        """Empty every cell of the map."""
+        self.tiles.fill(EMPTY)
+        self._loaded()
+
+    def count(self):
+        """Return the number of cells holding a tile."""
+        return int(np.count_nonzero(self.tiles))
+
+    def occupied(self, rect=None):
+        """
+        Iterate over the (column, row, tile) of the cells holding a tile,
+        row by row.
+
+        Parameters:
+            rect (Rect): Only the cells overlapping this rect, in pixels, are
+            visited if given.
+        """
+        left, top = 0, 0
+        tiles = self.tiles
+        if rect is not None:
+            size = self.cell_size
+            left = max(rect.left // size, 0)
+            top = max(rect.top // size, 0)
+            tiles = tiles[top:max(top, (rect.bottom - 1) // size + 1),
+                          left:max(left, (rect.right - 1) // size + 1)]
+        columns = tiles.shape[1]
+        width = self.columns
+        cells = self.cells
+        for cell in np.flatnonzero(tiles).tolist():
+            row, column = divmod(cell, columns)
+            row += top
+            column += left
+            yield column, row, cells[row * width + column]
+
+    def add_listener(self, listener):
+        """Tell `listener` about the map and the changes of its tiles."""
+        self.listeners.append(listener)
+        listener.map_loaded(self)
+
+    def blocks_tanks(self, rect):
+        """Return True if `rect` overlaps a tile tanks cannot drive onto."""
+        get = self.get
+        return any(BLOCKS_TANKS[get(column, row)]
+                   for column, row in cells_for_rect(rect, self.cell_size))
+
+    def is_slippery(self, x, y):
+        """Return True if the tile under the pixel (x, y) is slippery."""
+        return SLIPPERY[self.get(x // self.cell_size, y // self.cell_size)]
+
+    def stops_bullets(self, column, row):
+        """Return True if bullets hit the tile of a cell."""
+        return STOPS_BULLETS[self.get(column, row)]
+
+    def damage(self, column, row, value, rank):
+        """
+        Hit the tile of a cell with a bullet.
+
+        The tile is destroyed if the bullet does damage and the tank that
+        fired it has at least the rank the tile type needs: any rank for a
+        brick, rank 3 for armor.
+
+        Returns:
+            bool: True if the tile was destroyed.
+        """
+        audio.play("block_hit")
+        if value > 0 and rank >= BREAK_RANK[self.get(column, row)]:
+            self.set(column, row, EMPTY)
+            return True
+        return False
@@ -0,0 +1,61 @@
+"""
+timestep.py: This module is part of the gameobjects package.
+
+This module contains the fixed-timestep clock that decouples the game
+simulation from rendering. The simulation always advances in ticks of
+1 / `Settings.FPS` seconds, however fast or slow frames are drawn, and the
+fraction of a tick left over is used to interpolate the drawn positions.
+"""
+
+import time
+
+from settings.settings import Settings
+
+
+class FixedTimestep:
+    """
+    Accumulate frame time and turn it into a whole number of ticks.
+
+    Attributes:
+    - tick_time (float): The duration of a simulation tick in seconds.
+    - max_ticks (int): The maximum number of ticks run for a single frame.
+      When the machine cannot keep up, the extra time is dropped, so the
+      game slows down instead of falling further and further behind.
+    - accumulator (float): The time not yet consumed by ticks.
+
+    Methods:
+    - reset(): Forgets the accumulated time, e.g. after a menu was shown.
+    - advance(): Returns the number of ticks to run for this frame.
+    - alpha: The fraction of a tick to interpolate the drawn frame by.
+    """
+
+    def __init__(self, tick_rate=Settings.FPS,
+                 max_ticks=Settings.MAX_FRAME_SKIP):
+        self.tick_time = 1 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.previous_time = time.perf_counter()
+
+    def reset(self):
+        """Drop the accumulated time and restart measuring from now."""
+        self.accumulator = 0.0
+        self.previous_time = time.perf_counter()
+
+    def advance(self):
+        """Return the number of simulation ticks due since the last call."""
+        now = time.perf_counter()
+        self.accumulator += now - self.previous_time
+        self.previous_time = now
+
+        ticks = int(self.accumulator / self.tick_time)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.tick_time
+        return ticks
+
+    @property
+    def alpha(self):
+        """The fraction of the next tick that has already elapsed."""
+        return min(self.accumulator / self.tick_time, 1.0)
@@ -0,0 +1,153 @@
+"""
+headless.py: Run the game simulation without a window or audio.
+
+The simulation runs uncapped: no frame limit, no rendering and no sound.
+Both tanks are driven by bots or by scripted inputs, and the number of
+simulated ticks per second is reported at the end. This is meant for
+benchmarking and for batch-simulating matches on machines with no display.
+
+A script file is a JSON object mapping "player1" and "player2" to a list of
+`[ticks, [action, ...]]` steps, where an action is one of left, right, up,
+down or shoot.
+
+Usage:
+    python headless.py --ticks 100000 --seed 42
+    python headless.py --player1 script:inputs.json --player2 bot --json
+    python headless.py --ticks 20000 --record replays
+    python headless.py --ticks 5000 --save-state game.snapshot
+    python headless.py --ticks 5000 --load-state game.snapshot
+    python headless.py --ticks 20000 --map maps/large.map
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import main  # noqa: E402
+from gameobjects import snapshot  # noqa: E402
+from gameobjects.bullet_engine import BulletManager  # noqa: E402
+from gameobjects.controls import BotController, ScriptedController  # noqa
+from gameobjects.mapfile import GameMap  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+
+
+def make_controller(spec, move_input, player, seed):
+    """Build the controller described by a --player1/--player2 option."""
+    if spec == 'bot':
+        return BotController(move_input, seed)
+    if spec.startswith('script:'):
+        return ScriptedController.from_file(
+            move_input,
+            spec[len('script:'):],
+            player
+        )
+    raise ValueError(f"Unknown controller '{spec}', use bot or script:FILE")
+
+
+def run(ticks, seed, player1='bot', player2='bot',
+        vectorized_bullets=False, load_state=None, save_state=None):
+    """
+    Simulate `ticks` ticks of the game and measure the speed.
+
+    A new match is started every time one ends, like pressing a key on the
+    game over screen does, seeded with `seed` plus the number of matches
+    played so far. With `vectorized_bullets` the bullets are simulated by
+    the vectorized bullet engine. When the replay directory of the match is
+    set, the replay of every match, finished or not, is saved there.
+    With `load_state` the first match resumes from a snapshot file, and
+    with `save_state` a snapshot of the last match is written at the end.
+
+    Returns:
+        dict: The number of ticks, the elapsed time, the ticks per second,
+        the number of finished matches, the wins of each player and the
+        worst time spent regenerating blocks in a single tick.
+    """
+    if vectorized_bullets and main.game_objects.bullet_engine is None:
+        main.game_objects.attach_bullet_engine(
+            BulletManager(main.game_objects)
+        )
+    controllers = (
+        make_controller(player1, PLAYER1_INPUT, 'player1', seed),
+        make_controller(player2, PLAYER2_INPUT, 'player2', seed + 1)
+    )
+    match = main.match
+    match.start(seed, controllers)
+    if load_state:
+        snapshot.load_file(load_state, match)
+
+    wins = {'Player 1': 0, 'Player 2': 0}
+    start = time.perf_counter()
+    for _ in range(ticks):
+        match.update()
+        if match.is_over():
+            wins[f'Player {match.winner() + 1}'] += 1
+            match.save_replay()
+            # Every match gets its own seed, derived from the first one
+            match.start(seed + sum(wins.values()), controllers)
+    elapsed = time.perf_counter() - start
+    match.save_replay()
+    if save_state:
+        snapshot.save_file(match, save_state)
+
+    return {
+        'ticks': ticks,
+        'seed': seed,
+        'seconds': elapsed,
+        'ticks_per_second': ticks / elapsed if elapsed else 0.0,
+        'matches': sum(wins.values()),
+        'wins': wins,
+        'worst_regeneration_step_ms':
+            match.regenerator.worst_step_time * 1e3
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Run the game simulation without a window or audio.'
+    )
+    parser.add_argument('--ticks', type=int, default=10000,
+                        help='number of ticks to simulate')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random generators')
+    parser.add_argument('--player1', default='bot',
+                        help='bot or script:FILE')
+    parser.add_argument('--player2', default='bot',
+                        help='bot or script:FILE')
+    parser.add_argument('--vectorized-bullets', action='store_true',
+                        help='simulate bullets with the vectorized engine')
+    parser.add_argument('--record', metavar='DIR',
+                        help='save the replay of every match to DIR')
+    parser.add_argument('--load-state', metavar='FILE',
+                        help='resume the first match from a snapshot file')
+    parser.add_argument('--save-state', metavar='FILE',
+                        help='save a snapshot of the last match to FILE')
+    parser.add_argument('--map', metavar='FILE',
+                        help='play on a map file instead of a random map')
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args()
+    if args.record:
+        main.match.replay_dir = args.record
+    if args.map:
+        main.match.game_map = GameMap(args.map)
+
+    report = run(args.ticks, args.seed, args.player1, args.player2,
+                 args.vectorized_bullets, args.load_state, args.save_state)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{report['ticks']} ticks in {report['seconds']:.2f} s: "
+              f"{report['ticks_per_second']:.0f} ticks/s, "
+              f"{report['matches']} matches finished, wins {report['wins']}, "
+              f"worst regeneration step "
+              f"{report['worst_regeneration_step_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -1,99 +1,79 @@
 import sys
-from random import randint
-from typing import List
 
 import pygame
 
-from gameobjects.base import GameObject
-from gameobjects.blocks import BrickBlock, ArmorBlock
-from gameobjects.gameobjects import Bonus
+from gameobjects.registry import EntityRegistry
 from settings.settings import Settings
-from gameobjects.pygame_ui import (
-    UI,
-    PLAYER1_INPUT,
-    PLAYER2_INPUT,
-    image_bonuses
+from gameobjects.pygame_ui import UI, audio
+from gameobjects.terrain import TerrainLayer
+from gameobjects.render import FullRenderer, DirtyRectRenderer
+from gameobjects.timestep import FixedTimestep
+from gameobjects.bullet_engine import BulletManager
+from gameobjects.mapfile import GameMap
+from gameobjects.match import Match
+from gameobjects.profiler import (
+    FrameProfiler,
+    NullProfiler,
+    PerformanceOverlay
 )
-from gameobjects.tank import Tank
 
 settings = Settings()
 
-game_objects = []
+game_objects = EntityRegistry()
 ui = UI(game_objects)
+if settings.VECTORIZED_BULLETS:
+    game_objects.attach_bullet_engine(BulletManager(game_objects))
+match = Match(game_objects, None, settings.REPLAY_DIR,
+              GameMap(settings.MAP_FILE) if settings.MAP_FILE else None)
 
+# Set up by `setup_rendering`, only by the entry points that draw the match
+terrain = None
+renderer = None
+profiler = NullProfiler()
+overlay = None
 
-def create_objects():
-    """
-    Create objects for the game.
-
-    This method creates instances of the Tank and BrickBlock classes and
-    adds them to the game_objects list. It initializes two Tank objects with
-    the given color, initial position, input * type, game_objects list,
-    and movement speed. It also creates a number of BrickBlock objects based
-    on the BLOCKS_COUNT constant and the size of the game grid.
-
-    Parameters:
-    None
 
-    Returns:
-    None
-    """
-    Tank(
-        settings.RED_COLOR,
-        settings.PLAYER1_INIT_POSITION,
-        0,
-        PLAYER1_INPUT,
-        game_objects,
-        4
-    )
-    Tank(
-        settings.BLUE_COLOR,
-        settings.PLAYER2_INIT_POSITION,
-        0,
-        PLAYER2_INPUT,
-        game_objects,
-        3
-    )
-    for _ in range(settings.BLOCKS_COUNT):
-        BrickBlock.create_if_no_collision(game_objects, settings.GRID_SIZE)
-
-
-def update_objects(timer: int) -> None:
+def setup_rendering():
     """
+    Set up drawing the match: the terrain layer, the renderer and, unless
+    headless, the profiler and its overlay if `settings.PROFILER` is set.
 
-    Update Objects
-
-    Updates the game objects based on the given timer.
-
-    :param timer: The current timer value in milliseconds.
-    :type timer: int
+    Headless runs that do not draw never call this, so tile changes are not
+    drawn on a terrain layer and ticks are not timed. Calling it again
+    changes nothing.
 
+    Returns:
+        Renderer: The renderer of the match.
     """
-    if timer % (60 * settings.FPS) == 0:  # Каждую минуту
-        bricks_to_replace = [block for block in game_objects if
-                             isinstance(block, BrickBlock)]
-        for brick in bricks_to_replace:
-            game_objects.remove(brick)
-            if randint(0, 100) < 30:
-                ArmorBlock.create_if_no_collision(game_objects,
-                                                  settings.GRID_SIZE)
-            else:
-                BrickBlock.create_if_no_collision(game_objects,
-                                                  settings.GRID_SIZE)
-
-
-def handle_game_over(objects: List[GameObject]) -> None:
+    global terrain, renderer, profiler, overlay
+    if renderer is not None:
+        return renderer
+    terrain = TerrainLayer()
+    game_objects.tiles.add_listener(terrain)
+    if settings.PROFILER and not settings.HEADLESS:
+        profiler = FrameProfiler()
+        overlay = PerformanceOverlay(profiler)
+        match.profiler = profiler
+    if settings.DIRTY_RECTS:
+        renderer = DirtyRectRenderer(game_objects, terrain, ui, profiler,
+                                     overlay)
+    else:
+        renderer = FullRenderer(game_objects, terrain, ui, profiler, overlay)
+    return renderer
+
+
+def handle_game_over(objects: EntityRegistry) -> None:
     """
     Handles the game over logic.
 
     Parameters:
-        objects (list): The list of game objects.
+        objects (EntityRegistry): The registry of game objects.
 
         Returns:
             None
     """
-    for obj in objects:
-        if obj.type == 'tank' and obj.color == settings.RED_COLOR:
+    for obj in objects.of_kind('tank'):
+        if obj.color == settings.RED_COLOR:
             win = 'Player 2'
         else:
             win = 'Player 2'
@@ -119,9 +99,8 @@ def handle_gameplay_events(event, gameplay):
         pygame.quit()
         sys.exit()
     elif event.type == pygame.KEYDOWN:
-        game_objects.clear()
         gameplay = True
-        create_objects()
+        match.start()
     return gameplay
 
 
@@ -173,48 +152,58 @@ def handle_title_screen_events(event, game_status, title_screen):
     return game_status, title_screen
 
 
-def generate_bonus():
+def wait_events():
     """
+    Sleep until an event arrives, or at most 1 / `settings.MENU_FPS` s.
 
-    Generate a bonus object and set a random timer for the next bonus.
+    Used by the title and game over screens, which have nothing to animate,
+    so an idle menu uses next to no CPU.
 
     Returns:
-        int: The randomly generated bonus timer.
-
+        list: The pending events, possibly none.
     """
-    Bonus(randint(50, settings.SCREEN_WIDTH - 50),
-          randint(50, settings.SCREEN_HEIGHT - 50),
-          randint(0, len(image_bonuses) - 1),
-          game_objects
-          )
-    bonus_timer = randint(120, 240)
-    return bonus_timer
+    event = pygame.event.wait(1000 // settings.MENU_FPS)
+    events = pygame.event.get()
+    if event.type != pygame.NOEVENT:
+        events.insert(0, event)
+    return events
 
 
 def main():
     """Entry point of the game, setting up initial state and running the
-    game loop."""
-    bonus_timer = 1
+    game loop.
+
+    Gameplay runs on a fixed timestep: every frame the simulation advances
+    by as many ticks as are due at `settings.FPS` ticks per second, then a
+    frame is drawn, interpolated between the last two ticks. Rendering is
+    capped at `settings.RENDER_FPS` frames per second. The title and game
+    over screens are pre-rendered and sleep until an event arrives.
+
+    Every gameplay frame is timed phase by phase by the profiler; F3 shows
+    or hides its overlay.
+    """
+    setup_rendering()
+    timestep = FixedTimestep()
     title_screen = True
     game_status = True
     gameplay = True
-    game_timer = 0
-    create_objects()
+    match.start()
     music_started = False
 
     while game_status:
         if title_screen:
             ui.draw_title_screen()
-            pygame.display.update()
+            renderer.invalidate()
             music_started = False
 
-            for event in pygame.event.get():
+            for event in wait_events():
                 (game_status,
                  title_screen) = handle_title_screen_events(
                     event,
                     game_status,
                     title_screen
                 )
+            timestep.reset()
         else:
             if not music_started:
                 pygame.mixer.music.load("sounds/main.mp3")
@@ -222,40 +211,38 @@ def main():
                 music_started = True
 
             if gameplay:
-                game_timer += 1
+                profiler.begin_frame()
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         pygame.quit()
                         sys.exit()
-
-                if bonus_timer > 0:
-                    bonus_timer -= 1
-                else:
-                    bonus_timer = generate_bonus()
-
-                update_objects(game_timer)
-
-                for obj in game_objects:
-                    obj.update()
+                    elif (event.type == pygame.KEYDOWN
+                          and event.key == pygame.K_F3 and overlay):
+                        overlay.toggle()
+                        renderer.invalidate()
+                profiler.lap('events')
+
+                for _ in range(timestep.advance()):
+                    match.update()
+                    if match.is_over():
+                        gameplay = False
+                        audio.stop_all()
+                        match.save_replay()
+                        break
 
                 ui.update()
-                ui.screen.fill(settings.BOARD_BACKGROUND_COLOR)
-
-                for obj in game_objects:
-                    obj.draw()
-
-                ui.draw()
-
-                for obj in game_objects:
-                    if obj.type == 'tank' and obj.lives < 1:
-                        gameplay = False
+                renderer.draw(timestep.alpha)
+                ui.clock.tick(settings.RENDER_FPS)
+                profiler.lap('wait')
+                profiler.end_frame(game_objects)
 
             else:
                 handle_game_over(game_objects)
-                for event in pygame.event.get():
+                pygame.display.update()
+                renderer.invalidate()
+                for event in wait_events():
                     gameplay = handle_gameplay_events(event, gameplay)
-            pygame.display.update()
-            ui.clock.tick(settings.FPS)
+                timestep.reset()
 
 
 if __name__ == '__main__':
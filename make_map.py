@@ -0,0 +1,67 @@
+"""
+make_map.py: Write a random map file.
+
+About `--density` of the cells of the map hold a brick, and the tanks start
+in the middle of the map. Matches are played on the map by setting
+`MAP_FILE` in the settings, or with `python headless.py --map FILE`.
+
+Usage:
+    python make_map.py maps/large.map --size 256x256 --seed 1
+    python make_map.py maps/open.map --size 100x60 --density 0.1
+"""
+
+import argparse
+import os
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects.mapfile import (MIN_COLUMNS, MIN_ROWS,  # noqa: E402
+                                 random_map, save_map)
+from gameobjects.tilemap import TILE_NAMES  # noqa: E402
+
+
+def parse_size(size):
+    """Parse a COLUMNSxROWS option."""
+    try:
+        columns, rows = (int(value) for value in size.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"'{size}' is not COLUMNSxROWS"
+        ) from None
+    if not (MIN_COLUMNS <= columns <= 0xFFFF
+            and MIN_ROWS <= rows <= 0xFFFF):
+        raise argparse.ArgumentTypeError(
+            f'a map has {MIN_COLUMNS} to 65535 columns and {MIN_ROWS} to '
+            f'65535 rows'
+        )
+    return columns, rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Write a random map file.')
+    parser.add_argument('path', help='the map file to write')
+    parser.add_argument('--size', type=parse_size, default=(250, 190),
+                        help='COLUMNSxROWS, 10x10 screens by default')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the random generator')
+    parser.add_argument('--density', type=float, default=0.3,
+                        help='fraction of the cells holding a tile')
+    parser.add_argument('--tile', choices=TILE_NAMES[1:], default='brick',
+                        help='the tile put on the map')
+    args = parser.parse_args()
+
+    tiles, spawns = random_map(*args.size, args.seed, args.density,
+                               TILE_NAMES.index(args.tile))
+    directory = os.path.dirname(args.path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    save_map(args.path, tiles, spawns)
+    print(f'{args.path}: {args.size[0]}x{args.size[1]} cells, '
+          f'{int((tiles != 0).sum())} tiles')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,235 @@
+"""
+online.py: Play a match against another player over the network.
+
+One player hosts the match and runs the simulation; the other joins it and
+sends its inputs over UDP. The host plays the red tank with W, A, S, D and
+space, the player who joins plays the blue tank with the arrows and Enter.
+
+The loopback mode runs a host and a client in one process, without a window,
+both driven by bots, and sends their packets through the loopback interface
+with simulated latency, jitter and packet loss. It reports the bandwidth
+used per tick, the round-trip time and how often the client's prediction of
+its tank had to be corrected.
+
+Usage:
+    python online.py host --port 7777
+    python online.py join 192.168.1.10:7777
+    python online.py loopback --ticks 3600 --latency 50 --jitter 20 --loss 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+# The loopback mode needs no window; this must be known before the game
+# modules are imported
+if len(sys.argv) > 1 and sys.argv[1] == 'loopback':
+    os.environ['TANKS_HEADLESS'] = '1'
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+
+import main  # noqa: E402
+from gameobjects.controls import BotController, encode_keys  # noqa: E402
+from gameobjects.netplay import NetClient, NetHost  # noqa: E402
+from gameobjects.network import LinkConditioner, UdpTransport  # noqa: E402
+from gameobjects.profiler import percentile  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.registry import EntityRegistry  # noqa: E402
+from gameobjects.timestep import FixedTimestep  # noqa: E402
+
+DEFAULT_PORT = 7777
+
+
+def make_transport(address, args, clock=None):
+    """Open a UDP socket, behind a link conditioner if one is asked for."""
+    transport = UdpTransport(address)
+    if args.latency or args.jitter or args.loss:
+        options = {'clock': clock} if clock else {}
+        transport = LinkConditioner(
+            transport, args.latency / 1000, args.jitter / 1000,
+            args.loss / 100, seed=args.seed, **options
+        )
+    return transport
+
+
+def host(args):
+    """Host a match and play the red tank."""
+    main.setup_rendering()
+    transport = make_transport(('0.0.0.0', args.port), args)
+    net = NetHost(transport, main.game_objects)
+    match = main.match
+    match.start(args.seed)
+    print(f'Waiting for a player on port {transport.address[1]}')
+
+    timestep = FixedTimestep()
+    net_tick = 0
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+        for _ in range(timestep.advance()):
+            net.poll()
+            if not net.players:
+                continue
+            local = encode_keys(pygame.key.get_pressed(), PLAYER1_INPUT)
+            frame = bytes((local, net.next_input()))
+            match.update(frame)
+            if match.is_over():
+                match.start()
+            net_tick += 1
+            net.send_snapshot(net_tick)
+        main.renderer.draw(timestep.alpha)
+        main.ui.clock.tick(main.settings.RENDER_FPS)
+
+
+def join(args):
+    """Join a match and play the blue tank."""
+    main.setup_rendering()
+    address, _, port = args.address.rpartition(':')
+    transport = make_transport(('0.0.0.0', 0), args)
+    client = NetClient(transport, (address, int(port or DEFAULT_PORT)),
+                       main.game_objects, PLAYER2_INPUT, args.interpolation)
+
+    timestep = FixedTimestep()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+        for _ in range(timestep.advance()):
+            client.tick(encode_keys(pygame.key.get_pressed(), PLAYER2_INPUT))
+        client.interpolate(timestep.alpha)
+        main.renderer.draw(timestep.alpha)
+        main.ui.clock.tick(main.settings.RENDER_FPS)
+
+
+def loopback(args):
+    """
+    Play a match between two bots, one hosting and one joining it.
+
+    Time is simulated: every tick advances the clock of both ends by
+    1 / FPS, so the run is as fast as the machine allows while the link
+    conditioners delay the packets by the simulated latency.
+
+    Returns:
+        dict: The traffic, round-trip time and prediction statistics.
+    """
+    now = [0.0]
+
+    def clock():
+        return now[0]
+
+    host_transport = make_transport(('127.0.0.1', 0), args, clock)
+    client_transport = make_transport(('127.0.0.1', 0), args, clock)
+    net = NetHost(host_transport, main.game_objects)
+    client = NetClient(client_transport, host_transport.address,
+                       EntityRegistry(),
+                       PLAYER2_INPUT, args.interpolation, clock)
+
+    host_bot = BotController(PLAYER1_INPUT, args.seed)
+    client_bot = BotController(PLAYER2_INPUT, args.seed + 1)
+    match = main.match
+    match.start(args.seed)
+    matches = 0
+    down_bytes = []
+    up_bytes = []
+    lag = []
+    for net_tick in range(1, args.ticks + 1):
+        now[0] = net_tick / main.settings.FPS
+        sent_up = client_transport.bytes_sent
+        client.tick(encode_keys(client_bot.get_pressed(), PLAYER2_INPUT))
+        up_bytes.append(client_transport.bytes_sent - sent_up)
+
+        net.poll()
+        local = encode_keys(host_bot.get_pressed(), PLAYER1_INPUT)
+        frame = bytes((local, net.next_input()))
+        match.update(frame)
+        if match.is_over():
+            matches += 1
+            match.start(args.seed + matches)
+        sent_down = host_transport.bytes_sent
+        net.send_snapshot(net_tick)
+        down_bytes.append(host_transport.bytes_sent - sent_down)
+        lag.append(net_tick - client.latest_tick)
+
+    rtt = [sample * 1000 for sample in client.rtt_samples]
+    return {
+        'ticks': args.ticks,
+        'matches': matches,
+        'down_bytes_per_tick': statistics.mean(down_bytes),
+        'down_bytes_p95': percentile(down_bytes, 0.95),
+        'down_bytes_max': max(down_bytes),
+        'up_bytes_per_tick': statistics.mean(up_bytes),
+        'rtt_ms_p50': percentile(rtt, 0.5),
+        'rtt_ms_p95': percentile(rtt, 0.95),
+        'snapshots_sent': net.snapshots,
+        'full_snapshots': net.full_snapshots,
+        'snapshots_applied': client.snapshots,
+        'snapshot_lag_ticks': statistics.mean(lag),
+        'state_matches': client.applied == net.states.get(client.latest_tick),
+        'corrections': client.corrections,
+        'mean_correction_px': (client.correction_distance / client.corrections
+                               if client.corrections else 0.0),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Play a match against another player over UDP.'
+    )
+    modes = parser.add_subparsers(dest='mode', required=True)
+    host_parser = modes.add_parser('host', help='host a match')
+    host_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    join_parser = modes.add_parser('join', help='join a match')
+    join_parser.add_argument('address', help='HOST[:PORT] of the host')
+    join_parser.add_argument('--interpolation', type=int, default=4,
+                             help='ticks the other entities are drawn late')
+    loopback_parser = modes.add_parser(
+        'loopback', help='bot against bot over the loopback interface'
+    )
+    loopback_parser.add_argument('--ticks', type=int, default=3600)
+    loopback_parser.add_argument('--interpolation', type=int, default=4,
+                                 help='ticks the other entities are drawn '
+                                      'late')
+    for mode in (host_parser, join_parser, loopback_parser):
+        mode.add_argument('--seed', type=int, default=0,
+                          help='seed of the match and of the link')
+        mode.add_argument('--latency', type=float, default=0.0,
+                          help='simulated one-way delay of sent packets, '
+                               'in ms')
+        mode.add_argument('--jitter', type=float, default=0.0,
+                          help='simulated random extra delay, in ms')
+        mode.add_argument('--loss', type=float, default=0.0,
+                          help='simulated packet loss, in percent')
+    args = parser.parse_args()
+
+    if args.mode == 'host':
+        host(args)
+    elif args.mode == 'join':
+        join(args)
+    else:
+        report = loopback(args)
+        print(f"{report['ticks']} ticks, {report['matches']} matches "
+              f"finished\n"
+              f"host -> client: {report['down_bytes_per_tick']:.1f} "
+              f"bytes/tick (p95 {report['down_bytes_p95']}, "
+              f"max {report['down_bytes_max']}), "
+              f"{report['full_snapshots']} full snapshots\n"
+              f"client -> host: {report['up_bytes_per_tick']:.1f} "
+              f"bytes/tick\n"
+              f"RTT: p50 {report['rtt_ms_p50']:.1f} ms, "
+              f"p95 {report['rtt_ms_p95']:.1f} ms\n"
+              f"snapshots: {report['snapshots_sent']} sent, "
+              f"{report['snapshots_applied']} applied, client "
+              f"{report['snapshot_lag_ticks']:.1f} ticks behind, state "
+              f"{'matches' if report['state_matches'] else 'DIFFERS'}\n"
+              f"prediction corrections: {report['corrections']} "
+              f"(mean {report['mean_correction_px']:.1f} px)")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,125 @@
+"""
+play_replay.py: Re-run a recorded match at uncapped speed.
+
+The match is simulated again from the seed and the input frames stored in a
+replay file, without a window or audio, and its final state is checked
+against the digest recorded with it. Every tick is timed, so a frame-time
+spike seen in a real game can be reproduced and located offline.
+
+Replays are recorded by setting `REPLAY_DIR` in the settings, or with
+`python headless.py --record DIR`.
+
+A match played on a map file is replayed on the same map, given with
+--map; the replay records the size and the digest of its map, and is
+refused on any other map.
+
+Usage:
+    python play_replay.py replays/1234.replay
+    python play_replay.py replays/1234.replay --draw --top 10
+    python play_replay.py replays/1234.replay --map maps/large.map
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import main  # noqa: E402
+from gameobjects.bullet_engine import BulletManager  # noqa: E402
+from gameobjects.mapfile import GameMap, MapError  # noqa: E402
+from gameobjects.replay import Replay, ReplayError, state_digest  # noqa
+
+
+def play(replay, draw=False):
+    """
+    Simulate a replay from its first tick to its last.
+
+    The bullet engine is attached if the match was recorded with it. With
+    `draw` every tick is also drawn, off screen.
+
+    Returns:
+        dict: The number of ticks, the elapsed time, the time of every tick
+        in seconds, whether the match ended and the digest of the final
+        state.
+
+    Raises:
+        ReplayError: If the map of the match is not the map of the replay.
+    """
+    match = main.match
+    replay.check_map(match.game_map)
+    match.replay_dir = ''
+    if replay.vectorized_bullets and main.game_objects.bullet_engine is None:
+        main.game_objects.attach_bullet_engine(
+            BulletManager(main.game_objects)
+        )
+    if draw:
+        main.setup_rendering()
+    match.start(replay.seed)
+    tick_times = []
+    clock = time.perf_counter
+    start = clock()
+    for frame in replay.frames:
+        tick_start = clock()
+        match.update(frame)
+        if draw:
+            main.renderer.follow(1.0)
+            main.terrain.draw()
+            main.renderer.draw_objects(1.0)
+            main.terrain.draw_covers()
+            main.renderer.draw_ui()
+        tick_times.append(clock() - tick_start)
+    elapsed = clock() - start
+    return {
+        'ticks': len(replay.frames),
+        'seconds': elapsed,
+        'tick_times': tick_times,
+        'finished': match.is_over(),
+        'digest': state_digest(main.game_objects),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Re-run a recorded match and time every tick.'
+    )
+    parser.add_argument('replay', help='the replay file')
+    parser.add_argument('--draw', action='store_true',
+                        help='draw every tick off screen as well')
+    parser.add_argument('--top', type=int, default=5,
+                        help='number of slowest ticks to list')
+    parser.add_argument('--map', metavar='FILE',
+                        help='the map file the match was played on')
+    args = parser.parse_args()
+    try:
+        if args.map:
+            main.match.game_map = GameMap(args.map)
+        replay = Replay.load(args.replay)
+        result = play(replay, args.draw)
+    except (MapError, ReplayError) as error:
+        parser.error(str(error))
+    ticks = result['ticks']
+    print(f"seed {replay.seed}: {ticks} ticks in {result['seconds']:.2f} s "
+          f"({ticks / result['seconds']:.0f} ticks/s)"
+          + (', match finished' if result['finished'] else ''))
+    slowest = sorted(range(ticks), key=result['tick_times'].__getitem__,
+                     reverse=True)[:args.top]
+    for tick in slowest:
+        print(f"  tick {tick + 1:>7}: "
+              f"{result['tick_times'][tick] * 1e3:.3f} ms")
+
+    if not replay.digest:
+        print('No digest recorded, the final state was not checked.')
+    elif result['digest'] == replay.digest:
+        print('Final state matches the recording.')
+    else:
+        print('Final state DIFFERS from the recording.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_cli()
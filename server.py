@@ -0,0 +1,190 @@
+"""
+server.py: Run a dedicated server hosting many online matches.
+
+The server has no window and no local player. Players ask its lobby for a
+match; every two players get a match of their own, hosted by one of the
+worker processes, one per core by default. While it runs, the server
+reports the number of matches per core, the tick latency percentiles (the
+time from when a tick is due to when its snapshots are sent) and the share
+of the tick budget the workers use.
+
+Load it with simulated players with `python -m benchmarks.loadtest`.
+
+Usage:
+    python server.py --port 7777
+    python server.py --port 7777 --workers 4 --duration 60 --json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameobjects.dedicated import Lobby, run_shard  # noqa: E402
+from gameobjects.profiler import percentile  # noqa: E402
+from settings.settings import Settings  # noqa: E402
+
+
+def summarize(reports, workers, seconds):
+    """
+    Sum up the worker reports of a period.
+
+    Returns:
+        dict: The matches open at the end of the period, per core, the tick
+        latency percentiles in ms, the share of the tick budget used, the
+        number of ticks dropped and the number of matches a core could run
+        at full load, extrapolated from the mean number of open matches.
+    """
+    latest = {}
+    open_matches = {}
+    latencies = []
+    busy = 0.0
+    dropped = 0
+    for report in reports:
+        latest[report['worker']] = report
+        open_matches.setdefault(report['worker'], []).append(
+            report['matches']
+        )
+        latencies.extend(report['latencies'])
+        busy += report['busy']
+        dropped += report['dropped']
+    matches = sum(report['matches'] for report in latest.values())
+    mean_matches = sum(sum(counts) / len(counts)
+                       for counts in open_matches.values())
+    load = busy / (seconds * workers) if seconds else 0.0
+    per_core = matches / workers
+    latencies = [latency * 1e3 for latency in latencies]
+    return {
+        'matches': matches,
+        'matches_per_core': per_core,
+        'tick_latency_ms_p50': percentile(latencies, 0.5),
+        'tick_latency_ms_p95': percentile(latencies, 0.95),
+        'tick_latency_ms_p99': percentile(latencies, 0.99),
+        'tick_latency_ms_max': max(latencies, default=0.0),
+        'load': load,
+        'estimated_matches_per_core':
+            mean_matches / workers / load if load else 0.0,
+        'dropped_ticks': dropped,
+    }
+
+
+def format_summary(summary):
+    return (f"{summary['matches']} matches "
+            f"({summary['matches_per_core']:.1f} per core), "
+            f"tick latency p50 {summary['tick_latency_ms_p50']:.2f} ms, "
+            f"p95 {summary['tick_latency_ms_p95']:.2f} ms, "
+            f"p99 {summary['tick_latency_ms_p99']:.2f} ms, "
+            f"load {summary['load']:.0%}, "
+            f"{summary['dropped_ticks']} ticks dropped")
+
+
+async def serve(args, workers, reports):
+    """Run the lobby and print the reports of the workers."""
+    loop = asyncio.get_running_loop()
+    lobby = Lobby(workers, args.seed)
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: lobby, local_addr=(args.host, args.port)
+    )
+    start = period_start = time.perf_counter()
+    period = []
+    everything = []
+    try:
+        while not args.duration or time.perf_counter() - start < args.duration:
+            await asyncio.sleep(0.2)
+            while True:
+                try:
+                    report = reports.get_nowait()
+                except queue.Empty:
+                    break
+                lobby.update_load(report)
+                period.append(report)
+                everything.append(report)
+            now = time.perf_counter()
+            if now - period_start >= args.report and not args.json:
+                print(format_summary(
+                    summarize(period, len(workers), now - period_start)
+                ), flush=True)
+                period = []
+                period_start = now
+    finally:
+        transport.close()
+    summary = summarize(everything, len(workers), time.perf_counter() - start)
+    summary['matches_created'] = lobby.matches_created
+    summary['workers'] = len(workers)
+    return summary
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description='Run a dedicated server hosting many online matches.'
+    )
+    parser.add_argument('--host', default='0.0.0.0',
+                        help='address to listen on')
+    parser.add_argument('--port', type=int, default=7777,
+                        help='port of the lobby; the workers use the next '
+                             'ports')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes, one per core by '
+                             'default')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first match')
+    parser.add_argument('--idle-timeout', type=float, default=10.0,
+                        help='seconds without input before a match is '
+                             'closed')
+    parser.add_argument('--duration', type=float, default=0.0,
+                        help='stop after this many seconds, 0 to run until '
+                             'interrupted')
+    parser.add_argument('--report', type=float, default=5.0,
+                        help='seconds between reports')
+    parser.add_argument('--json', action='store_true',
+                        help='print only the final report, as JSON')
+    args = parser.parse_args()
+
+    reports = multiprocessing.Queue()
+    workers = []
+    processes = []
+    for index in range(args.workers):
+        port = args.port + 1 + index
+        commands = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=run_shard,
+            args=(index, (args.host, port), commands, reports, Settings.FPS,
+                  args.idle_timeout),
+            daemon=True
+        )
+        process.start()
+        workers.append((port, commands))
+        processes.append(process)
+
+    try:
+        summary = asyncio.run(serve(args, workers, reports))
+    except KeyboardInterrupt:
+        summary = None
+    finally:
+        for _, commands in workers:
+            commands.put(('stop',))
+        for process in processes:
+            process.join(timeout=2)
+
+    if summary is not None:
+        if args.json:
+            print(json.dumps(summary))
+        else:
+            print(f"{summary['matches_created']} matches created on "
+                  f"{summary['workers']} workers\n"
+                  + format_summary(summary) + "\n"
+                  f"estimated capacity "
+                  f"{summary['estimated_matches_per_core']:.0f} matches "
+                  f"per core")
+
+
+if __name__ == '__main__':
+    main_cli()
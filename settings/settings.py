@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass, field
 import pygame
 
@@ -30,13 +31,43 @@ class Settings:
     - HP: The number of health points for each player.
     - LIVES: The number of lives for each player.
     - SPEED: The speed of the players in the game.
-    - FPS: The frames per second for the game.
+    - FPS: The number of simulation ticks per second. Game timers are
+      counted in ticks.
+    - RENDER_FPS: The maximum number of frames drawn per second, 0 for no
+      limit. Rendering is independent of the simulation rate.
+    - MENU_FPS: The number of times per second the title and game over
+      screens wake up when no event arrives. Menus otherwise sleep until an
+      event is received.
+    - MAX_FRAME_SKIP: The maximum number of simulation ticks run before a
+      frame is drawn when the machine cannot keep up.
     - BLOCKS_COUNT: The number of blocks in the game.
+    - REGENERATION_BUDGET: The maximum number of blocks replaced per tick
+      while the blocks are being regenerated.
     - MOVES_INPUT: The valid moves input for the players as a list of
       coordinate changes.
     - SPACING: The spacing between elements in the game.
     - MAX_ATTEMPTS: The maximum number of attempts for a certain action
       in the game.
+    - VECTORIZED_BULLETS: Whether bullets are simulated by the vectorized
+      bullet engine, meant for stress and bullet-hell modes with thousands
+      of bullets, instead of as separate Bullet objects.
+    - DIRTY_RECTS: Whether gameplay is drawn with the dirty-rectangle
+      renderer, which only updates the changed areas of the window, instead
+      of redrawing the whole window every frame.
+    - AUDIO_CHANNELS: The number of mixer channels sound effects share.
+    - HEADLESS: Whether the game runs without a window and without audio.
+      Enabled by setting the TANKS_HEADLESS environment variable to 1 before
+      the game modules are imported.
+    - REPLAY_DIR: The directory the replay of every match is saved to,
+      empty to record no replays.
+    - MAP_FILE: The map file the matches are played on, empty for a random
+      map the size of the screen. A map larger than the screen scrolls with
+      the tanks.
+    - PROFILER: Whether the frame phases are timed. The overlay showing the
+      measurements is toggled with F3 during gameplay.
+    - PROFILER_HISTORY: The number of recent frames kept by the profiler.
+    - PROFILER_EXPORT: A .csv or .json file the profiler history is written
+      to every PROFILER_HISTORY frames, empty to disable the export.
 
     """
     BOARD_BACKGROUND_COLOR: tuple[int, int, int] = (0, 0, 0)
@@ -68,10 +99,26 @@ class Settings:
     LIVES: int = 3
     SPEED: int = 2
     FPS: int = 60
+    RENDER_FPS: int = 144
+    MENU_FPS: int = 2
+    MAX_FRAME_SKIP: int = 5
 
     BLOCKS_COUNT: int = 150
+    REGENERATION_BUDGET: int = 5
 
     MOVES_INPUT = [[0, -1], [1, 0], [0, 1], [-1, 0]]
 
     SPACING: int = 5
     MAX_ATTEMPTS: int = 1000
+
+    VECTORIZED_BULLETS: bool = False
+    DIRTY_RECTS: bool = False
+    AUDIO_CHANNELS: int = 8
+    HEADLESS: bool = os.environ.get('TANKS_HEADLESS') == '1'
+
+    REPLAY_DIR: str = ''
+    MAP_FILE: str = ''
+
+    PROFILER: bool = True
+    PROFILER_HISTORY: int = 300
+    PROFILER_EXPORT: str = ''
@@ -0,0 +1,49 @@
+"""
+conftest.py: This module is part of the tests package.
+
+The game modules open a window and the audio device when they are imported,
+unless the game runs headless, so the tests run the game headless with the
+dummy SDL drivers. The fixtures start the bot duels most tests play.
+"""
+
+import os
+import random
+
+os.environ['TANKS_HEADLESS'] = '1'
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pytest  # noqa: E402
+
+from gameobjects.bullet_engine import BulletManager  # noqa: E402
+from gameobjects.controls import BotController  # noqa: E402
+from gameobjects.match import Match  # noqa: E402
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT  # noqa: E402
+from gameobjects.registry import EntityRegistry  # noqa: E402
+
+
+def new_match(vectorized=False, replay_dir=''):
+    """Return a match on a registry of its own, not started yet."""
+    objects_list = EntityRegistry()
+    if vectorized:
+        objects_list.attach_bullet_engine(BulletManager(objects_list))
+    return Match(objects_list, replay_dir=replay_dir)
+
+
+def random_frames(seed, ticks):
+    """Return `ticks` input frames of two tanks pressing random keys."""
+    rng = random.Random(seed)
+    return [bytes((rng.randrange(32), rng.randrange(32)))
+            for _ in range(ticks)]
+
+
+@pytest.fixture
+def duel():
+    """Return a function starting a bot duel from a seed."""
+    def start(seed, vectorized=False, replay_dir=''):
+        match = new_match(vectorized, replay_dir)
+        match.start(seed, (BotController(PLAYER1_INPUT, seed),
+                           BotController(PLAYER2_INPUT, seed + 1)))
+        return match
+    return start
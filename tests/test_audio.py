@@ -0,0 +1,58 @@
+"""
+test_audio.py: This module is part of the tests package.
+
+Tests that the loop of a moving tank keeps playing however many sound
+effects compete for the channels, through the dummy SDL audio driver.
+"""
+
+import pygame
+import pytest
+
+from gameobjects.audio import AudioManager, SoundPolicy
+
+POLICIES = {
+    'track_long': SoundPolicy(priority=1, max_voices=2, cooldown=0.0,
+                              volume=0.2),
+    'impact': SoundPolicy(priority=5, max_voices=4, cooldown=0.0,
+                          volume=1.0),
+}
+
+
+@pytest.fixture
+def audio():
+    pygame.mixer.init()
+    # Ten seconds of silence, so no sound ends during a test
+    sound = pygame.mixer.Sound(buffer=bytes(4 * 44100 * 10))
+    yield AudioManager({'track_long': sound, 'impact': sound}, POLICIES,
+                       channels=4)
+    pygame.mixer.quit()
+
+
+def loops(audio):
+    return [voice.owner for voice in audio.voices
+            if voice is not None and voice.name == 'track_long']
+
+
+def test_effects_never_take_the_channel_of_a_loop(audio):
+    tank = object()
+    audio.start_loop('track_long', tank)
+    for _ in range(10):
+        audio.play('impact')
+    assert loops(audio) == [tank]
+
+
+def test_loop_without_a_channel_starts_once_one_is_free(audio):
+    tanks = [object() for _ in range(3)]
+    for tank in tanks:
+        audio.start_loop('track_long', tank)
+    # The sound plays at most twice at once
+    assert loops(audio) == tanks[:2]
+    assert list(audio.waiting) == [('track_long', tanks[2])]
+
+    audio.stop_loop('track_long', tanks[0])
+    assert sorted(map(id, loops(audio))) == sorted(map(id, tanks[1:]))
+    assert not audio.waiting
+
+    audio.stop_loop('track_long', tanks[1])
+    audio.stop_loop('track_long', tanks[2])
+    assert loops(audio) == []
@@ -0,0 +1,125 @@
+"""
+test_online.py: This module is part of the tests package.
+
+Tests that the game of a player who joined an online match is drawn: a host
+and a client play over the loopback interface, and the client draws its
+mirror of the match every tick, as `online.py join` does, off screen. A
+match on a map much larger than the screen is mirrored too, in datagrams
+that stay small.
+"""
+
+import pytest
+
+import main
+from gameobjects.controls import BotController, encode_keys
+from gameobjects.mapfile import GameMap, random_map, save_map
+from gameobjects.match import Match
+from gameobjects.netplay import (NetClient, NetHost, RemoteBang,
+                                 RemoteBonus, RemoteBullet, RemoteTank)
+from gameobjects.network import UdpTransport
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT, screen
+from gameobjects.registry import EntityRegistry
+from tests.conftest import new_match
+
+TICKS = 600
+# A datagram bigger than this cannot be sent over IPv4
+UDP_LIMIT = 65507
+
+
+@pytest.fixture
+def transports():
+    host_transport = UdpTransport()
+    client_transport = UdpTransport()
+    yield host_transport, client_transport
+    host_transport.close()
+    client_transport.close()
+
+
+def test_joined_match_is_drawn(transports):
+    host_transport, client_transport = transports
+    main.setup_rendering()
+    main.game_objects.clear()
+    match = new_match()
+    net = NetHost(host_transport, match.objects_list)
+    client = NetClient(client_transport, host_transport.address,
+                       main.game_objects, PLAYER2_INPUT)
+    host_bot = BotController(PLAYER1_INPUT, 13)
+    client_bot = BotController(PLAYER2_INPUT, 14)
+    match.start(13)
+
+    drawn = set()
+    for net_tick in range(1, TICKS + 1):
+        client.tick(encode_keys(client_bot.get_pressed(), PLAYER2_INPUT))
+        net.poll()
+        match.update(bytes((encode_keys(host_bot.get_pressed(),
+                                        PLAYER1_INPUT),
+                            net.next_input())))
+        net.send_snapshot(net_tick)
+
+        client.interpolate(0.5)
+        main.renderer.follow(0.5)
+        main.terrain.draw()
+        rects = main.renderer.draw_objects(0.5)
+        main.terrain.draw_covers()
+        main.renderer.draw_ui()
+        assert all(screen.get_rect().contains(rect) for rect in rects)
+        drawn.update(type(obj) for obj in main.game_objects)
+
+    assert client.local_tank is not None
+    assert RemoteTank in drawn
+    assert drawn & {RemoteBullet, RemoteBonus, RemoteBang}
+
+
+def test_remote_entities_are_drawn_at_the_camera_offset(transports):
+    host_transport, client_transport = transports
+    main.game_objects.clear()
+    match = new_match()
+    net = NetHost(host_transport, match.objects_list)
+    client = NetClient(client_transport, host_transport.address,
+                       main.game_objects, PLAYER2_INPUT)
+    match.start(15)
+    for net_tick in range(1, 20):
+        client.tick(0)
+        net.poll()
+        match.update(bytes((0, net.next_input())))
+        net.send_snapshot(net_tick)
+
+    tank, = (obj for obj in main.game_objects if isinstance(obj, RemoteTank))
+    rect = tank.draw(1.0, (7, 5))
+    assert rect == screen.get_rect().clip(tank.rect.move(-7, -5))
+    assert tank.position(0.5) == tank.rect.center
+
+
+def test_match_on_a_large_map_is_mirrored(transports, tmp_path):
+    host_transport, client_transport = transports
+    path = tmp_path / 'large.tmap'
+    save_map(path, *random_map(250, 190, seed=3, density=0.9))
+    match = Match(EntityRegistry(), game_map=GameMap(path))
+    net = NetHost(host_transport, match.objects_list)
+    mirror = EntityRegistry()
+    client = NetClient(client_transport, host_transport.address, mirror,
+                       PLAYER2_INPUT)
+    host_bot = BotController(PLAYER1_INPUT, 17)
+    client_bot = BotController(PLAYER2_INPUT, 18)
+    match.start(17)
+
+    largest = 0
+    for net_tick in range(1, 301):
+        client.tick(encode_keys(client_bot.get_pressed(), PLAYER2_INPUT))
+        net.poll()
+        match.update(bytes((encode_keys(host_bot.get_pressed(),
+                                        PLAYER1_INPUT),
+                            net.next_input())))
+        sent = host_transport.bytes_sent
+        net.send_snapshot(net_tick)
+        largest = max(largest, host_transport.bytes_sent - sent)
+    client.receive()
+
+    assert host_transport.dropped == 0
+    assert largest < UDP_LIMIT // 8
+    assert client.applied == net.states[client.latest_tick]
+    host_tiles, tiles = match.objects_list.tiles, mirror.tiles
+    assert (tiles.columns, tiles.rows) == (250, 190)
+    assert mirror.camera.world == match.objects_list.camera.world
+    active = match.objects_list.camera.active
+    assert list(tiles.occupied(active)) == list(host_tiles.occupied(active))
@@ -0,0 +1,91 @@
+"""
+test_replay.py: This module is part of the tests package.
+
+Tests that a recorded match played again from its replay file ends in the
+state whose digest was recorded with it, and only on the map it was played
+on.
+"""
+
+import pytest
+
+from gameobjects.controls import BotController
+from gameobjects.mapfile import GameMap, random_map, save_map
+from gameobjects.match import Match
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT
+from gameobjects.registry import EntityRegistry
+from gameobjects.replay import Replay, ReplayError, state_digest
+from tests.conftest import new_match
+
+
+def record(duel, directory, seed, vectorized, ticks=1500):
+    """Play a bot duel while recording it and return its replay file."""
+    match = duel(seed, vectorized, replay_dir=str(directory))
+    for _ in range(ticks):
+        match.update()
+        if match.is_over():
+            break
+    return match.save_replay()
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_replay_reproduces_the_digest(duel, tmp_path, vectorized):
+    replay = Replay.load(record(duel, tmp_path, 11, vectorized))
+    assert replay.digest
+    assert replay.vectorized_bullets == vectorized
+
+    match = new_match(vectorized)
+    match.start(replay.seed)
+    for frame in replay.frames:
+        match.update(frame)
+    assert state_digest(match.objects_list) == replay.digest
+
+
+def test_other_inputs_give_another_digest(duel, tmp_path):
+    replay = Replay.load(record(duel, tmp_path, 12, False))
+    # The first player turns the other way for a while
+    frames = [bytes((frame[0] ^ 0b11, frame[1])) if 100 <= tick < 200
+              else frame for tick, frame in enumerate(replay.frames)]
+
+    match = new_match()
+    match.start(replay.seed)
+    for frame in frames:
+        match.update(frame)
+    assert state_digest(match.objects_list) != replay.digest
+
+
+def test_replay_only_plays_on_its_map(tmp_path):
+    path, other = tmp_path / 'a.tmap', tmp_path / 'b.tmap'
+    save_map(path, *random_map(40, 30, seed=1))
+    save_map(other, *random_map(40, 30, seed=2))
+    game_map = GameMap(path)
+    match = Match(EntityRegistry(), replay_dir=str(tmp_path),
+                  game_map=game_map)
+    match.start(13, (BotController(PLAYER1_INPUT, 13),
+                     BotController(PLAYER2_INPUT, 14)))
+    for _ in range(300):
+        match.update()
+    replay = Replay.load(match.save_replay())
+    assert replay.map_size == (40, 30)
+    assert replay.map_digest == game_map.digest()
+
+    replay.check_map(GameMap(path))
+    with pytest.raises(ReplayError):
+        replay.check_map(None)
+    with pytest.raises(ReplayError):
+        replay.check_map(GameMap(other))
+
+    replayed = Match(EntityRegistry(), game_map=game_map)
+    replayed.start(replay.seed)
+    for frame in replay.frames:
+        replayed.update(frame)
+    assert state_digest(replayed.objects_list) == replay.digest
+
+
+def test_replay_of_a_random_map_refuses_a_map_file(duel, tmp_path):
+    replay = Replay.load(record(duel, tmp_path, 14, False, ticks=100))
+    assert not replay.map_digest
+    replay.check_map(None)
+    path = tmp_path / 'map.tmap'
+    save_map(path, *random_map(*replay.map_size, seed=1))
+    with pytest.raises(ReplayError):
+        replay.check_map(GameMap(path))
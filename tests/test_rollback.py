@@ -0,0 +1,85 @@
+"""
+test_rollback.py: This module is part of the tests package.
+
+Tests rolling a match back and playing it again on corrected inputs.
+"""
+
+import random
+
+import pytest
+
+from gameobjects import snapshot
+from gameobjects.replay import state_digest
+from gameobjects.rollback import RollbackSession
+from tests.conftest import random_frames
+
+
+@pytest.mark.parametrize('depth', [1, 2, 7, 15])
+def test_corrections_match_a_match_played_on_them(duel, depth):
+    frames = random_frames(depth, 400)
+    match = duel(7)
+    session = RollbackSession(match)
+    rng = random.Random(depth)
+    for tick, frame in enumerate(frames):
+        # The input of the second player is predicted wrong, then corrected
+        # `depth` ticks later
+        session.advance(bytes((frame[0], frame[1] ^ rng.randint(1, 31))))
+        if tick >= depth:
+            session.correct(tick - depth, frames[tick - depth])
+    for tick in range(len(frames) - depth, len(frames)):
+        session.correct(tick, frames[tick])
+
+    reference = duel(7)
+    for frame in frames:
+        reference.update(frame)
+    assert (state_digest(match.objects_list)
+            == state_digest(reference.objects_list))
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_restore_brings_back_the_saved_state(duel, vectorized):
+    match = duel(8, vectorized)
+    session = RollbackSession(match)
+    rng = random.Random(8)
+    states = {}
+    restores = 0
+    for frame in random_frames(8, 600):
+        states[session.tick] = snapshot.save(match)
+        session.advance(frame)
+        if rng.random() < 0.2:
+            tick = max(session.tick - rng.randint(1, session.depth), 0)
+            try:
+                session.restore(tick)
+            except ValueError:
+                # Its slot went to a tick forgotten by an earlier restore
+                continue
+            restores += 1
+            assert snapshot.save(match) == states[tick]
+    assert restores > 50
+
+
+def test_only_recent_ticks_can_be_restored(duel):
+    session = RollbackSession(duel(9), depth=4)
+    for frame in random_frames(9, 10):
+        session.advance(frame)
+    with pytest.raises(ValueError):
+        session.restore(5)
+    with pytest.raises(ValueError):
+        session.restore(10)
+    session.restore(6)
+    assert session.tick == 6
+
+
+def test_forgotten_ticks_cannot_be_restored(duel):
+    session = RollbackSession(duel(10), depth=16)
+    frames = random_frames(10, 22)
+    for frame in frames:
+        session.advance(frame)
+    session.restore(12)
+    for frame in frames[12:16]:
+        session.advance(frame)
+    # Tick 19, played before the restore, took the slot of tick 3
+    with pytest.raises(ValueError):
+        session.restore(3)
+    session.restore(8)
+    assert session.tick == 8
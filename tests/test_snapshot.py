@@ -0,0 +1,183 @@
+"""
+test_snapshot.py: This module is part of the tests package.
+
+Tests saving a match to a snapshot and restoring it, and the deltas between
+snapshots.
+"""
+
+import struct
+
+import pytest
+
+from gameobjects import snapshot
+from gameobjects.bullet import Bullet
+from gameobjects.controls import BotController
+from gameobjects.mapfile import GameMap, random_map, save_map
+from gameobjects.match import Match
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT
+from gameobjects.registry import EntityRegistry
+from gameobjects.replay import state_digest
+from gameobjects.tilemap import ARMOR
+from tests.conftest import new_match, random_frames
+
+
+def play(match, frames):
+    for frame in frames:
+        match.update(frame)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_restored_match_goes_on_the_same_way(duel, vectorized):
+    frames = random_frames(1, 900)
+    match = duel(1, vectorized)
+    play(match, frames[:600])
+    data = snapshot.save(match)
+
+    restored = new_match(vectorized)
+    restored.start(99)
+    snapshot.load(data, restored)
+    assert snapshot.save(restored) == data
+
+    play(match, frames[600:])
+    play(restored, frames[600:])
+    assert (state_digest(restored.objects_list)
+            == state_digest(match.objects_list))
+
+
+def test_match_on_a_large_map_is_restored(tmp_path):
+    # Wider than 255 columns, and blocks around the tanks, mid-regeneration,
+    # on cells numbered past 65535
+    path = tmp_path / 'large.tmap'
+    save_map(path, *random_map(600, 300, seed=8))
+    game_map = GameMap(path)
+    match = Match(EntityRegistry(), game_map=game_map)
+    match.start(8, (BotController(PLAYER1_INPUT, 8),
+                    BotController(PLAYER2_INPUT, 9)))
+    frames = random_frames(8, 300)
+    play(match, frames[:100])
+    match.regenerator.start()
+    match.regenerator.step()
+    assert min(row * 600 + column
+               for column, row in match.regenerator.pending) > 0xFFFF
+    data = snapshot.save(match)
+
+    restored = Match(EntityRegistry(), game_map=game_map)
+    restored.start(98)
+    snapshot.load(data, restored)
+    assert snapshot.save(restored) == data
+
+    play(match, frames[100:])
+    play(restored, frames[100:])
+    assert (state_digest(restored.objects_list)
+            == state_digest(match.objects_list))
+
+
+def test_save_into_reuses_a_buffer(duel):
+    match = duel(2)
+    buffer = bytearray(16)
+    for frame in random_frames(2, 300):
+        match.update(frame)
+        size = snapshot.save_into(match, buffer)
+        assert bytes(buffer[:size]) == snapshot.save(match)
+
+
+def test_save_into_can_keep_the_terrain(duel):
+    match = duel(2)
+    buffer = bytearray()
+    snapshot.save_into(match, buffer)
+    # Nothing moves between the saves, so the terrain saved still holds
+    size = snapshot.save_into(match, buffer, terrain=False)
+    assert bytes(buffer[:size]) == snapshot.save(match)
+
+
+def test_fast_bullets_keep_their_velocity(duel):
+    match = duel(3)
+    tank = next(match.objects_list.of_kind('tank'))
+    Bullet.create(tank, 400, 300, 300, -200, 1, match.objects_list)
+    data = snapshot.save(match)
+
+    restored = new_match()
+    restored.start(3)
+    snapshot.load(data, restored)
+    bullet, = restored.objects_list.of_kind('bullet')
+    assert (bullet.bullet_x, bullet.bullet_y) == (300, -200)
+
+
+def _offsets(data):
+    """Return the offsets of the sections of a snapshot."""
+    (_, _, _, _, _, _, columns, rows, tanks, pending, bullets, bonuses,
+     bangs, order, _, _, special) = snapshot.HEADER.unpack_from(data)
+    cells = columns * rows
+    bitset = snapshot.HEADER.size + 4 * snapshot.RNG_WORDS
+    special_cells = bitset + (cells + 7) // 8
+    special_tiles = special_cells + 4 * special
+    bullet = (special_tiles + special + snapshot.TANK.size * tanks
+              + 4 * pending)
+    return {
+        'special_cells': special_cells,
+        'special_tiles': special_tiles,
+        'bullet': bullet,
+        'order': (bullet + snapshot.BULLET.size * bullets
+                  + snapshot.BONUS.size * bonuses
+                  + snapshot.BANG.size * bangs),
+        'cells': cells,
+    }
+
+
+def _unknown_tank(data, offsets):
+    data[offsets['bullet']] = 9
+
+
+def _unknown_object(data, offsets):
+    struct.pack_into('<H', data, offsets['order'], 3 << 14 | 500)
+
+
+def _tile_out_of_the_map(data, offsets):
+    # The grid does not fill the last byte of the bitset
+    assert offsets['cells'] % 8
+    data[offsets['special_cells'] - 1] |= 0x80
+
+
+def _unknown_tile(data, offsets):
+    data[offsets['special_tiles']] = 77
+
+
+def _brick_listed(data, offsets):
+    data[offsets['special_tiles']] = snapshot.DEFAULT_TILE
+
+
+@pytest.mark.parametrize('corrupt', [_unknown_tank, _unknown_object,
+                                     _tile_out_of_the_map, _unknown_tile,
+                                     _brick_listed])
+def test_invalid_snapshot_leaves_the_match_alone(duel, corrupt):
+    match = duel(4)
+    play(match, random_frames(4, 300))
+    # One tile that is not a brick
+    match.objects_list.place_tile(ARMOR)
+    tank = next(match.objects_list.of_kind('tank'))
+    Bullet.create(tank, 100, 100, 10, 0, 1, match.objects_list)
+    data = bytearray(snapshot.save(match))
+    corrupt(data, _offsets(data))
+    play(match, random_frames(5, 50))
+    before = snapshot.save(match)
+
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(bytes(data), match)
+    assert snapshot.save(match) == before
+
+
+def test_truncated_snapshot_is_rejected(duel):
+    data = snapshot.save(duel(5))
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(data[:-1], new_match())
+
+
+def test_delta_rebuilds_the_next_snapshot(duel):
+    match = duel(6)
+    play(match, random_frames(6, 200))
+    base = snapshot.save(match)
+    match.update()
+    data = snapshot.save(match)
+    delta = snapshot.diff(base, data)
+    assert len(delta) < len(data)
+    assert snapshot.patch(base, delta) == data
@@ -0,0 +1,78 @@
+"""
+test_sweep.py: This module is part of the tests package.
+
+Tests that bullets hit the first tile or tank in their way however fast
+they fly, with `Bullet` and with the vectorized bullet engine.
+"""
+
+import pytest
+
+from gameobjects.bullet import Bullet
+from gameobjects.bullet_engine import BulletManager
+from gameobjects.pygame_ui import PLAYER1_INPUT, PLAYER2_INPUT
+from gameobjects.registry import EntityRegistry
+from gameobjects.tank import Tank
+from gameobjects.tilemap import BRICK, EMPTY
+from settings.settings import Settings
+
+SIZE = Settings.GRID_SIZE
+ROW = 8
+SPEEDS = (5, 40, 160, 320, 640)
+
+
+def setup_field(vectorized):
+    """Return a registry and a tank, in a corner, to fire from."""
+    objects_list = EntityRegistry(seed=0)
+    if vectorized:
+        objects_list.attach_bullet_engine(BulletManager(objects_list))
+    shooter = Tank(Settings.GREEN_COLOR, (SIZE, (ROW + 6) * SIZE), 0,
+                   PLAYER1_INPUT, objects_list)
+    return objects_list, shooter
+
+
+def fire(objects_list, shooter, x, y, speed):
+    """Fire a bullet right from (x, y) and play until it is gone."""
+    bullet_engine = objects_list.bullet_engine
+    if bullet_engine is not None:
+        bullet_engine.spawn(shooter, x, y, speed, 0, 1)
+    else:
+        Bullet.create(shooter, x, y, speed, 0, 1, objects_list)
+    for _ in range(1000):
+        if bullet_engine is not None:
+            if not bullet_engine.count:
+                return
+            bullet_engine.update()
+        else:
+            bullets = list(objects_list.of_kind('bullet'))
+            if not bullets:
+                return
+            for bullet in bullets:
+                bullet.update()
+    raise AssertionError('the bullet never stopped')
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('speed', SPEEDS)
+def test_bullet_stops_at_the_first_brick(vectorized, speed):
+    objects_list, shooter = setup_field(vectorized)
+    objects_list.tiles.set(6, ROW, BRICK)
+    objects_list.tiles.set(9, ROW, BRICK)
+
+    fire(objects_list, shooter, SIZE + 11, ROW * SIZE + 11, speed)
+    assert objects_list.tiles.get(6, ROW) == EMPTY
+    assert objects_list.tiles.get(9, ROW) == BRICK
+    bang, = objects_list.of_kind('bang')
+    assert bang.px < 7 * SIZE
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('speed', SPEEDS)
+def test_bullet_hits_a_tank_before_the_brick_behind_it(vectorized, speed):
+    objects_list, shooter = setup_field(vectorized)
+    target = Tank(Settings.BLUE_COLOR, (6 * SIZE, ROW * SIZE), 0,
+                  PLAYER2_INPUT, objects_list)
+    objects_list.tiles.set(9, ROW, BRICK)
+
+    fire(objects_list, shooter, SIZE + 11, target.rect.centery, speed)
+    assert target.hit_points == Settings.HP - 1
+    assert objects_list.tiles.get(9, ROW) == BRICK